@@ -0,0 +1,84 @@
+# benchmarks/bench_row_formats.py
+#
+# Bandingkan waktu dan memori fetch per format baris DatabaseManager.
+# Jalankan dari root project:  python -m benchmarks.bench_row_formats [jumlah_baris]
+
+import sys
+import time
+import tracemalloc
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import pandas as pd
+from config.database import DatabaseManager
+
+# Recursive CTE supaya tidak butuh tabel sungguhan
+QUERY = """
+    WITH RECURSIVE seq(n) AS (
+        SELECT 1
+        UNION ALL
+        SELECT n + 1 FROM seq WHERE n < %s
+    )
+    SELECT n AS expense_id, n %% 30 AS category_id, n * 1000 AS amount,
+           'Kategori ' || (n %% 30) AS category
+    FROM seq
+"""
+
+
+def fetch_dict_then_dataframe(n_rows):
+    """Path lama: list of dict dari RealDictCursor lalu pd.DataFrame"""
+    success, rows = DatabaseManager.execute_query(QUERY, (n_rows,), fetch=True)
+    if not success:
+        raise RuntimeError(rows)
+    return pd.DataFrame(rows)
+
+
+def fetch_format(row_format):
+    def run(n_rows):
+        success, rows = DatabaseManager.execute_query(
+            QUERY, (n_rows,), fetch=True, row_format=row_format
+        )
+        if not success:
+            raise RuntimeError(rows)
+        return rows
+    return run
+
+
+CASES = [
+    ('dict (lama)', fetch_format('dict')),
+    ('dict -> DataFrame (lama)', fetch_dict_then_dataframe),
+    ('tuple', fetch_format('tuple')),
+    ('namedtuple', fetch_format('namedtuple')),
+    ('columns', fetch_format('columns')),
+    ('dataframe', fetch_format('dataframe')),
+]
+
+
+def measure(fn, n_rows):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(n_rows)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, current, peak
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    # Warm up pool supaya biaya connect tidak ikut terukur
+    fetch_format('tuple')(10)
+
+    print(f"{n_rows:,} baris")
+    print(f"{'format':<26}{'waktu (ms)':>12}{'retained (MB)':>16}{'peak (MB)':>12}")
+    for name, fn in CASES:
+        elapsed, current, peak = measure(fn, n_rows)
+        print(f"{name:<26}{elapsed * 1000:>12.1f}{current / 2**20:>16.1f}{peak / 2**20:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/bench_session_memory.py
+#
+# Bandingkan memori satu session: list of dict (format lama) vs BudgetStore.
+# Jalankan dari root project:  python -m benchmarks.bench_session_memory [jumlah_expense]
+
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from utils.budget_store import BudgetStore
+
+N_CATEGORIES = 12
+
+
+def make_rows(n_expenses, seed=42):
+    rng = random.Random(seed)
+    categories = [
+        {
+            'category_id': i + 1,
+            'name': f"Kategori {i + 1}",
+            'priority': rng.randint(1, 5),
+            'urgency': rng.randint(1, 5),
+            'frequency': rng.randint(1, 5),
+            'impact': rng.randint(1, 5)
+        }
+        for i in range(N_CATEGORIES)
+    ]
+    month_start = datetime(2024, 1, 1)
+    expenses = []
+    for i in range(n_expenses):
+        cat = rng.choice(categories)
+        expenses.append({
+            'expense_id': i + 1,
+            'category_id': cat['category_id'],
+            'category': cat['name'],
+            'amount': rng.randint(1, 500) * 1000,
+            'spent_at': month_start + timedelta(seconds=rng.randint(0, 30 * 86400))
+        })
+    return categories, expenses
+
+
+def build_dict_lists(categories, expenses):
+    """Format session lama: satu dict per kategori dan per expense"""
+    return (
+        [dict(cat, allocation=0, spent=0, combined_score=0) for cat in categories],
+        [dict(exp) for exp in expenses]
+    )
+
+
+def measure(build, n_expenses):
+    """
+    Byte yang masih hidup setelah baris repository dimuat dengan build()
+
+    Baris sumber dibuat di dalam pengukuran dan dibuang setelahnya, sama
+    seperti hasil query di load_budget_data, jadi yang terhitung hanya
+    objek yang ditahan oleh format session (termasuk datetime dan int).
+    """
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    started = time.perf_counter()
+    result = build(*make_rows(n_expenses))
+    elapsed = time.perf_counter() - started
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return result, size, elapsed
+
+
+def main():
+    n_expenses = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    _, dict_bytes, dict_s = measure(build_dict_lists, n_expenses)
+    store, store_bytes, store_s = measure(BudgetStore.from_rows, n_expenses)
+
+    print(f"{n_expenses:,} expense x {N_CATEGORIES} kategori per session")
+    print(f"{'list of dict':<14}{dict_bytes / 1024:>10.1f} KiB{dict_s * 1000:>10.1f} ms")
+    print(f"{'BudgetStore':<14}{store_bytes / 1024:>10.1f} KiB{store_s * 1000:>10.1f} ms")
+    print(f"hemat {1 - store_bytes / dict_bytes:.0%} ({dict_bytes / store_bytes:.1f}x lebih kecil), "
+          f"memory_usage() melaporkan {store.memory_usage()['total'] / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
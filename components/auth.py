@@ -1,5 +1,6 @@
 # components/auth.py
 
+from html import escape
 import streamlit as st
 from utils.state_manager import authenticate_user, register_user
 
@@ -28,10 +29,10 @@ def render_signin_form():
         if st.button("🚀 Masuk", key="signin_btn"):
             success, message = authenticate_user(username, password)
             if success:
-                st.markdown(f'<div class="success-message">✅ {message}</div>', unsafe_allow_html=True)
+                st.markdown(f'<div class="success-message">✅ {escape(message)}</div>', unsafe_allow_html=True)
                 st.rerun()
             else:
-                st.markdown(f'<div class="error-message">❌ {message}</div>', unsafe_allow_html=True)
+                st.markdown(f'<div class="error-message">❌ {escape(message)}</div>', unsafe_allow_html=True)
         
         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -48,8 +49,8 @@ def render_signup_form():
         if st.button("🎉 Daftar", key="signup_btn"):
             success, message = register_user(new_user, new_pass)
             if success:
-                st.markdown(f'<div class="success-message">🎊 {message}</div>', unsafe_allow_html=True)
+                st.markdown(f'<div class="success-message">🎊 {escape(message)}</div>', unsafe_allow_html=True)
             else:
-                st.markdown(f'<div class="warning-message">⚠️ {message}</div>', unsafe_allow_html=True)
+                st.markdown(f'<div class="warning-message">⚠️ {escape(message)}</div>', unsafe_allow_html=True)
         
         st.markdown('</div>', unsafe_allow_html=True)
\ No newline at end of file
@@ -4,20 +4,32 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 from config.settings import SESSION_KEYS
+from utils.budget_store import get_budget_store
+from utils.frame_cache import memoize_frame
 
 def render_expense_chart():
-    """Render expense vs allocation chart"""
-    categories = st.session_state.get(SESSION_KEYS["CATEGORIES"], [])
+    """
+    Render expense vs allocation chart
+    
+    Selalu menggambar kategori BudgetStore session, karena spec Vega-Lite
+    di-cache per versi store: rerun tanpa perubahan data tidak membangun
+    ulang DataFrame maupun chart Altair.
+    """
+    categories = get_budget_store().categories
     
     if not categories:
         st.warning("⚠️ Belum ada data kategori untuk ditampilkan.")
         return
     
-    df = pd.DataFrame(categories)
+    spec = memoize_frame('expense_chart', lambda: build_expense_chart_spec(categories))
+    st.vega_lite_chart(spec, use_container_width=True)
+
+def build_expense_chart_spec(categories):
+    """Build expense vs allocation chart as a Vega-Lite spec (dict)"""
     df_chart = pd.DataFrame({
-        'Kategori': df['name'],
-        'Alokasi': df['allocation'],
-        'Terpakai': df['spent']
+        'Kategori': [cat['name'] for cat in categories],
+        'Alokasi': [cat['allocation'] for cat in categories],
+        'Terpakai': [cat['spent'] for cat in categories]
     })
     df_chart_melted = df_chart.melt('Kategori', var_name='Tipe', value_name='Jumlah')
 
@@ -29,7 +41,7 @@ def render_expense_chart():
                           range=['#667eea', '#FF6B6B']))
     ).properties(height=400)
 
-    st.altair_chart(chart, use_container_width=True)
+    return chart.to_dict()
 
 def render_metric_cards(summary):
     """Render financial summary metric cards"""
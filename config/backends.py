@@ -0,0 +1,419 @@
+# config/backends.py
+
+import functools
+import re
+import sqlite3
+import uuid
+from collections import namedtuple
+from datetime import date, datetime
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor, NamedTupleCursor, execute_values
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+
+# Semua exception driver yang dianggap "database error" oleh DatabaseManager
+DatabaseError = (psycopg2.Error, sqlite3.Error)
+
+
+def _first_value(row):
+    """Kolom pertama sebuah baris, apa pun row factory cursor-nya"""
+    return next(iter(row.values())) if isinstance(row, dict) else row[0]
+
+
+class _CopyRowStream:
+    """
+    File-like object untuk COPY FROM STDIN
+
+    Mengubah iterable of tuple menjadi format text COPY secara lazy,
+    jadi input besar tidak perlu dimuat sekaligus ke memori.
+    """
+
+    _ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = ''
+        self.row_count = 0
+
+    @classmethod
+    def _format_value(cls, value):
+        if value is None:
+            return '\\N'
+        if isinstance(value, bool):
+            return 't' if value else 'f'
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return str(value).translate(cls._ESCAPES)
+
+    def read(self, size=-1):
+        parts = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            line = '\t'.join(self._format_value(v) for v in row) + '\n'
+            parts.append(line)
+            length += len(line)
+            self.row_count += 1
+        data = ''.join(parts)
+        if size < 0:
+            size = length
+        self._buffer = data[size:]
+        return data[:size]
+
+
+class PostgresBackend:
+    """Backend PostgreSQL lewat psycopg2 (default)"""
+
+    name = 'postgres'
+    supports_copy = True
+
+    # Format baris -> cursor factory psycopg2
+    CURSOR_FACTORIES = {
+        'dict': RealDictCursor,
+        'tuple': None,
+        'namedtuple': NamedTupleCursor,
+        'columns': None,
+        'dataframe': None
+    }
+
+    def __init__(self, connection_params):
+        self.connection_params = connection_params
+
+    def connect(self):
+        return psycopg2.connect(**self.connection_params)
+
+    def validate(self, conn):
+        """Liveness check untuk koneksi yang sudah lama idle"""
+        if conn.closed:
+            return False
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+        conn.rollback()
+        return True
+
+    def reset(self, conn):
+        """
+        Kembalikan koneksi ke status idle sebelum masuk pool lagi
+
+        Returns:
+            bool: False jika koneksi rusak dan harus dibuang
+        """
+        if conn.closed:
+            return False
+        status = conn.info.transaction_status
+        if status == TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def cursor(self, conn, row_format):
+        return conn.cursor(cursor_factory=self.CURSOR_FACTORIES[row_format])
+
+    def stream_cursor(self, conn, row_format, chunk_size):
+        """Server-side (named) cursor untuk streaming hasil besar"""
+        cursor = conn.cursor(
+            name=f"stream_{uuid.uuid4().hex}",
+            cursor_factory=self.CURSOR_FACTORIES[row_format]
+        )
+        cursor.itersize = chunk_size
+        return cursor
+
+    def execute_script(self, cursor, script):
+        """Jalankan beberapa statement sekaligus (misalnya DDL migration)"""
+        cursor.execute(script)
+
+    def insert_batch(self, cursor, table, columns, rows, on_conflict=None, returning=None):
+        """
+        Insert satu batch dengan satu statement multi-row VALUES
+
+        Args:
+            returning (str): Kolom serial yang dikembalikan, misalnya 'expense_id'
+
+        Returns:
+            list: Nilai `returning` sesuai urutan rows, atau None
+        """
+        query = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+            sql.Identifier(table),
+            sql.SQL(', ').join(map(sql.Identifier, columns))
+        ).as_string(cursor)
+        if on_conflict:
+            query += ' ' + on_conflict
+        if not returning:
+            execute_values(cursor, query, rows, page_size=len(rows))
+            return None
+        query += sql.SQL(" RETURNING {}").format(sql.Identifier(returning)).as_string(cursor)
+        result = execute_values(cursor, query, rows, page_size=len(rows), fetch=True)
+        # Urutan RETURNING tidak dijamin, tetapi nilai serial dibagikan
+        # berurutan per baris VALUES dalam satu statement
+        return sorted(_first_value(row) for row in result)
+
+    def update_batch(self, cursor, table, key_columns, columns, rows):
+        """
+        Update banyak baris dengan satu statement UPDATE ... FROM (VALUES ...)
+
+        Args:
+            key_columns (list): Kolom untuk mencocokkan baris
+            columns (list): Kolom yang diubah
+            rows (list): Tuple nilai `columns` lalu `key_columns`
+        """
+        target = sql.Identifier(table)
+        query = sql.SQL("UPDATE {} SET {} FROM (VALUES %s) AS v ({}) WHERE {}").format(
+            target,
+            sql.SQL(', ').join(
+                sql.SQL("{0} = v.{0}").format(sql.Identifier(col)) for col in columns
+            ),
+            sql.SQL(', ').join(map(sql.Identifier, list(columns) + list(key_columns))),
+            sql.SQL(' AND ').join(
+                sql.SQL("{}.{} = v.{}").format(target, sql.Identifier(col), sql.Identifier(col))
+                for col in key_columns
+            )
+        ).as_string(cursor)
+        execute_values(cursor, query, rows, page_size=len(rows))
+
+    def copy_rows(self, cursor, table, columns, rows):
+        """
+        Kirim rows lewat COPY FROM STDIN
+
+        Returns:
+            int: Jumlah baris yang dikirim
+        """
+        copy_sql = sql.SQL("COPY {} ({}) FROM STDIN").format(
+            sql.Identifier(table),
+            sql.SQL(', ').join(map(sql.Identifier, columns))
+        )
+        stream = _CopyRowStream(rows)
+        cursor.copy_expert(copy_sql.as_string(cursor), stream, size=65536)
+        return stream.row_count
+
+    def month_start(self, column):
+        """Ekspresi SQL tanggal 1 bulan dari kolom timestamp"""
+        return f"date_trunc('month', {column})::date"
+
+
+# Konversi tipe tanggal SQLite (disimpan sebagai text ISO 8601)
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()))
+
+_PLACEHOLDER_RE = re.compile(r'%(s|%)')
+_FOR_UPDATE_RE = re.compile(r'\s+FOR\s+UPDATE\b', re.I)
+
+
+@functools.lru_cache(maxsize=1024)
+def _translate_query(query):
+    """
+    Ubah query berkonvensi psycopg2 ke SQLite
+
+    Placeholder %s menjadi ?, %% menjadi %, dan FOR UPDATE dibuang
+    (SQLite mengunci seluruh database saat menulis).
+    """
+    query = _PLACEHOLDER_RE.sub(lambda m: '?' if m.group(1) == 's' else '%', query)
+    return _FOR_UPDATE_RE.sub('', query)
+
+
+def _dict_row(cursor, row):
+    return {desc[0]: value for desc, value in zip(cursor.description, row)}
+
+
+@functools.lru_cache(maxsize=256)
+def _namedtuple_class(fields):
+    return namedtuple('Record', fields, rename=True)
+
+
+def _namedtuple_row(cursor, row):
+    return _namedtuple_class(tuple(desc[0] for desc in cursor.description))(*row)
+
+
+class _SQLiteCursor:
+    """
+    Cursor SQLite yang menerima query dan parameter ala psycopg2
+
+    Cukup untuk pemakaian di DatabaseManager: execute, executemany,
+    fetchone/fetchmany/fetchall, description, rowcount dan close.
+    """
+
+    ROW_FACTORIES = {
+        'dict': _dict_row,
+        'tuple': None,
+        'namedtuple': _namedtuple_row,
+        'columns': None,
+        'dataframe': None
+    }
+
+    def __init__(self, conn, row_format):
+        self._cursor = conn.cursor()
+        self._cursor.row_factory = self.ROW_FACTORIES[row_format]
+        self.itersize = 2000
+
+    def execute(self, query, params=None):
+        self._cursor.execute(_translate_query(query), params or ())
+
+    def executemany(self, query, seq_of_params):
+        self._cursor.executemany(_translate_query(query), seq_of_params)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size or self.itersize)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SQLiteBackend:
+    """
+    Backend SQLite (file atau `:memory:`) untuk benchmark dan test hermetic
+
+    Query tetap ditulis dengan konvensi psycopg2 (%s) dan diterjemahkan
+    otomatis. `:memory:` memakai shared-cache supaya semua koneksi di pool
+    melihat database yang sama; cocok untuk satu thread, pakai file untuk
+    load test konkuren.
+    """
+
+    name = 'sqlite'
+    supports_copy = False
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self._keepalive = None
+        if path == ':memory:':
+            # Database in-memory hilang saat koneksi terakhir ditutup
+            self._uri = f"file:kosbudget_{uuid.uuid4().hex}?mode=memory&cache=shared"
+            self._keepalive = self._open()
+        else:
+            self._uri = None
+
+    def _open(self):
+        if self._uri:
+            conn = sqlite3.connect(
+                self._uri, uri=True, check_same_thread=False,
+                detect_types=sqlite3.PARSE_DECLTYPES
+            )
+        else:
+            conn = sqlite3.connect(
+                self.path, check_same_thread=False, timeout=30,
+                detect_types=sqlite3.PARSE_DECLTYPES
+            )
+            conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def connect(self):
+        return self._open()
+
+    def validate(self, conn):
+        conn.execute("SELECT 1").fetchone()
+        return True
+
+    def reset(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            return False
+        return True
+
+    def cursor(self, conn, row_format):
+        return _SQLiteCursor(conn, row_format)
+
+    def stream_cursor(self, conn, row_format, chunk_size):
+        """Cursor SQLite sudah lazy (step per baris), cukup cursor biasa"""
+        cursor = _SQLiteCursor(conn, row_format)
+        cursor.itersize = chunk_size
+        return cursor
+
+    def execute_script(self, cursor, script):
+        """
+        Jalankan beberapa statement satu per satu
+
+        Tidak memakai executescript() karena itu meng-commit transaksi
+        yang sedang berjalan.
+        """
+        statement = ''
+        for line in script.splitlines(keepends=True):
+            statement += line
+            if sqlite3.complete_statement(statement):
+                cursor.execute(statement)
+                statement = ''
+        if statement.strip():
+            cursor.execute(statement)
+
+    def insert_batch(self, cursor, table, columns, rows, on_conflict=None, returning=None):
+        """
+        Insert satu batch lewat executemany (prepared statement dipakai ulang)
+
+        executemany tidak bisa RETURNING, jadi dengan `returning` setiap
+        baris di-execute sendiri (tanpa round trip, SQLite in-process).
+
+        Returns:
+            list: Nilai `returning` sesuai urutan rows, atau None
+        """
+        column_list = ', '.join(f'"{col}"' for col in columns)
+        placeholders = ', '.join(['%s'] * len(columns))
+        query = f'INSERT INTO "{table}" ({column_list}) VALUES ({placeholders})'
+        if on_conflict:
+            query += ' ' + on_conflict
+        if not returning:
+            cursor.executemany(query, rows)
+            return None
+        query += f' RETURNING "{returning}"'
+        values = []
+        for row in rows:
+            cursor.execute(query, row)
+            values.append(_first_value(cursor.fetchone()))
+        return values
+
+    def update_batch(self, cursor, table, key_columns, columns, rows):
+        """Update banyak baris lewat executemany; rows berisi nilai `columns` lalu `key_columns`"""
+        assignments = ', '.join(f'"{col}" = %s' for col in columns)
+        conditions = ' AND '.join(f'"{col}" = %s' for col in key_columns)
+        cursor.executemany(f'UPDATE "{table}" SET {assignments} WHERE {conditions}', rows)
+
+    def copy_rows(self, cursor, table, columns, rows):
+        """
+        Pengganti COPY: semua rows lewat satu executemany
+
+        Rows dibaca lazy, jadi input besar tidak dimuat sekaligus ke memori.
+
+        Returns:
+            int: Jumlah baris yang dikirim
+        """
+        counter = [0]
+
+        def counted():
+            for row in rows:
+                counter[0] += 1
+                yield row
+
+        self.insert_batch(cursor, table, columns, counted())
+        return counter[0]
+
+    def month_start(self, column):
+        return f"date({column}, 'start of month')"
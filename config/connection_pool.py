@@ -0,0 +1,221 @@
+# config/connection_pool.py
+
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeoutError(Exception):
+    """Dilempar ketika tidak ada koneksi yang tersedia sebelum timeout"""
+
+
+class ConnectionPool:
+    """
+    Pool koneksi yang bounded dan thread-safe
+
+    Satu instance dipakai bersama oleh semua session Streamlit dalam
+    satu proses. Koneksi dibuat lewat `connect_fn`, dicek kesehatannya
+    lewat `validate_fn`, dan ditutup lewat `close_fn`.
+    """
+
+    def __init__(self, connect_fn, min_size=1, max_size=10, timeout=5.0,
+                 validate_fn=None, close_fn=None, validate_after=30.0):
+        """
+        Args:
+            connect_fn (callable): Membuat koneksi baru
+            min_size (int): Jumlah koneksi idle yang dijaga tetap terbuka
+            max_size (int): Batas total koneksi (idle + dipakai)
+            timeout (float): Detik maksimal menunggu saat checkout
+            validate_fn (callable): Mengembalikan True jika koneksi masih sehat
+            close_fn (callable): Menutup koneksi
+            validate_after (float): Koneksi idle lebih lama dari ini dicek
+                dulu dengan `validate_fn` sebelum dipinjamkan
+        """
+        if max_size < 1:
+            raise ValueError("max_size minimal 1")
+        if min_size < 0 or min_size > max_size:
+            raise ValueError("min_size harus di antara 0 dan max_size")
+
+        self._connect = connect_fn
+        self._validate = validate_fn
+        self._close = close_fn or (lambda conn: conn.close())
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.validate_after = validate_after
+
+        self._lock = threading.Condition(threading.Lock())
+        self._idle = deque()  # (conn, waktu dikembalikan)
+        self._in_use = 0
+        self._opening = 0
+        self._closed = False
+
+        self._stats = {
+            'checkouts': 0,
+            'checkout_failures': 0,
+            'timeouts': 0,
+            'connections_created': 0,
+            'connections_discarded': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0
+        }
+
+        self._fill_min()
+
+    def _fill_min(self):
+        """Buka koneksi sampai jumlah idle mencapai min_size"""
+        while True:
+            with self._lock:
+                total = len(self._idle) + self._in_use + self._opening
+                if self._closed or len(self._idle) >= self.min_size or total >= self.max_size:
+                    return
+                self._opening += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._lock:
+                    self._opening -= 1
+                    self._lock.notify()
+                return
+            with self._lock:
+                self._opening -= 1
+                self._stats['connections_created'] += 1
+                self._idle.append((conn, time.monotonic()))
+                self._lock.notify()
+
+    def _discard(self, conn):
+        """Tutup koneksi rusak tanpa melempar error"""
+        try:
+            self._close(conn)
+        except Exception:
+            pass
+        with self._lock:
+            self._stats['connections_discarded'] += 1
+
+    def _is_healthy(self, conn):
+        if self._validate is None:
+            return True
+        try:
+            return bool(self._validate(conn))
+        except Exception:
+            return False
+
+    def getconn(self, timeout=None):
+        """
+        Pinjam koneksi dari pool
+
+        Args:
+            timeout (float): Override timeout checkout (detik)
+
+        Returns:
+            Koneksi database
+
+        Raises:
+            PoolTimeoutError: Jika pool penuh sampai timeout habis
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        while True:
+            conn = None
+            idle_since = None
+            create_new = False
+
+            with self._lock:
+                while True:
+                    if self._closed:
+                        self._stats['checkout_failures'] += 1
+                        raise PoolTimeoutError("Connection pool sudah ditutup")
+                    if self._idle:
+                        conn, idle_since = self._idle.pop()
+                        self._in_use += 1
+                        break
+                    if self._in_use + self._opening < self.max_size:
+                        self._opening += 1
+                        create_new = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        self._stats['checkout_failures'] += 1
+                        raise PoolTimeoutError(
+                            f"Tidak ada koneksi tersedia dalam {timeout:.1f} detik "
+                            f"(max_size={self.max_size})"
+                        )
+                    self._lock.wait(remaining)
+
+            if create_new:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._opening -= 1
+                        self._stats['checkout_failures'] += 1
+                        self._lock.notify()
+                    raise
+                with self._lock:
+                    self._opening -= 1
+                    self._in_use += 1
+                    self._stats['connections_created'] += 1
+            elif time.monotonic() - idle_since >= self.validate_after and not self._is_healthy(conn):
+                # Koneksi idle terlalu lama dan ternyata putus, coba lagi
+                with self._lock:
+                    self._in_use -= 1
+                    self._lock.notify()
+                self._discard(conn)
+                continue
+
+            waited = time.monotonic() - start
+            with self._lock:
+                self._stats['checkouts'] += 1
+                self._stats['wait_time_total'] += waited
+                self._stats['wait_time_max'] = max(self._stats['wait_time_max'], waited)
+            return conn
+
+    def putconn(self, conn, discard=False):
+        """
+        Kembalikan koneksi ke pool
+
+        Args:
+            conn: Koneksi yang dipinjam lewat getconn
+            discard (bool): True untuk menutup koneksi alih-alih menyimpannya,
+                misalnya karena koneksi rusak atau transaksi gagal di-reset
+        """
+        with self._lock:
+            self._in_use -= 1
+            if not discard and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                self._lock.notify()
+                return
+            self._lock.notify()
+        self._discard(conn)
+        self._fill_min()
+
+    def closeall(self):
+        """Tutup semua koneksi idle dan tolak checkout berikutnya"""
+        with self._lock:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._lock.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self):
+        """
+        Statistik pool untuk sizing
+
+        Returns:
+            dict: in_use, idle, size, wait time, dan jumlah kegagalan checkout
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_use'] = self._in_use
+            stats['idle'] = len(self._idle)
+            stats['size'] = self._in_use + len(self._idle)
+            stats['min_size'] = self.min_size
+            stats['max_size'] = self.max_size
+        checkouts = stats['checkouts']
+        stats['wait_time_avg'] = stats['wait_time_total'] / checkouts if checkouts else 0.0
+        return stats
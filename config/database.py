@@ -1,13 +1,34 @@
 # config/database.py
 
-import psycopg2
-from psycopg2.extras import RealDictCursor
 import streamlit as st
 import os
+import threading
+import time
+from itertools import chain, islice
 from contextlib import contextmanager
+from config.backends import DatabaseError, PostgresBackend, SQLiteBackend
+from config.connection_pool import ConnectionPool
+from config.replicas import ReplicaRouter
+from config.query_metrics import QueryTimer, query_stats, dump_query_stats
+
+# Backend dan pool koneksi dipakai bersama oleh semua session dalam satu proses
+_backend = None
+_pool = None
+_pool_lock = threading.Lock()
+_backend_lock = threading.Lock()
+_replica_router = None
+_replica_router_ready = False
+
+# Format baris hasil fetch
+# dict       : list of dict (default untuk kode auth)
+# tuple      : list of tuple tanpa nama kolom
+# namedtuple : list of namedtuple
+# columns    : dict {kolom: list nilai} (column-oriented)
+# dataframe  : pandas DataFrame dibangun langsung dari tuple cursor
+ROW_FORMATS = ('dict', 'tuple', 'namedtuple', 'columns', 'dataframe')
 
 class DatabaseConfig:
-    """Konfigurasi database PostgreSQL"""
+    """Konfigurasi database (PostgreSQL, atau SQLite lewat DB_BACKEND=sqlite)"""
     
     @staticmethod
     def get_connection_params():
@@ -23,45 +44,232 @@ class DatabaseConfig:
             'port': os.getenv('DB_PORT', '5432')
         }
     
+    @staticmethod
+    def get_pool_params():
+        """
+        Mendapatkan parameter connection pool dari environment variables
+        """
+        return {
+            'min_size': int(os.getenv('DB_POOL_MIN', '1')),
+            'max_size': int(os.getenv('DB_POOL_MAX', '10')),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '5')),
+            'validate_after': float(os.getenv('DB_POOL_VALIDATE_AFTER', '30'))
+        }
+    
+    @staticmethod
+    def get_bulk_params():
+        """
+        Mendapatkan parameter bulk write dan streaming read dari environment variables
+        """
+        return {
+            'batch_size': int(os.getenv('DB_BULK_BATCH_SIZE', '1000')),
+            'copy_threshold': int(os.getenv('DB_BULK_COPY_THRESHOLD', '20000')),
+            'stream_chunk_size': int(os.getenv('DB_STREAM_CHUNK_SIZE', '2000'))
+        }
+    
+    @staticmethod
+    def get_replica_params():
+        """
+        Mendapatkan parameter read replica dari environment variables
+        
+        DB_REPLICA_DSNS berisi DSN libpq dipisah koma, misalnya
+        "host=db-replica-1 port=5432 dbname=kosbudget_db user=app connect_timeout=2".
+        Tanpa DB_REPLICA_DSNS semua query ke primary.
+        """
+        dsns = os.getenv('DB_REPLICA_DSNS', '')
+        return {
+            'dsns': [dsn.strip() for dsn in dsns.split(',') if dsn.strip()],
+            'pin_seconds': float(os.getenv('DB_REPLICA_PIN_SECONDS', '5')),
+            'retry_interval': float(os.getenv('DB_REPLICA_RETRY_INTERVAL', '10')),
+            'checkout_timeout': float(os.getenv('DB_REPLICA_CHECKOUT_TIMEOUT', '1'))
+        }
+    
+    @staticmethod
+    def get_backend():
+        """
+        Mendapatkan backend database yang dipilih lewat DB_BACKEND
+        
+        postgres (default) memakai get_connection_params, sqlite memakai
+        DB_SQLITE_PATH (file atau :memory:).
+        
+        Returns:
+            PostgresBackend atau SQLiteBackend
+        """
+        global _backend
+        if _backend is None:
+            with _backend_lock:
+                if _backend is None:
+                    name = os.getenv('DB_BACKEND', 'postgres').lower()
+                    if name == 'postgres':
+                        _backend = PostgresBackend(DatabaseConfig.get_connection_params())
+                    elif name == 'sqlite':
+                        _backend = SQLiteBackend(os.getenv('DB_SQLITE_PATH', ':memory:'))
+                    else:
+                        raise ValueError(f"DB_BACKEND tidak dikenal: {name}")
+        return _backend
+    
+    @staticmethod
+    def _connect():
+        """Buka koneksi baru lewat backend aktif"""
+        return DatabaseConfig.get_backend().connect()
+    
+    @staticmethod
+    def _validate_connection(conn):
+        """Liveness check untuk koneksi yang sudah lama idle"""
+        return DatabaseConfig.get_backend().validate(conn)
+    
+    @staticmethod
+    def _reset_connection(conn):
+        """
+        Kembalikan koneksi ke status idle sebelum masuk pool lagi
+        
+        Returns:
+            bool: False jika koneksi rusak dan harus dibuang
+        """
+        return DatabaseConfig.get_backend().reset(conn)
+    
+    @staticmethod
+    def get_pool():
+        """
+        Mendapatkan connection pool global (dibuat saat pertama dipakai)
+        
+        Returns:
+            ConnectionPool: Pool yang dipakai bersama semua session
+        """
+        global _pool
+        if _pool is None:
+            with _pool_lock:
+                if _pool is None:
+                    _pool = ConnectionPool(
+                        DatabaseConfig._connect,
+                        validate_fn=DatabaseConfig._validate_connection,
+                        **DatabaseConfig.get_pool_params()
+                    )
+        return _pool
+    
+    @staticmethod
+    def get_replica_router():
+        """
+        Mendapatkan router read replica (hanya untuk backend postgres)
+        
+        Returns:
+            ReplicaRouter atau None jika tidak ada replica yang dikonfigurasi
+        """
+        global _replica_router, _replica_router_ready
+        if not _replica_router_ready:
+            with _pool_lock:
+                if not _replica_router_ready:
+                    params = DatabaseConfig.get_replica_params()
+                    if params['dsns'] and DatabaseConfig.get_backend().name == 'postgres':
+                        _replica_router = ReplicaRouter(
+                            [PostgresBackend({'dsn': dsn}) for dsn in params['dsns']],
+                            DatabaseConfig.get_pool_params(),
+                            pin_seconds=params['pin_seconds'],
+                            retry_interval=params['retry_interval'],
+                            checkout_timeout=params['checkout_timeout']
+                        )
+                    _replica_router_ready = True
+        return _replica_router
+    
+    @staticmethod
+    def close_pool():
+        """Tutup semua koneksi di pool (misalnya saat shutdown)"""
+        global _pool, _replica_router, _replica_router_ready
+        with _pool_lock:
+            if _pool is not None:
+                _pool.closeall()
+                _pool = None
+            if _replica_router is not None:
+                _replica_router.closeall()
+                _replica_router = None
+            _replica_router_ready = False
+    
     @staticmethod
     @contextmanager
-    def get_db_connection():
+    def get_db_connection(readonly=False, pin_key=None):
         """
         Context manager untuk koneksi database
-        Otomatis close connection setelah selesai
+        Meminjam koneksi dari pool dan otomatis mengembalikannya setelah selesai
+        
+        Args:
+            readonly (bool): True jika blok hanya membaca; boleh dilayani replica
+            pin_key: Identitas pembaca (misalnya user_id); read dengan key yang
+                baru saja menulis tetap ke primary selama DB_REPLICA_PIN_SECONDS
         """
+        pool = None
         conn = None
+        replica = None
+        if readonly:
+            router = DatabaseConfig.get_replica_router()
+            if router is not None and not router.is_pinned(pin_key):
+                replica, conn = router.checkout()
+                pool = replica
         try:
-            params = DatabaseConfig.get_connection_params()
-            conn = psycopg2.connect(**params)
+            if conn is None:
+                pool = DatabaseConfig.get_pool()
+                conn = pool.getconn()
             yield conn
-        except psycopg2.Error as e:
+        except DatabaseError as e:
             st.error(f"Database connection error: {e}")
             if conn:
-                conn.rollback()
+                try:
+                    conn.rollback()
+                except DatabaseError:
+                    pass
+            if replica is not None and getattr(conn, 'closed', False):
+                # Koneksi replica putus di tengah query
+                DatabaseConfig.get_replica_router().mark_down(replica)
             raise
         finally:
             if conn:
-                conn.close()
+                pool.putconn(conn, discard=not DatabaseConfig._reset_connection(conn))
+    
+    @staticmethod
+    def pin_to_primary(pin_key):
+        """Catat bahwa `pin_key` baru saja menulis (read-your-own-write)"""
+        if pin_key is None:
+            return
+        router = DatabaseConfig.get_replica_router()
+        if router is not None:
+            router.pin(pin_key)
     
     @staticmethod
     @contextmanager
-    def get_db_cursor(connection):
+    def get_db_cursor(connection, row_format='dict'):
         """
         Context manager untuk cursor database
-        Menggunakan RealDictCursor untuk hasil dalam format dictionary
+        Default hasil dalam format dictionary, lihat ROW_FORMATS untuk format lain
         """
+        if row_format not in ROW_FORMATS:
+            raise ValueError(f"row_format tidak dikenal: {row_format}")
         cursor = None
         try:
-            cursor = connection.cursor(cursor_factory=RealDictCursor)
+            cursor = DatabaseConfig.get_backend().cursor(connection, row_format)
             yield cursor
-        except psycopg2.Error as e:
+        except DatabaseError as e:
             st.error(f"Database cursor error: {e}")
             raise
         finally:
             if cursor:
                 cursor.close()
 
+def _shape_rows(cursor, rows, row_format):
+    """
+    Ubah hasil fetch cursor ke format yang diminta
+    
+    Format dict/tuple/namedtuple sudah dibentuk oleh cursor factory,
+    columns dan dataframe dibangun dari tuple tanpa dict per baris.
+    """
+    if row_format not in ('columns', 'dataframe'):
+        return rows
+    columns = [desc[0] for desc in cursor.description]
+    if row_format == 'columns':
+        if not rows:
+            return {col: [] for col in columns}
+        return dict(zip(columns, map(list, zip(*rows))))
+    import pandas as pd
+    return pd.DataFrame.from_records(rows, columns=columns, nrows=len(rows))
+
 class DatabaseManager:
     """Manager untuk operasi database umum"""
     
@@ -78,7 +286,55 @@ class DatabaseManager:
             return False, f"Database connection failed: {str(e)}"
     
     @staticmethod
-    def execute_query(query, params=None, fetch=False):
+    def get_pool_stats():
+        """
+        Statistik connection pool (in-use, idle, wait time, checkout failures)
+        
+        Returns:
+            dict: Statistik pool
+        """
+        return DatabaseConfig.get_pool().stats()
+    
+    @staticmethod
+    def get_replica_stats():
+        """
+        Statistik routing replica (None jika tidak ada replica)
+        
+        Returns:
+            dict: Counter routing dan statistik pool per replica
+        """
+        router = DatabaseConfig.get_replica_router()
+        return router.stats() if router is not None else None
+    
+    @staticmethod
+    @contextmanager
+    def transaction(row_format='dict', pin_key=None):
+        """
+        Unit of work: beberapa statement di satu koneksi dengan satu commit
+        
+        Commit dilakukan saat blok selesai tanpa error, rollback jika ada
+        exception (exception tetap dilempar ke pemanggil). Transaksi selalu
+        berjalan di primary.
+        
+        Args:
+            row_format (str): Format baris cursor (dict, tuple atau namedtuple)
+            pin_key: Identitas penulis; read berikutnya di-pin ke primary
+        
+        Yields:
+            cursor: Cursor yang terikat ke transaksi
+        """
+        with DatabaseConfig.get_db_connection() as conn:
+            with DatabaseConfig.get_db_cursor(conn, row_format) as cursor:
+                try:
+                    yield cursor
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+        DatabaseConfig.pin_to_primary(pin_key)
+    
+    @staticmethod
+    def execute_query(query, params=None, fetch=False, row_format='dict', readonly=False, pin_key=None):
         """
         Execute query dengan parameter
         
@@ -86,27 +342,220 @@ class DatabaseManager:
             query (str): SQL query
             params (tuple): Parameter untuk query
             fetch (bool): True jika ingin fetch hasil
+            row_format (str): Format hasil fetch, salah satu dari ROW_FORMATS
+            readonly (bool): True jika query hanya membaca (boleh ke replica)
+            pin_key: Identitas pemanggil (misalnya user_id) untuk
+                read-your-own-write; write dengan pin_key mem-pin read
+                berikutnya ke primary
             
         Returns:
             tuple: (success, result/error_message)
         """
+        # Waktu per fase: connect (checkout pool), execute (+commit), fetch
+        timer = QueryTimer(query)
+        rows = 0
         try:
-            with DatabaseConfig.get_db_connection() as conn:
-                with DatabaseConfig.get_db_cursor(conn) as cursor:
+            with DatabaseConfig.get_db_connection(readonly, pin_key) as conn:
+                timer.mark('connect')
+                with DatabaseConfig.get_db_cursor(conn, row_format) as cursor:
                     cursor.execute(query, params)
+                    timer.mark('execute')
+                    rows = max(cursor.rowcount, 0)
                     
                     if fetch:
                         if query.strip().upper().startswith('SELECT'):
-                            result = cursor.fetchall()
+                            fetched = cursor.fetchall()
+                            rows = len(fetched)
+                            result = _shape_rows(cursor, fetched, row_format)
                         else:
                             result = cursor.fetchone()
+                            if result is not None and row_format in ('columns', 'dataframe'):
+                                result = _shape_rows(cursor, [result], row_format)
+                        timer.mark('fetch')
                         conn.commit()
+                        timer.mark('execute')
+                        timer.finish(rows)
+                        if not readonly:
+                            DatabaseConfig.pin_to_primary(pin_key)
                         return True, result
                     else:
                         conn.commit()
+                        timer.mark('execute')
+                        timer.finish(rows)
+                        if not readonly:
+                            DatabaseConfig.pin_to_primary(pin_key)
                         return True, "Query executed successfully"
                         
-        except psycopg2.Error as e:
+        except DatabaseError as e:
+            timer.mark('execute')
+            timer.finish(rows, error=e)
             return False, f"Database error: {str(e)}"
         except Exception as e:
-            return False, f"Unexpected error: {str(e)}"
\ No newline at end of file
+            timer.mark('execute')
+            timer.finish(rows, error=e)
+            return False, f"Unexpected error: {str(e)}"
+    
+    @staticmethod
+    def get_query_stats(top_n=20, key='total_ms'):
+        """
+        Top-N query berdasarkan total waktu (atau `key` lain seperti calls, max_ms)
+        
+        Returns:
+            list: List of dict per fingerprint query
+        """
+        return query_stats.top(top_n, key)
+    
+    @staticmethod
+    def dump_query_stats(top_n=20, key='total_ms'):
+        """Tulis top-N query ke slow query log sebagai satu baris JSON"""
+        return dump_query_stats(top_n, key)
+    
+    @staticmethod
+    def reset_query_stats():
+        """Kosongkan agregat statistik query"""
+        query_stats.reset()
+    
+    @staticmethod
+    def bulk_insert(table, columns, rows, batch_size=None, copy_threshold=None, on_conflict=None, pin_key=None):
+        """
+        Insert banyak baris sekaligus dalam satu transaksi
+        
+        Baris dikirim per batch dengan multi-row VALUES (executemany di
+        SQLite). Jika jumlah baris mencapai `copy_threshold` (dan tidak ada
+        `on_conflict`), seluruh input dikirim lewat COPY FROM STDIN.
+        
+        Args:
+            table (str): Nama tabel
+            columns (list): Nama kolom sesuai urutan nilai di setiap tuple
+            rows (iterable): Iterable of tuple parameter
+            batch_size (int): Jumlah baris per statement VALUES
+            copy_threshold (int): Minimal jumlah baris untuk memakai COPY
+            on_conflict (str): Klausa tambahan, misalnya "ON CONFLICT DO NOTHING"
+            pin_key: Identitas penulis untuk read-your-own-write
+            
+        Returns:
+            tuple: (success, stats/error_message) dengan stats berisi
+                rows, batches, method, elapsed dan rows_per_sec
+        """
+        bulk_params = DatabaseConfig.get_bulk_params()
+        batch_size = batch_size or bulk_params['batch_size']
+        copy_threshold = copy_threshold or bulk_params['copy_threshold']
+        
+        rows = iter(rows)
+        start = time.perf_counter()
+        
+        backend = DatabaseConfig.get_backend()
+        
+        # Ambil sampai copy_threshold baris dulu untuk memilih metode
+        if on_conflict or not backend.supports_copy:
+            head = []
+        else:
+            head = list(islice(rows, copy_threshold))
+        use_copy = len(head) >= copy_threshold
+        rows = chain(head, rows)
+        
+        row_count = 0
+        batches = 0
+        column_list = ', '.join(columns)
+        if use_copy:
+            timer = QueryTimer(f"COPY {table} ({column_list}) FROM STDIN", operation='copy')
+        else:
+            timer = QueryTimer(f"INSERT INTO {table} ({column_list}) VALUES %s", operation='bulk_insert')
+        try:
+            with DatabaseManager.transaction(pin_key=pin_key) as cursor:
+                timer.mark('connect')
+                if use_copy:
+                    row_count = backend.copy_rows(cursor, table, columns, rows)
+                    batches = 1
+                else:
+                    while True:
+                        batch = list(islice(rows, batch_size))
+                        if not batch:
+                            break
+                        backend.insert_batch(cursor, table, columns, batch, on_conflict)
+                        row_count += len(batch)
+                        batches += 1
+        except DatabaseError as e:
+            timer.mark('execute')
+            timer.finish(row_count, error=e)
+            return False, f"Database error: {str(e)}"
+        except Exception as e:
+            timer.mark('execute')
+            timer.finish(row_count, error=e)
+            return False, f"Unexpected error: {str(e)}"
+        
+        timer.mark('execute')
+        timer.finish(row_count)
+        elapsed = time.perf_counter() - start
+        return True, {
+            'rows': row_count,
+            'batches': batches,
+            'method': 'copy' if use_copy else 'values',
+            'elapsed': elapsed,
+            'rows_per_sec': row_count / elapsed if elapsed > 0 else 0.0
+        }
+    
+    @staticmethod
+    def stream_query(query, params=None, chunk_size=None, chunks=False, row_format='dict',
+                     readonly=True, pin_key=None):
+        """
+        Jalankan SELECT lewat server-side (named) cursor dan yield hasilnya
+        (di SQLite cursor biasa, yang sudah membaca baris secara lazy)
+        
+        Hanya `chunk_size` baris yang ada di memori pada satu waktu, jadi
+        history yang sangat panjang bisa diproses dengan memori konstan.
+        Koneksi dipinjam dari pool selama iterator masih hidup dan
+        dikembalikan saat iterator habis atau ditutup (misalnya `break`).
+        
+        Berbeda dengan execute_query, error database dilempar ke pemanggil
+        karena generator tidak bisa mengembalikan (success, message).
+        
+        Args:
+            query (str): SQL SELECT
+            params (tuple): Parameter untuk query
+            chunk_size (int): Jumlah baris per fetch dari server
+            chunks (bool): True untuk yield hasil per chunk, bukan per baris
+            row_format (str): Format baris, salah satu dari ROW_FORMATS;
+                columns dan dataframe selalu di-yield per chunk
+            readonly (bool): Boleh dilayani replica (default True)
+            pin_key: Identitas pembaca untuk read-your-own-write
+            
+        Yields:
+            Baris (atau satu chunk dalam format row_format jika chunks=True)
+        """
+        if row_format not in ROW_FORMATS:
+            raise ValueError(f"row_format tidak dikenal: {row_format}")
+        chunk_size = chunk_size or DatabaseConfig.get_bulk_params()['stream_chunk_size']
+        chunks = chunks or row_format in ('columns', 'dataframe')
+        
+        # Waktu konsumsi oleh pemanggil di antara chunk tidak ikut dihitung
+        timer = QueryTimer(query, operation='stream')
+        row_count = 0
+        error = None
+        with DatabaseConfig.get_db_connection(readonly, pin_key) as conn:
+            timer.mark('connect')
+            cursor = DatabaseConfig.get_backend().stream_cursor(conn, row_format, chunk_size)
+            try:
+                cursor.execute(query, params)
+                timer.mark('execute')
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    timer.mark('fetch')
+                    if not rows:
+                        break
+                    row_count += len(rows)
+                    if chunks:
+                        yield _shape_rows(cursor, rows, row_format)
+                    else:
+                        yield from rows
+                    timer.mark('consume')
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                try:
+                    cursor.close()
+                except DatabaseError:
+                    pass
+                timer.timings.pop('consume', None)
+                timer.finish(row_count, error=error)
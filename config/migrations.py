@@ -0,0 +1,215 @@
+# config/migrations.py
+
+from datetime import datetime
+from config.database import DatabaseConfig, DatabaseManager
+
+# Daftar migration berurutan: (version, name, sql)
+# sql berupa string, atau dict {backend: sql} jika DDL berbeda per backend
+# Migration yang sudah pernah jalan tidak boleh diubah, tambahkan versi baru
+MIGRATIONS = [
+    (1, "create_users", {'postgres': """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id SERIAL PRIMARY KEY,
+            username VARCHAR(50) NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP NOT NULL,
+            updated_at TIMESTAMP NOT NULL
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS users_username_key ON users (username);
+    """, 'sqlite': """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username VARCHAR(50) NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP NOT NULL,
+            updated_at TIMESTAMP NOT NULL
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS users_username_key ON users (username);
+    """}),
+    (2, "create_categories", {'postgres': """
+        CREATE TABLE IF NOT EXISTS categories (
+            category_id SERIAL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+            name VARCHAR(100) NOT NULL,
+            priority SMALLINT NOT NULL DEFAULT 3,
+            urgency SMALLINT NOT NULL DEFAULT 3,
+            frequency SMALLINT NOT NULL DEFAULT 3,
+            impact SMALLINT NOT NULL DEFAULT 3,
+            created_at TIMESTAMP NOT NULL,
+            updated_at TIMESTAMP NOT NULL
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS categories_user_name_key ON categories (user_id, name);
+    """, 'sqlite': """
+        CREATE TABLE IF NOT EXISTS categories (
+            category_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+            name VARCHAR(100) NOT NULL,
+            priority SMALLINT NOT NULL DEFAULT 3,
+            urgency SMALLINT NOT NULL DEFAULT 3,
+            frequency SMALLINT NOT NULL DEFAULT 3,
+            impact SMALLINT NOT NULL DEFAULT 3,
+            created_at TIMESTAMP NOT NULL,
+            updated_at TIMESTAMP NOT NULL
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS categories_user_name_key ON categories (user_id, name);
+    """}),
+    (3, "create_expenses", {'postgres': """
+        CREATE TABLE IF NOT EXISTS expenses (
+            expense_id BIGSERIAL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+            category_id INTEGER NOT NULL REFERENCES categories (category_id) ON DELETE CASCADE,
+            amount BIGINT NOT NULL CHECK (amount >= 0),
+            spent_at TIMESTAMP NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS expenses_user_spent_at_idx
+            ON expenses (user_id, spent_at);
+        CREATE INDEX IF NOT EXISTS expenses_user_category_spent_at_idx
+            ON expenses (user_id, category_id, spent_at);
+    """, 'sqlite': """
+        CREATE TABLE IF NOT EXISTS expenses (
+            expense_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+            category_id INTEGER NOT NULL REFERENCES categories (category_id) ON DELETE CASCADE,
+            amount BIGINT NOT NULL CHECK (amount >= 0),
+            spent_at TIMESTAMP NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS expenses_user_spent_at_idx
+            ON expenses (user_id, spent_at);
+        CREATE INDEX IF NOT EXISTS expenses_user_category_spent_at_idx
+            ON expenses (user_id, category_id, spent_at);
+    """}),
+    (4, "create_expense_monthly_summary", {'postgres': """
+        CREATE TABLE IF NOT EXISTS expense_monthly_summary (
+            user_id INTEGER NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+            month DATE NOT NULL,
+            category_id INTEGER NOT NULL REFERENCES categories (category_id) ON DELETE CASCADE,
+            total_amount BIGINT NOT NULL DEFAULT 0,
+            expense_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, month, category_id)
+        );
+        INSERT INTO expense_monthly_summary (user_id, month, category_id, total_amount, expense_count)
+        SELECT user_id, date_trunc('month', spent_at)::date, category_id, SUM(amount), COUNT(*)
+        FROM expenses
+        GROUP BY user_id, date_trunc('month', spent_at)::date, category_id
+        ON CONFLICT (user_id, month, category_id) DO NOTHING;
+    """, 'sqlite': """
+        CREATE TABLE IF NOT EXISTS expense_monthly_summary (
+            user_id INTEGER NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+            month DATE NOT NULL,
+            category_id INTEGER NOT NULL REFERENCES categories (category_id) ON DELETE CASCADE,
+            total_amount BIGINT NOT NULL DEFAULT 0,
+            expense_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, month, category_id)
+        );
+        INSERT INTO expense_monthly_summary (user_id, month, category_id, total_amount, expense_count)
+        SELECT user_id, date(spent_at, 'start of month'), category_id, SUM(amount), COUNT(*)
+        FROM expenses
+        WHERE true
+        GROUP BY user_id, date(spent_at, 'start of month'), category_id
+        ON CONFLICT (user_id, month, category_id) DO NOTHING;
+    """}),
+    (5, "create_user_budgets_and_category_allocations", """
+        CREATE TABLE IF NOT EXISTS user_budgets (
+            user_id INTEGER PRIMARY KEY REFERENCES users (user_id) ON DELETE CASCADE,
+            monthly_budget BIGINT NOT NULL DEFAULT 0 CHECK (monthly_budget >= 0),
+            updated_at TIMESTAMP NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS category_allocations (
+            category_id INTEGER PRIMARY KEY REFERENCES categories (category_id) ON DELETE CASCADE,
+            user_id INTEGER NOT NULL REFERENCES users (user_id) ON DELETE CASCADE,
+            combined_score DOUBLE PRECISION NOT NULL,
+            allocation NUMERIC(14, 2) NOT NULL,
+            computed_at TIMESTAMP NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS category_allocations_user_idx
+            ON category_allocations (user_id);
+    """),
+    (6, "index_category_foreign_keys", """
+        CREATE INDEX IF NOT EXISTS expenses_category_idx
+            ON expenses (category_id);
+        CREATE INDEX IF NOT EXISTS expense_monthly_summary_category_idx
+            ON expense_monthly_summary (category_id);
+    """),
+]
+
+SCHEMA_MIGRATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        applied_at TIMESTAMP NOT NULL
+    )
+"""
+
+
+class MigrationRunner:
+    """Menjalankan migration schema secara berurutan berdasarkan versi"""
+
+    @staticmethod
+    def get_applied_versions():
+        """
+        Versi migration yang sudah diterapkan
+
+        Returns:
+            tuple: (success, set of version/error_message)
+        """
+        success, result = DatabaseManager.execute_query(SCHEMA_MIGRATIONS_DDL)
+        if not success:
+            return False, result
+
+        success, result = DatabaseManager.execute_query(
+            "SELECT version FROM schema_migrations", fetch=True, row_format='tuple'
+        )
+        if not success:
+            return False, result
+        return True, {row[0] for row in result}
+
+    @staticmethod
+    def get_pending():
+        """
+        Migration yang belum diterapkan
+
+        Returns:
+            tuple: (success, list of (version, name, sql)/error_message)
+        """
+        success, applied = MigrationRunner.get_applied_versions()
+        if not success:
+            return False, applied
+        return True, [m for m in MIGRATIONS if m[0] not in applied]
+
+    @staticmethod
+    def migrate(target=None):
+        """
+        Terapkan semua migration yang belum jalan sampai versi `target`
+
+        Setiap migration berjalan dalam transaksinya sendiri bersama
+        pencatatan versinya, jadi migration yang gagal tidak tercatat.
+
+        Args:
+            target (int): Versi terakhir yang diterapkan (default semua)
+
+        Returns:
+            tuple: (success, list of versi yang diterapkan/error_message)
+        """
+        success, pending = MigrationRunner.get_pending()
+        if not success:
+            return False, pending
+
+        backend = DatabaseConfig.get_backend()
+        applied = []
+        for version, name, ddl in pending:
+            if target is not None and version > target:
+                break
+            if isinstance(ddl, dict):
+                ddl = ddl[backend.name]
+            try:
+                with DatabaseManager.transaction() as cursor:
+                    backend.execute_script(cursor, ddl)
+                    cursor.execute(
+                        "INSERT INTO schema_migrations (version, name, applied_at) VALUES (%s, %s, %s)",
+                        (version, name, datetime.now())
+                    )
+            except Exception as e:
+                return False, f"Migration {version} ({name}) gagal: {str(e)}"
+            applied.append(version)
+
+        return True, applied
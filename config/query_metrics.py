@@ -0,0 +1,206 @@
+# config/query_metrics.py
+
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+slow_query_logger = logging.getLogger('kosbudget.db.slow_query')
+
+# Pola normalisasi untuk fingerprint query
+_COMMENT_RE = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|%\(\w+\)s|\?')
+_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_VALUES_RE = re.compile(r'(\(\?\))(?:\s*,\s*\(\?\))+')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def get_metrics_params():
+    """
+    Mendapatkan parameter instrumentasi query dari environment variables
+    """
+    return {
+        'slow_query_ms': float(os.getenv('DB_SLOW_QUERY_MS', '200')),
+        'max_fingerprints': int(os.getenv('DB_QUERY_STATS_MAX', '1000'))
+    }
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(query):
+    """
+    Normalisasi query supaya query dengan bentuk sama masuk satu grup
+
+    Literal, angka, dan placeholder diganti `?`, list nilai (IN, VALUES)
+    diringkas, whitespace dirapikan dan semuanya huruf kecil.
+
+    Args:
+        query (str): SQL query
+
+    Returns:
+        str: Fingerprint query
+    """
+    text = _COMMENT_RE.sub(' ', query)
+    text = _STRING_RE.sub('?', text)
+    text = _PLACEHOLDER_RE.sub('?', text)
+    text = _NUMBER_RE.sub('?', text)
+    text = _LIST_RE.sub('(?)', text)
+    text = _VALUES_RE.sub(r'\1', text)
+    return _SPACE_RE.sub(' ', text).strip().lower()
+
+
+class QueryStats:
+    """Agregat in-process per fingerprint query (thread-safe)"""
+
+    def __init__(self, max_fingerprints=1000):
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dropped = 0
+
+    def record(self, query_fingerprint, timings, rows, error=None):
+        """
+        Catat satu eksekusi query
+
+        Args:
+            query_fingerprint (str): Hasil fingerprint()
+            timings (dict): Durasi per fase dalam ms (connect, execute, fetch)
+            rows (int): Jumlah baris yang dibaca/ditulis
+            error (str): Nama class exception jika query gagal
+        """
+        total_ms = sum(timings.values())
+        with self._lock:
+            entry = self._entries.get(query_fingerprint)
+            if entry is None:
+                if len(self._entries) >= self.max_fingerprints:
+                    self._dropped += 1
+                    return
+                entry = {
+                    'calls': 0,
+                    'errors': 0,
+                    'rows': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'connect_ms': 0.0,
+                    'execute_ms': 0.0,
+                    'fetch_ms': 0.0
+                }
+                self._entries[query_fingerprint] = entry
+            entry['calls'] += 1
+            entry['rows'] += rows
+            entry['total_ms'] += total_ms
+            entry['max_ms'] = max(entry['max_ms'], total_ms)
+            for phase, ms in timings.items():
+                entry[f'{phase}_ms'] = entry.get(f'{phase}_ms', 0.0) + ms
+            if error:
+                entry['errors'] += 1
+
+    def top(self, n=10, key='total_ms'):
+        """
+        Query dengan nilai `key` terbesar
+
+        Returns:
+            list: List of dict berisi fingerprint dan agregatnya
+        """
+        with self._lock:
+            items = [dict(entry, fingerprint=fp) for fp, entry in self._entries.items()]
+        for item in items:
+            item['avg_ms'] = item['total_ms'] / item['calls'] if item['calls'] else 0.0
+        items.sort(key=lambda item: item[key], reverse=True)
+        return items[:n]
+
+    def dropped(self):
+        """Jumlah eksekusi yang tidak dicatat karena batas fingerprint penuh"""
+        with self._lock:
+            return self._dropped
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self._dropped = 0
+
+
+query_stats = QueryStats(get_metrics_params()['max_fingerprints'])
+
+
+class QueryTimer:
+    """
+    Mengukur satu eksekusi query per fase
+
+    Contoh:
+        timer = QueryTimer(query)
+        ... pinjam koneksi ...
+        timer.mark('connect')
+        cursor.execute(query)
+        timer.mark('execute')
+        rows = cursor.fetchall()
+        timer.mark('fetch')
+        timer.finish(len(rows))
+    """
+
+    def __init__(self, query, operation='query'):
+        self.query = query
+        self.operation = operation
+        self.timings = {}
+        self._last = time.perf_counter()
+
+    def mark(self, phase):
+        """Tutup fase berjalan dan tambahkan durasinya ke `phase`"""
+        now = time.perf_counter()
+        self.timings[phase] = self.timings.get(phase, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    def finish(self, rows=0, error=None):
+        """
+        Catat ke agregat dan tulis log JSON jika lambat atau gagal
+
+        Args:
+            rows (int): Jumlah baris
+            error (Exception): Exception jika query gagal
+        """
+        query_fingerprint = fingerprint(self.query)
+        error_name = type(error).__name__ if error is not None else None
+        query_stats.record(query_fingerprint, self.timings, rows, error_name)
+
+        total_ms = sum(self.timings.values())
+        threshold = get_metrics_params()['slow_query_ms']
+        if error is None and total_ms < threshold:
+            return
+
+        record = {
+            'event': 'query_error' if error is not None else 'slow_query',
+            'operation': self.operation,
+            'fingerprint': query_fingerprint,
+            'total_ms': round(total_ms, 3),
+            'rows': rows
+        }
+        for phase, ms in self.timings.items():
+            record[f'{phase}_ms'] = round(ms, 3)
+        if error is not None:
+            record['error'] = error_name
+            record['message'] = str(error).strip()
+        slow_query_logger.warning(json.dumps(record))
+
+
+def dump_query_stats(top_n=20, key='total_ms'):
+    """
+    Tulis top-N query ke log sebagai satu baris JSON dan kembalikan datanya
+
+    Returns:
+        list: Hasil QueryStats.top()
+    """
+    top = query_stats.top(top_n, key)
+    slow_query_logger.info(json.dumps({
+        'event': 'query_stats',
+        'key': key,
+        'dropped': query_stats.dropped(),
+        'queries': [
+            {k: round(v, 3) if isinstance(v, float) else v for k, v in item.items()}
+            for item in top
+        ]
+    }))
+    return top
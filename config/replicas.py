@@ -0,0 +1,142 @@
+# config/replicas.py
+
+import threading
+import time
+
+from config.connection_pool import ConnectionPool, PoolTimeoutError
+
+
+class ReplicaRouter:
+    """
+    Routing query read-only ke replica secara round-robin
+
+    Replica yang gagal connect/validasi (atau koneksinya putus di tengah
+    query) ditandai down selama `retry_interval` detik, lalu dicoba lagi
+    pada checkout berikutnya. Pool replica yang sekadar penuh (timeout
+    checkout) tidak ditandai down; read pindah ke replica berikutnya atau
+    primary hanya untuk checkout itu. Key yang baru saja menulis (misalnya user_id)
+    di-pin ke primary selama `pin_seconds` supaya read-your-own-write
+    tidak membaca replica yang tertinggal.
+    """
+
+    def __init__(self, backends, pool_params, pin_seconds=5.0, retry_interval=10.0,
+                 checkout_timeout=1.0):
+        """
+        Args:
+            backends (list): Backend per replica (punya connect/validate)
+            pool_params (dict): Parameter ConnectionPool untuk setiap replica
+            pin_seconds (float): Lama read di-pin ke primary setelah write
+            retry_interval (float): Lama replica dianggap down setelah gagal
+            checkout_timeout (float): Timeout checkout ke replica sebelum
+                fallback ke replica lain / primary
+        """
+        params = dict(pool_params, timeout=checkout_timeout, min_size=0)
+        self.pools = [
+            ConnectionPool(backend.connect, validate_fn=backend.validate, **params)
+            for backend in backends
+        ]
+        self.pin_seconds = pin_seconds
+        self.retry_interval = retry_interval
+
+        self._lock = threading.Lock()
+        self._next = 0
+        self._down_until = [0.0] * len(self.pools)
+        self._pins = {}
+        self._stats = {
+            'replica_reads': 0,
+            'primary_fallbacks': 0,
+            'pinned_reads': 0,
+            'replica_failures': 0,
+            'replica_saturated': 0
+        }
+
+    def pin(self, key):
+        """Arahkan read milik `key` ke primary selama pin_seconds"""
+        if key is None or self.pin_seconds <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._pins[key] = now + self.pin_seconds
+            # Bersihkan pin kedaluwarsa supaya dict tidak tumbuh terus
+            if len(self._pins) > 10000:
+                self._pins = {k: t for k, t in self._pins.items() if t > now}
+
+    def is_pinned(self, key):
+        if key is None:
+            return False
+        with self._lock:
+            expires_at = self._pins.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._pins[key]
+                return False
+            self._stats['pinned_reads'] += 1
+            return True
+
+    def mark_down(self, pool):
+        """Tandai replica down sampai retry_interval berlalu"""
+        with self._lock:
+            index = self.pools.index(pool)
+            self._down_until[index] = time.monotonic() + self.retry_interval
+            self._stats['replica_failures'] += 1
+
+    def checkout(self):
+        """
+        Pinjam koneksi dari replica sehat berikutnya
+
+        Returns:
+            tuple: (pool, conn), atau (None, None) jika tidak ada replica
+                yang bisa dipakai dan pemanggil harus memakai primary
+        """
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.pools)
+            now = time.monotonic()
+            candidates = [
+                (start + offset) % len(self.pools)
+                for offset in range(len(self.pools))
+                if self._down_until[(start + offset) % len(self.pools)] <= now
+            ]
+
+        for index in candidates:
+            pool = self.pools[index]
+            try:
+                conn = pool.getconn()
+            except PoolTimeoutError:
+                # Pool penuh sesaat, replica-nya sendiri sehat
+                with self._lock:
+                    self._stats['replica_saturated'] += 1
+                continue
+            except Exception:
+                self.mark_down(pool)
+                continue
+            with self._lock:
+                self._stats['replica_reads'] += 1
+            return pool, conn
+
+        with self._lock:
+            self._stats['primary_fallbacks'] += 1
+        return None, None
+
+    def stats(self):
+        """
+        Statistik routing dan pool per replica
+
+        Returns:
+            dict: Counter routing, status tiap replica, dan jumlah pin aktif
+        """
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self._stats)
+            stats['active_pins'] = sum(1 for t in self._pins.values() if t > now)
+            down_until = list(self._down_until)
+        stats['replicas'] = [
+            dict(pool.stats(), healthy=down_until[i] <= now)
+            for i, pool in enumerate(self.pools)
+        ]
+        return stats
+
+    def closeall(self):
+        for pool in self.pools:
+            pool.closeall()
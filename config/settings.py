@@ -1,5 +1,7 @@
 # config/settings.py
 
+import os
+
 # Page Configuration
 PAGE_CONFIG = {
     "page_title": "KosBudget - Manajemen Keuangan Anak Kos",
@@ -43,6 +45,89 @@ SESSION_KEYS = {
     "USERS": "users",
     "CURRENT_PAGE": "current_page", 
     "MONTHLY_BUDGET": "monthly_budget",
-    "CATEGORIES": "categories",
-    "EXPENSES": "expenses"
-}
\ No newline at end of file
+    "BUDGET_STORE": "budget_store",
+    "ALLOCATION_ENGINE": "allocation_engine"
+}
+
+# User Record Cache (AuthService)
+USER_CACHE = {
+    "ttl": float(os.getenv("USER_CACHE_TTL", "300")),
+    "negative_ttl": float(os.getenv("USER_CACHE_NEGATIVE_TTL", "30")),
+    "max_size": int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+}
+
+# Password Hashing (PBKDF2-SHA256 di worker pool terbatas). Di production isi
+# PASSWORD_HASH_ITERATIONS dengan nilai yang sama di semua host; 0 berarti
+# dikalibrasi per proses dari PASSWORD_HASH_TARGET_MS
+PASSWORD_HASHING = {
+    "workers": int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    "max_pending": int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32")),
+    "queue_timeout": float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "2")),
+    "target_ms": float(os.getenv("PASSWORD_HASH_TARGET_MS", "100")),
+    "iterations": int(os.getenv("PASSWORD_HASH_ITERATIONS", "0")),
+    "min_iterations": int(os.getenv("PASSWORD_HASH_MIN_ITERATIONS", "100000"))
+}
+
+# Login Throttling (token bucket per username dan per client)
+LOGIN_THROTTLE = {
+    "username_rate": float(os.getenv("LOGIN_USERNAME_RATE_PER_MIN", "5")) / 60,
+    "username_burst": int(os.getenv("LOGIN_USERNAME_BURST", "5")),
+    "client_rate": float(os.getenv("LOGIN_CLIENT_RATE_PER_MIN", "20")) / 60,
+    "client_burst": int(os.getenv("LOGIN_CLIENT_BURST", "20")),
+    "max_concurrent": int(os.getenv("LOGIN_MAX_CONCURRENT", "8")),
+    "max_keys": int(os.getenv("LOGIN_THROTTLE_MAX_KEYS", "50000"))
+}
+
+# Identitas client di belakang reverse proxy: jumlah proxy tepercaya yang
+# menambahkan hop ke X-Forwarded-For (0 = abaikan header, pakai IP koneksi)
+CLIENT_IP = {
+    "trusted_proxies": int(os.getenv("TRUSTED_PROXY_COUNT", "0"))
+}
+
+# Server-side Session Store (token sesi yang bisa di-resume)
+SESSION_STORE = {
+    "ttl": float(os.getenv("SESSION_TTL", str(7 * 24 * 3600))),
+    "idle_ttl": float(os.getenv("SESSION_IDLE_TTL", str(24 * 3600))),
+    "max_size": int(os.getenv("SESSION_STORE_MAX_SIZE", "10000")),
+    "path": os.getenv("SESSION_STORE_PATH") or None,
+    "sweep_interval": float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+}
+
+# Memori per Session (accounting dan spill session idle ke file)
+SESSION_MEMORY = {
+    "idle_ttl": float(os.getenv("SESSION_SPILL_IDLE_SECONDS", "900")),
+    "max_mb": float(os.getenv("SESSION_MEMORY_MAX_MB", "512")),
+    "min_idle": float(os.getenv("SESSION_SPILL_MIN_IDLE_SECONDS", "60")),
+    "spill_path": os.getenv("SESSION_SPILL_PATH", ".session_spill/spill.sqlite3") or None,
+    "spill_ttl": float(os.getenv("SESSION_SPILL_TTL", str(7 * 24 * 3600))),
+    "sweep_interval": float(os.getenv("SESSION_MEMORY_SWEEP_INTERVAL", "60"))
+}
+
+# Write-behind Perubahan Budget (perubahan hilang paling lama WRITE_BEHIND_MAX_DELAY detik)
+WRITE_BEHIND = {
+    "max_delay": float(os.getenv("WRITE_BEHIND_MAX_DELAY", "2")),
+    "batch_size": int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500")),
+    "max_pending": int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000")),
+    "max_retries": int(os.getenv("WRITE_BEHIND_MAX_RETRIES", "5")),
+    "resolved_ttl": float(os.getenv("WRITE_BEHIND_RESOLVED_TTL", str(24 * 3600)))
+}
+
+# Cache DataFrame/Chart Dashboard (per user dan versi BudgetStore)
+FRAME_CACHE = {
+    "max_size": int(os.getenv("FRAME_CACHE_MAX_SIZE", "2000")),
+    "ttl": float(os.getenv("FRAME_CACHE_TTL", "3600"))
+}
+
+# Sharded Recompute Job (python manage.py recompute)
+RECOMPUTE = {
+    "workers": int(os.getenv("RECOMPUTE_WORKERS", str(os.cpu_count() or 1))),
+    "shard_size": int(os.getenv("RECOMPUTE_SHARD_SIZE", "10000")),
+    "checkpoint_path": os.getenv("RECOMPUTE_CHECKPOINT_PATH", ".recompute_checkpoint.json")
+}
+
+# Monte Carlo Overspend Forecast (Dashboard)
+OVERSPEND_FORECAST = {
+    "history_days": int(os.getenv("FORECAST_HISTORY_DAYS", "90")),
+    "paths": int(os.getenv("FORECAST_PATHS", "5000")),
+    "cache_size": int(os.getenv("FORECAST_CACHE_SIZE", "1000"))
+}
@@ -2,6 +2,7 @@
 
 import streamlit as st
 import os
+from html import escape
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -57,7 +58,7 @@ def render_dashboard():
     col1, col2 = st.columns([3, 1])
     with col1:
         st.markdown('<h1 class="title-gradient">🏠 KosBudget Dashboard</h1>', unsafe_allow_html=True)
-        st.markdown(f'<p style="color: white;">Selamat datang, **{user_data["username"]}**!</p>', unsafe_allow_html=True)
+        st.markdown(f'<p style="color: white;">Selamat datang, **{escape(user_data["username"])}**!</p>', unsafe_allow_html=True)
     
     with col2:
         if st.button("🚪 Logout", key="logout_btn"):
@@ -170,6 +171,8 @@ def render_settings():
                     new_password
                 )
                 if success:
+                    # Semua session user dicabut; session ini dapat token baru
+                    SessionManager.set_user_session(user_data)
                     st.success(message)
                 else:
                     st.error(message)
@@ -0,0 +1,121 @@
+# manage.py
+
+import argparse
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from config.migrations import MigrationRunner
+from services.batch_allocation import BatchAllocationJob
+from services.budget_repository import BudgetRepository
+from services.recompute_runner import RecomputeRunner
+
+
+def cmd_migrate(args):
+    """Terapkan migration schema yang belum jalan"""
+    success, result = MigrationRunner.migrate(target=args.target)
+    if not success:
+        print(f"❌ {result}")
+        return 1
+    if result:
+        print(f"✅ Migration diterapkan: {', '.join(map(str, result))}")
+    else:
+        print("✅ Schema sudah up to date")
+    return 0
+
+
+def cmd_rebuild_summary(args):
+    """Hitung ulang expense_monthly_summary dari tabel expenses"""
+    success, result = BudgetRepository.rebuild_monthly_summary(user_id=args.user_id)
+    if not success:
+        print(f"❌ {result}")
+        return 1
+    print(f"✅ Ringkasan bulanan dibangun ulang ({result} baris)")
+    return 0
+
+
+def cmd_allocate(args):
+    """Hitung ulang allocation kategori semua user (vectorized)"""
+    success, result = BatchAllocationJob.run(args.start_user_id, args.end_user_id)
+    if not success:
+        print(f"❌ {result}")
+        return 1
+    print(
+        f"✅ Allocation {result['categories']} kategori untuk {result['users']} user "
+        f"(load {result['load']:.2f}s, compute {result['compute']:.2f}s, write {result['write']:.2f}s)"
+    )
+    return 0
+
+
+def _print_progress(done, total, result, eta):
+    start, end = result['shard']
+    if result['ok']:
+        detail = (f"{result['users']} user, {result['expenses']} expense "
+                  f"dalam {result['elapsed']:.1f}s")
+    else:
+        detail = f"GAGAL: {result['error']}"
+    print(f"[{done}/{total}] shard user {start}-{end - 1}: {detail} (ETA {eta:.0f}s)")
+
+
+def cmd_recompute(args):
+    """Recompute allocation dan ringkasan bulanan semua user di beberapa process"""
+    runner = RecomputeRunner(
+        workers=args.workers,
+        shard_size=args.shard_size,
+        checkpoint_path=args.checkpoint,
+        progress=_print_progress
+    )
+    success, result = runner.run(resume=args.resume)
+    if not success:
+        print(f"❌ {result}")
+        return 1
+    if result['skipped']:
+        print(f"↪️  {result['skipped']} shard dilewati (sudah selesai di checkpoint)")
+    if result['failed']:
+        print(f"❌ {len(result['failed'])} dari {result['shards']} shard gagal; jalankan ulang dengan --resume")
+        return 1
+    print(
+        f"✅ {result['shards']} shard selesai: {result['users']} user, "
+        f"{result['expenses']} expense dalam {result['elapsed']:.1f}s"
+    )
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="KosBudget management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate = subparsers.add_parser("migrate", help="Terapkan migration schema database")
+    migrate.add_argument("--target", type=int, default=None, help="Versi migration terakhir yang diterapkan")
+    migrate.set_defaults(func=cmd_migrate)
+
+    rebuild = subparsers.add_parser("rebuild-summary", help="Bangun ulang ringkasan pengeluaran bulanan")
+    rebuild.add_argument("--user-id", type=int, default=None, help="Hanya untuk user ini (default semua user)")
+    rebuild.set_defaults(func=cmd_rebuild_summary)
+
+    allocate = subparsers.add_parser("allocate", help="Hitung ulang allocation kategori semua user")
+    allocate.add_argument("--start-user-id", type=int, default=None, help="User ID awal (inklusif)")
+    allocate.add_argument("--end-user-id", type=int, default=None, help="User ID akhir (eksklusif)")
+    allocate.set_defaults(func=cmd_allocate)
+
+    recompute = subparsers.add_parser(
+        "recompute", help="Recompute allocation dan ringkasan bulanan, dibagi per shard user"
+    )
+    recompute.add_argument("--workers", type=int, default=None, help="Jumlah worker process")
+    recompute.add_argument("--shard-size", type=int, default=None, help="Jumlah user ID per shard")
+    recompute.add_argument("--checkpoint", default=None, help="File checkpoint per shard")
+    recompute.add_argument("--resume", action="store_true", help="Lewati shard yang sudah selesai")
+    recompute.set_defaults(func=cmd_recompute)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
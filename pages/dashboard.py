@@ -1,9 +1,17 @@
 import streamlit as st
 import pandas as pd
-from utils.calculations import calculate_decision_score, calculate_allocation
-from utils.state_manager import initialize_session_state
+from html import escape
+from urllib.parse import quote
+from utils.calculations import calculate_decision_score, calculate_allocation, get_financial_summary
+from utils.state_manager import initialize_session_state, session_scope, SessionManager
+from utils.budget_store import get_budget_store
+from utils.frame_cache import memoize_frame
+from services.write_behind import write_behind
+from services.overspend_forecast import OverspendForecast
+from datetime import date, datetime
 from components.charts import render_expense_chart
 
+@session_scope
 def render_dashboard():
     """Render the dashboard page"""
     initialize_session_state()
@@ -11,7 +19,7 @@ def render_dashboard():
     st.markdown('<h1 class="title-gradient">📊 Dashboard Keuangan</h1>', unsafe_allow_html=True)
     st.markdown(
         f'<p style="font-size: 1.2rem; color: black; margin-bottom: 2rem;">'
-        f'Halo, <strong>{st.session_state.username}</strong> 👋, berikut ringkasan keuanganmu</p>', 
+        f'Halo, <strong>{escape(st.session_state.username or "")}</strong> 👋, berikut ringkasan keuanganmu</p>', 
         unsafe_allow_html=True
     )
 
@@ -33,20 +41,28 @@ def render_dashboard():
 def render_user_avatar():
     """Render user avatar"""
     st.markdown(
-        f'<img class="avatar" src="https://ui-avatars.com/api/?name={st.session_state.username}'
+        f'<img class="avatar" src="https://ui-avatars.com/api/?name={quote(st.session_state.username or "")}'
         f'&background=667eea&color=fff&size=50" alt="avatar">', 
         unsafe_allow_html=True
     )
 
 def render_summary_metrics():
     """Render summary metrics cards"""
-    if not st.session_state.categories:
+    if not get_budget_store().categories:
         st.info("📝 Belum ada kategori. Silakan buat kategori terlebih dahulu di Form Input.")
         return
     
-    total_allocated = sum([cat['allocation'] for cat in st.session_state.categories])
-    total_spent = sum([cat['spent'] for cat in st.session_state.categories])
-    remaining_budget = st.session_state.monthly_budget - total_spent
+    # Totals come from the monthly summary table (O(categories) rows); cached
+    # per store version, write-behind generation, budget and month so reruns
+    # without changes skip the query
+    user_id = SessionManager.get_user_id()
+    summary = memoize_frame(
+        'summary', lambda: get_financial_summary(user_id),
+        write_behind.generation(user_id), st.session_state.monthly_budget, date.today().replace(day=1)
+    )
+    total_allocated = summary['total_allocated']
+    total_spent = summary['total_spent']
+    remaining_budget = summary['remaining_budget']
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -97,10 +113,11 @@ def render_add_expense_section():
         col1, col2 = st.columns(2)
         
         with col1:
-            if st.session_state.categories:
+            category_names = get_budget_store().category_names()
+            if category_names:
                 selected_category = st.selectbox(
                     "📂 Pilih Kategori", 
-                    [c['name'] for c in st.session_state.categories]
+                    category_names
                 )
             else:
                 st.warning("⚠️ Belum ada kategori. Silakan buat kategori terlebih dahulu di Form Input.")
@@ -122,41 +139,81 @@ def render_add_expense_section():
 
 def handle_expense_submission(selected_category, amount_spent):
     """Handle expense form submission"""
-    st.session_state.expenses.append({
-        'category': selected_category,
-        'amount': amount_spent
-    })
+    store = get_budget_store()
+    category_id = store.find_category(selected_category)['category_id']
+    spent_at = datetime.now()
+    
+    # Disimpan lewat antrian write-behind; expense_id negatif adalah id sementara
+    # yang dipetakan ke id database saat flush (WriteBehindQueue.delete_expense)
+    expense_id = None
+    user_id = SessionManager.get_user_id()
+    if user_id is not None and category_id is not None:
+        success, result = write_behind.add_expense(user_id, category_id, amount_spent, spent_at)
+        if not success:
+            st.markdown(f'<div class="error-message">❌ Gagal menyimpan pengeluaran: {escape(str(result))}</div>', unsafe_allow_html=True)
+            return
+        expense_id = result
+    
+    store.add_expense(selected_category, amount_spent, spent_at, expense_id)
     calculate_allocation()
     st.markdown(
         f'<div class="success-message">✅ Pengeluaran Rp{amount_spent:,.0f} '
-        f'untuk kategori "{selected_category}" ditambahkan.</div>', 
+        f'untuk kategori "{escape(selected_category)}" ditambahkan.</div>', 
         unsafe_allow_html=True
     )
 
 def render_charts_section():
     """Render charts and analysis section"""
-    if not st.session_state.categories:
+    categories = get_budget_store().categories
+    if not categories:
         return
         
     st.markdown('<div class="category-card">', unsafe_allow_html=True)
     st.markdown('<h3 class="subtitle-gradient">📈 Grafik Pengeluaran vs Alokasi</h3>', unsafe_allow_html=True)
     
     # Use chart component
-    render_expense_chart(st.session_state.categories)
+    render_expense_chart()
     
     st.markdown('</div>', unsafe_allow_html=True)
 
 def render_detailed_breakdown():
     """Render detailed financial breakdown"""
-    if not st.session_state.categories:
+    categories = get_budget_store().categories
+    if not categories:
         return
         
     st.markdown('<div class="category-card">', unsafe_allow_html=True)
     st.markdown('<h3 class="subtitle-gradient">💼 Detail Keuangan & Analisis Decision</h3>', unsafe_allow_html=True)
     
+    # Dibangun ulang hanya jika versi budget store berubah (forecast juga per hari)
+    df_enhanced, df_display_enhanced = memoize_frame(
+        'breakdown', lambda: build_detailed_breakdown(categories), date.today()
+    )
+    st.dataframe(df_display_enhanced, use_container_width=True)
+    
+    # Render insights
+    render_financial_insights(df_enhanced)
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+
+def build_detailed_breakdown(categories):
+    """
+    Build detailed breakdown rows and dataframe
+    
+    Returns:
+        tuple: (list of row dicts, DataFrame)
+    """
+    # Forecast overspend akhir bulan (Monte Carlo, di-cache per user per hari)
+    forecast = {}
+    user_id = SessionManager.get_user_id()
+    if user_id is not None:
+        success, result = OverspendForecast.get_forecast(user_id, categories)
+        if success:
+            forecast = result
+    
     # Enhanced dataframe with decision scores
     df_enhanced = []
-    for cat in st.session_state.categories:
+    for cat in categories:
         decision_score = calculate_decision_score(
             cat.get('urgency', 3) / 5.0,
             cat.get('frequency', 3) / 5.0,
@@ -167,7 +224,7 @@ def render_detailed_breakdown():
         persentase = (cat['spent'] / cat['allocation'] * 100) if cat['allocation'] > 0 else 0
         status = '✅ Aman' if sisa >= 0 else '⚠️ Over Budget'
         
-        df_enhanced.append({
+        row = {
             '📂 Kategori': cat['name'],
             '🎯 Decision Score': f"{decision_score:.1f}%",
             '💰 Alokasi (Rp)': cat['allocation'],
@@ -175,15 +232,14 @@ def render_detailed_breakdown():
             '💵 Sisa (Rp)': sisa,
             '📊 Persentase (%)': f"{persentase:.1f}%",
             '🔍 Status': status
-        })
-    
-    df_display_enhanced = pd.DataFrame(df_enhanced)
-    st.dataframe(df_display_enhanced, use_container_width=True)
-    
-    # Render insights
-    render_financial_insights(df_enhanced)
+        }
+        risk = forecast.get(cat['name'])
+        if risk is not None:
+            row['🎲 Peluang Over Akhir Bulan'] = f"{risk['probability'] * 100:.0f}%"
+            row['📉 Ekspektasi Kelebihan (Rp)'] = round(risk['expected_overshoot'])
+        df_enhanced.append(row)
     
-    st.markdown('</div>', unsafe_allow_html=True)
+    return df_enhanced, pd.DataFrame(df_enhanced)
 
 def render_financial_insights(df_enhanced):
     """Render financial insights based on data"""
@@ -202,6 +258,17 @@ def render_financial_insights(df_enhanced):
     else:
         st.markdown(f'⚠️ {over_budget_count} dari {total_categories} kategori melebihi budget yang dialokasikan.')
     
+    # Kategori dengan risiko overspend tertinggi (jika forecast tersedia)
+    risky = [item for item in df_enhanced if '🎲 Peluang Over Akhir Bulan' in item]
+    if risky:
+        riskiest = max(risky, key=lambda x: float(x['🎲 Peluang Over Akhir Bulan'].replace('%', '')))
+        if riskiest['🎲 Peluang Over Akhir Bulan'] != '0%':
+            st.markdown(
+                f'🎲 Risiko over budget tertinggi di akhir bulan: **{riskiest["📂 Kategori"]}** '
+                f'({riskiest["🎲 Peluang Over Akhir Bulan"]}, rata-rata kelebihan '
+                f'Rp {riskiest["📉 Ekspektasi Kelebihan (Rp)"]:,.0f})'
+            )
+    
     # Find highest decision score category
     highest_score_cat = max(df_enhanced, key=lambda x: float(x['🎯 Decision Score'].replace('%', '')))
     st.markdown(f'🎯 Kategori dengan Decision Score tertinggi: **{highest_score_cat["📂 Kategori"]}** ({highest_score_cat["🎯 Decision Score"]})')
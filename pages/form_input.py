@@ -1,8 +1,19 @@
 import streamlit as st
-from utils.calculations import calculate_decision_score, calculate_allocation
-from utils.state_manager import initialize_session_state
+from html import escape
+from utils.calculations import (
+    calculate_decision_score, calculate_allocation, get_allocation_engine, rescale_allocation
+)
+from utils.state_manager import initialize_session_state, session_scope, SessionManager
+from utils.budget_store import get_budget_store
+from utils.frame_cache import memoize_frame
+from services.budget_repository import BudgetRepository
+from services.write_behind import write_behind
+from utils.weight_simulator import (
+    allocation_shift_distribution, current_weights, simulate_allocations, weight_grid
+)
 import pandas as pd
 
+@session_scope
 def render_form_input():
     """Render the form input page"""
     initialize_session_state()
@@ -21,18 +32,29 @@ def render_form_input():
     
     # Categories display with decision scores
     render_categories_display()
+    
+    # What-if simulation of decision/score weights
+    render_weight_simulator()
 
 def render_budget_input():
     """Render budget input section"""
     st.markdown('<div class="category-card">', unsafe_allow_html=True)
     st.markdown('<h3 class="subtitle-gradient">💰 Uang Bulanan</h3>', unsafe_allow_html=True)
-    st.session_state.monthly_budget = st.number_input(
+    monthly_budget = st.number_input(
         "💵 Masukkan uang bulanan Anda (Rp)", 
         min_value=0, 
         step=10000, 
         value=st.session_state.monthly_budget,
         help="Masukkan total uang bulanan yang Anda terima"
     )
+    if monthly_budget != st.session_state.monthly_budget:
+        user_id = SessionManager.get_user_id()
+        if user_id is not None:
+            success, result = write_behind.set_monthly_budget(user_id, monthly_budget)
+            if not success:
+                st.markdown(f'<div class="error-message">❌ Gagal menyimpan budget: {escape(str(result))}</div>', unsafe_allow_html=True)
+        st.session_state.monthly_budget = monthly_budget
+        rescale_allocation()
     st.markdown('</div>', unsafe_allow_html=True)
 
 def render_decision_info():
@@ -75,44 +97,72 @@ def render_category_form():
 
 def handle_category_submission(cat_name, cat_priority, cat_urgency, cat_frequency, cat_impact):
     """Handle category form submission"""
-    # Check if category exists
-    category_exists = False
-    for cat in st.session_state.categories:
-        if cat['name'] == cat_name:
-            cat['priority'] = cat_priority
-            cat['urgency'] = cat_urgency
-            cat['frequency'] = cat_frequency
-            cat['impact'] = cat_impact
-            category_exists = True
-            break
-    
-    if not category_exists:
-        st.session_state.categories.append({
-            'name': cat_name,
-            'priority': cat_priority,
-            'urgency': cat_urgency,
-            'frequency': cat_frequency,
-            'impact': cat_impact,
-            'allocation': 0,
-            'spent': 0,
-            'combined_score': 0
-        })
+    store = get_budget_store()
+    cat = store.find_category(cat_name)
+    category_exists = cat is not None
+    
+    # Kategori baru ditulis langsung (butuh category_id); perubahan kategori
+    # yang sudah tersimpan lewat antrian write-behind
+    category_id = cat['category_id'] if category_exists else None
+    user_id = SessionManager.get_user_id()
+    if user_id is not None:
+        if category_id is not None:
+            success, result = write_behind.update_category(
+                user_id, category_id, cat_priority, cat_urgency, cat_frequency, cat_impact
+            )
+        else:
+            success, result = BudgetRepository.upsert_category(
+                user_id, cat_name, cat_priority, cat_urgency, cat_frequency, cat_impact
+            )
+        if not success:
+            st.markdown(f'<div class="error-message">❌ Gagal menyimpan kategori: {escape(str(result))}</div>', unsafe_allow_html=True)
+            return
+        if category_id is None:
+            category_id = result
+    
+    if category_exists:
+        cat['category_id'] = category_id
+        cat['priority'] = cat_priority
+        cat['urgency'] = cat_urgency
+        cat['frequency'] = cat_frequency
+        cat['impact'] = cat_impact
+    else:
+        store.add_category(
+            cat_name, cat_priority, cat_urgency, cat_frequency, cat_impact, category_id=category_id
+        )
     
     calculate_allocation()
     action = "diperbarui" if category_exists else "ditambahkan"
-    st.markdown(f'<div class="success-message">✅ Kategori "{cat_name}" berhasil {action}.</div>', unsafe_allow_html=True)
+    st.markdown(f'<div class="success-message">✅ Kategori "{escape(cat_name)}" berhasil {action}.</div>', unsafe_allow_html=True)
 
 def render_categories_display():
     """Render categories display with decision scores"""
-    if not st.session_state.categories:
+    categories = get_budget_store().categories
+    if not categories:
         return
         
     st.markdown('<div class="category-card">', unsafe_allow_html=True)
     st.markdown('<h3 class="subtitle-gradient">📋 Daftar Kategori & Analisis Decision</h3>', unsafe_allow_html=True)
     
-    # Create detailed dataframe
+    # DataFrame dibangun ulang hanya jika versi budget store berubah
+    df_display = memoize_frame('categories', lambda: build_categories_frame(categories))
+    st.dataframe(df_display, use_container_width=True)
+    
+    # Show allocation explanation
+    render_allocation_explanation()
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Rename category section
+    render_rename_category_section()
+    
+    # Delete category section
+    render_delete_category_section()
+
+def build_categories_frame(categories):
+    """Build categories dataframe with decision scores"""
     df_categories = []
-    for cat in st.session_state.categories:
+    for cat in categories:
         decision_score = calculate_decision_score(
             cat.get('urgency', 3) / 5.0,
             cat.get('frequency', 3) / 5.0,
@@ -129,16 +179,7 @@ def render_categories_display():
             '💰 Alokasi (Rp)': f"Rp {cat['allocation']:,.0f}"
         })
     
-    df_display = pd.DataFrame(df_categories)
-    st.dataframe(df_display, use_container_width=True)
-    
-    # Show allocation explanation
-    render_allocation_explanation()
-    
-    st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Delete category section
-    render_delete_category_section()
+    return pd.DataFrame(df_categories)
 
 def render_allocation_explanation():
     """Render allocation calculation explanation"""
@@ -151,27 +192,126 @@ def render_allocation_explanation():
     ''', unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
+def render_rename_category_section():
+    """Render rename category section"""
+    store = get_budget_store()
+    if not store.categories:
+        return
+    
+    with st.expander("✏️ Ganti Nama Kategori"):
+        cat_to_rename = st.selectbox(
+            "Pilih kategori yang ingin diganti namanya",
+            store.category_names(),
+            key="rename_cat_select"
+        )
+        new_name = st.text_input("🏷️ Nama Baru", key="rename_cat_name").strip()
+        if st.button("✏️ Ganti Nama", key="rename_cat") and new_name and new_name != cat_to_rename:
+            if store.find_category(new_name) is not None:
+                st.markdown(f'<div class="error-message">❌ Kategori "{escape(new_name)}" sudah ada.</div>', unsafe_allow_html=True)
+                return
+            
+            user_id = SessionManager.get_user_id()
+            category_id = store.find_category(cat_to_rename)['category_id']
+            if user_id is not None and category_id is not None:
+                success, result = BudgetRepository.rename_category(user_id, category_id, new_name)
+                if not success:
+                    st.markdown(f'<div class="error-message">❌ Gagal mengganti nama kategori: {escape(str(result))}</div>', unsafe_allow_html=True)
+                    return
+            
+            # Pengeluaran menunjuk kode kategori, jadi cukup nama di index yang diganti
+            store.rename_category(cat_to_rename, new_name)
+            get_allocation_engine().rename_category(cat_to_rename, new_name)
+            st.markdown(
+                f'<div class="success-message">✅ Kategori "{escape(cat_to_rename)}" diganti menjadi "{escape(new_name)}".</div>', 
+                unsafe_allow_html=True
+            )
+
 def render_delete_category_section():
     """Render delete category section"""
-    if not st.session_state.categories:
+    store = get_budget_store()
+    if not store.categories:
         return
         
     with st.expander("🗑️ Hapus Kategori"):
         cat_to_delete = st.selectbox(
             "Pilih kategori yang ingin dihapus", 
-            [cat['name'] for cat in st.session_state.categories]
+            store.category_names()
         )
         if st.button("🗑️ Hapus Kategori", key="delete_cat"):
-            st.session_state.categories = [
-                cat for cat in st.session_state.categories 
-                if cat['name'] != cat_to_delete
-            ]
-            st.session_state.expenses = [
-                e for e in st.session_state.expenses 
-                if e['category'] != cat_to_delete
-            ]
+            user_id = SessionManager.get_user_id()
+            category_id = store.find_category(cat_to_delete)['category_id']
+            if user_id is not None and category_id is not None:
+                # Perubahan antrian untuk kategori ini tidak perlu ditulis lagi
+                write_behind.discard_category(user_id, category_id)
+                success, result = BudgetRepository.delete_category(user_id, category_id)
+                if not success:
+                    st.markdown(f'<div class="error-message">❌ Gagal menghapus kategori: {escape(str(result))}</div>', unsafe_allow_html=True)
+                    return
+            
+            store.remove_category(cat_to_delete)
+            get_allocation_engine().remove_category(cat_to_delete)
             calculate_allocation()
             st.markdown(
-                f'<div class="success-message">✅ Kategori "{cat_to_delete}" berhasil dihapus.</div>', 
+                f'<div class="success-message">✅ Kategori "{escape(cat_to_delete)}" berhasil dihapus.</div>', 
                 unsafe_allow_html=True
-            )
\ No newline at end of file
+            )
+
+def render_weight_simulator():
+    """Render what-if panel: allocation jika bobot decision/score diubah"""
+    categories = get_budget_store().categories
+    if not categories:
+        return
+    
+    monthly_budget = st.session_state.monthly_budget
+    decision_weights, priority_share = current_weights()
+    
+    with st.expander("🧪 Simulasi Bobot (What-if)"):
+        st.markdown('Geser bobot untuk melihat pergeseran alokasi tanpa mengubah `config/settings.py`.')
+        col1, col2 = st.columns(2)
+        with col1:
+            urgency = st.slider("🚨 Bobot Urgensi (%)", 0, 100, int(round(decision_weights[0] * 100)), key="sim_urgency")
+            frequency = st.slider("🔄 Bobot Frekuensi (%)", 0, 100, int(round(decision_weights[1] * 100)), key="sim_frequency")
+            impact = st.slider("💥 Bobot Dampak (%)", 0, 100, int(round(decision_weights[2] * 100)), key="sim_impact")
+        with col2:
+            priority = st.slider(
+                "⭐ Porsi Prioritas vs Decision (%)", 0, 100, int(round(priority_share * 100)),
+                key="sim_priority", help="Sisa persentase dipakai untuk Decision Score"
+            )
+        
+        total = urgency + frequency + impact
+        if total == 0:
+            st.warning("Minimal satu bobot decision harus lebih dari 0")
+            return
+        st.caption(
+            f"Bobot decision dinormalisasi: urgensi {urgency / total:.0%}, "
+            f"frekuensi {frequency / total:.0%}, dampak {impact / total:.0%}"
+        )
+        
+        simulated = simulate_allocations(
+            categories, monthly_budget, [(urgency / total, frequency / total, impact / total)], priority / 100
+        )[0]
+        st.dataframe(pd.DataFrame([
+            {
+                '📂 Kategori': cat['name'],
+                '💰 Alokasi Saat Ini (Rp)': f"Rp {cat['allocation']:,.0f}",
+                '🧪 Alokasi Simulasi (Rp)': f"Rp {simulated[i]:,.0f}",
+                '↕️ Selisih (Rp)': f"Rp {simulated[i] - cat['allocation']:+,.0f}"
+            }
+            for i, cat in enumerate(categories)
+        ]), use_container_width=True)
+        
+        if st.checkbox("📊 Tampilkan sensitivitas semua kombinasi bobot", key="sim_grid"):
+            grid = weight_grid()
+            st.caption(f"Pergeseran alokasi terhadap bobot aktif untuk {len(grid[1]):,} kombinasi bobot")
+            st.dataframe(pd.DataFrame([
+                {
+                    '📂 Kategori': row['name'],
+                    'Rata-rata': f"Rp {row['mean']:+,.0f}",
+                    'P5': f"Rp {row['p5']:+,.0f}",
+                    'Median': f"Rp {row['p50']:+,.0f}",
+                    'P95': f"Rp {row['p95']:+,.0f}",
+                    'Min': f"Rp {row['min']:+,.0f}",
+                    'Max': f"Rp {row['max']:+,.0f}"
+                }
+                for row in allocation_shift_distribution(categories, monthly_budget, *grid)
+            ]), use_container_width=True)
@@ -1,25 +1,45 @@
 # services/auth_service.py
 
-import hashlib
+import re
+import threading
 import streamlit as st
 from config.database import DatabaseManager
+from services.login_throttle import login_throttle
+from services.password_hasher import HasherBusyError, password_hasher
+from services.session_store import session_store
+from services.user_cache import user_cache
 from datetime import datetime
 
+# Username hanya huruf, angka, titik, garis bawah dan tanda hubung (3-32 karakter)
+USERNAME_PATTERN = re.compile(r'[A-Za-z0-9_.-]{3,32}')
+
+# ON CONFLICT (username) di register_user butuh unique index ini; dibuat
+# sekali per proses (idempoten, sama dengan migration 1) supaya registrasi
+# tetap jalan di database lama yang belum pernah di-migrate
+USERNAME_INDEX_DDL = "CREATE UNIQUE INDEX IF NOT EXISTS users_username_key ON users (username)"
+_username_index_ready = False
+_username_index_lock = threading.Lock()
+
 class AuthService:
     """Service untuk handle authentication dan user management"""
     
     @staticmethod
     def hash_password(password):
         """
-        Hash password menggunakan SHA-256
+        Hash password dengan PBKDF2-SHA256 (salt acak, iterasi terkalibrasi)
+        
+        Hashing berjalan di worker pool terbatas (services/password_hasher.py).
         
         Args:
             password (str): Plain text password
             
         Returns:
             str: Hashed password
+            
+        Raises:
+            HasherBusyError: Jika antrian hashing penuh
         """
-        return hashlib.sha256(password.encode()).hexdigest()
+        return password_hasher.hash(password)
     
     @staticmethod
     def verify_password(password, hashed_password):
@@ -33,7 +53,131 @@ class AuthService:
         Returns:
             bool: True jika password cocok
         """
-        return AuthService.hash_password(password) == hashed_password
+        return password_hasher.verify(password, hashed_password)[0]
+    
+    @staticmethod
+    def _rehash_password(record, password):
+        """
+        Ganti hash lama (SHA-256 atau iterasi rendah) setelah login berhasil
+        
+        UPDATE hanya berlaku jika hash di database belum berubah, jadi tidak
+        menimpa password yang baru saja diganti dari session lain.
+        """
+        try:
+            new_hash = AuthService.hash_password(password)
+        except HasherBusyError:
+            return  # Coba lagi di login berikutnya
+        success, result = DatabaseManager.execute_query(
+            "UPDATE users SET password = %s, updated_at = %s WHERE user_id = %s AND password = %s",
+            (new_hash, datetime.now(), record['user_id'], record['password']),
+            pin_key=record['user_id']
+        )
+        if success:
+            password_hasher.record_rehash()
+            AuthService.invalidate_user(user_id=record['user_id'], username=record['username'])
+    
+    @staticmethod
+    def get_hasher_stats():
+        """
+        Statistik antrian password hashing (queue depth, waktu tunggu, reject)
+        
+        Returns:
+            dict: Statistik dari PasswordHasher
+        """
+        return password_hasher.stats()
+    
+    @staticmethod
+    def get_throttle_stats():
+        """
+        Statistik login throttling (ditolak per username/client, di-shed)
+        
+        Returns:
+            dict: Statistik dari LoginThrottle
+        """
+        return login_throttle.stats()
+    
+    @staticmethod
+    def _cache_user(record):
+        """Simpan record user di cache dengan key id dan username"""
+        user_cache.set(('id', record['user_id']), record)
+        user_cache.set(('username', record['username']), record)
+    
+    @staticmethod
+    def _load_user(column, value):
+        """
+        Read-through lookup record user (termasuk password hash)
+        
+        Args:
+            column (str): 'id' atau 'username'
+            value: user_id atau username
+            
+        Returns:
+            tuple: (success, record/None atau error_message)
+        """
+        hit, record = user_cache.get((column, value))
+        if hit:
+            return True, record
+        
+        where = "user_id" if column == 'id' else "username"
+        query = f"SELECT user_id, username, password, created_at FROM users WHERE {where} = %s"
+        # Lookup by username dipakai login, jadi tetap di primary supaya user
+        # yang baru register tidak ditolak karena replica tertinggal
+        readonly = column == 'id'
+        success, result = DatabaseManager.execute_query(
+            query, (value,), fetch=True, readonly=readonly,
+            pin_key=value if readonly else None
+        )
+        
+        if not success:
+            return False, result
+        
+        if not result:
+            # Negative caching supaya login dengan username salah tidak ke DB lagi
+            user_cache.set((column, value), None)
+            return True, None
+        
+        record = dict(result[0])
+        AuthService._cache_user(record)
+        return True, record
+    
+    @staticmethod
+    def invalidate_user(user_id=None, username=None):
+        """Hapus record user dari cache setelah ada perubahan di tabel users"""
+        keys = []
+        if user_id is not None:
+            keys.append(('id', user_id))
+        if username is not None:
+            keys.append(('username', username))
+        user_cache.delete(*keys)
+    
+    @staticmethod
+    def get_cache_stats():
+        """
+        Statistik cache user (hit, miss, eviction)
+        
+        Returns:
+            dict: Statistik dari TTLCache
+        """
+        return user_cache.stats()
+    
+    @staticmethod
+    def _ensure_username_index():
+        """
+        Pastikan unique index users.username ada (sekali per proses)
+        
+        Returns:
+            tuple: (success, message)
+        """
+        global _username_index_ready
+        if _username_index_ready:
+            return True, None
+        with _username_index_lock:
+            if not _username_index_ready:
+                success, result = DatabaseManager.execute_query(USERNAME_INDEX_DDL)
+                if not success:
+                    return False, result
+                _username_index_ready = True
+        return True, None
     
     @staticmethod
     def register_user(username, password):
@@ -54,47 +198,61 @@ class AuthService:
         if len(username) < 3:
             return False, "Username minimal 3 karakter"
         
+        if not USERNAME_PATTERN.fullmatch(username):
+            return False, "Username maksimal 32 karakter dan hanya boleh berisi huruf, angka, titik, garis bawah atau tanda hubung"
+        
         if len(password) < 6:
             return False, "Password minimal 6 karakter"
         
-        # Cek apakah username sudah ada
-        check_query = "SELECT user_id FROM users WHERE username = %s"
-        success, result = DatabaseManager.execute_query(check_query, (username,), fetch=True)
-        
+        success, message = AuthService._ensure_username_index()
         if not success:
-            return False, f"Error checking username: {result}"
-        
-        if result:  # Username sudah ada
-            return False, "Username sudah digunakan"
+            return False, f"Error registrasi: {message}"
         
         # Hash password
-        hashed_password = AuthService.hash_password(password)
+        try:
+            hashed_password = AuthService.hash_password(password)
+        except HasherBusyError as e:
+            return False, str(e)
         
-        # Insert user baru
+        # Insert user baru dalam satu round trip; ON CONFLICT memakai unique
+        # index pada users.username sehingga tidak ada race antara cek dan insert
         insert_query = """
             INSERT INTO users (username, password, created_at, updated_at) 
             VALUES (%s, %s, %s, %s)
+            ON CONFLICT (username) DO NOTHING
+            RETURNING user_id
         """
         current_time = datetime.now()
         
         success, result = DatabaseManager.execute_query(
             insert_query, 
-            (username, hashed_password, current_time, current_time)
+            (username, hashed_password, current_time, current_time),
+            fetch=True
         )
         
-        if success:
-            return True, "Registrasi berhasil! Silakan login."
-        else:
+        if not success:
             return False, f"Error registrasi: {result}"
+        
+        if not result:  # Username sudah ada
+            return False, "Username sudah digunakan"
+        
+        # Buang negative entry untuk username ini
+        AuthService.invalidate_user(user_id=result['user_id'], username=username)
+        
+        return True, "Registrasi berhasil! Silakan login."
     
     @staticmethod
-    def authenticate_user(username, password):
+    def authenticate_user(username, password, client_id=None):
         """
         Authenticate user login
         
+        Percobaan login dibatasi per username dan per client; yang ditolak
+        throttle tidak menyentuh database maupun password hasher.
+        
         Args:
             username (str): Username
             password (str): Plain text password
+            client_id (str): Identitas client (IP atau session) untuk throttling
             
         Returns:
             tuple: (success, message, user_data)
@@ -103,20 +261,39 @@ class AuthService:
         if not username or not password:
             return False, "Username dan password tidak boleh kosong", None
         
-        # Cari user di database
-        query = "SELECT user_id, username, password FROM users WHERE username = %s"
-        success, result = DatabaseManager.execute_query(query, (username,), fetch=True)
+        allowed, message = login_throttle.acquire(username, client_id)
+        if not allowed:
+            return False, message, None
+        
+        success = False
+        try:
+            success, message, user_info = AuthService._authenticate(username, password)
+            return success, message, user_info
+        finally:
+            login_throttle.release(username, succeeded=success)
+    
+    @staticmethod
+    def _authenticate(username, password):
+        """Lookup user dan verifikasi password (setelah lolos throttle)"""
+        # Cari user di cache, lalu database
+        success, user_data = AuthService._load_user('username', username)
         
         if not success:
-            return False, f"Error database: {result}", None
+            return False, f"Error database: {user_data}", None
         
-        if not result:  # User tidak ditemukan
+        if not user_data:  # User tidak ditemukan
             return False, "Username atau password salah", None
         
-        user_data = result[0]  # result adalah list of dict
-        
         # Verify password
-        if AuthService.verify_password(password, user_data['password']):
+        try:
+            matched, needs_rehash = password_hasher.verify(password, user_data['password'])
+        except HasherBusyError as e:
+            return False, str(e), None
+        
+        if matched:
+            if needs_rehash:
+                AuthService._rehash_password(user_data, password)
+            
             # Login berhasil
             user_info = {
                 'user_id': user_data['user_id'],
@@ -137,11 +314,14 @@ class AuthService:
         Returns:
             tuple: (success, user_data)
         """
-        query = "SELECT user_id, username, created_at FROM users WHERE user_id = %s"
-        success, result = DatabaseManager.execute_query(query, (user_id,), fetch=True)
+        success, record = AuthService._load_user('id', user_id)
         
-        if success and result:
-            return True, result[0]
+        if success and record:
+            return True, {
+                'user_id': record['user_id'],
+                'username': record['username'],
+                'created_at': record['created_at']
+            }
         else:
             return False, None
     
@@ -162,29 +342,47 @@ class AuthService:
         if len(new_password) < 6:
             return False, "Password baru minimal 6 karakter"
         
-        # Get current password hash
-        query = "SELECT password FROM users WHERE user_id = %s"
-        success, result = DatabaseManager.execute_query(query, (user_id,), fetch=True)
+        # Hash lama dibaca dari primary tanpa lock; verifikasi dan hashing
+        # berjalan di luar transaksi supaya koneksi dan lock baris tidak
+        # ditahan selama PBKDF2 atau selama menunggu worker pool
+        success, rows = DatabaseManager.execute_query(
+            "SELECT username, password FROM users WHERE user_id = %s",
+            (user_id,), fetch=True, pin_key=user_id
+        )
+        if not success:
+            return False, f"Error mengubah password: {rows}"
         
-        if not success or not result:
+        if not rows:
             return False, "User tidak ditemukan"
+        row = rows[0]
         
-        current_hash = result[0]['password']
-        
-        # Verify old password
-        if not AuthService.verify_password(old_password, current_hash):
-            return False, "Password lama salah"
-        
-        # Update password
-        new_hash = AuthService.hash_password(new_password)
-        update_query = "UPDATE users SET password = %s, updated_at = %s WHERE user_id = %s"
+        try:
+            # Verify old password
+            if not AuthService.verify_password(old_password, row['password']):
+                return False, "Password lama salah"
+            new_hash = AuthService.hash_password(new_password)
+        except HasherBusyError as e:
+            return False, str(e)
         
+        # Compare-and-swap: gagal jika password diganti session lain sejak dibaca
         success, result = DatabaseManager.execute_query(
-            update_query, 
-            (new_hash, datetime.now(), user_id)
+            """
+            UPDATE users SET password = %s, updated_at = %s
+            WHERE user_id = %s AND password = %s
+            RETURNING user_id
+            """,
+            (new_hash, datetime.now(), user_id, row['password']),
+            fetch=True, pin_key=user_id
         )
+        if not success:
+            return False, f"Error mengubah password: {result}"
         
-        if success:
-            return True, "Password berhasil diubah"
-        else:
-            return False, f"Error mengubah password: {result}"
\ No newline at end of file
+        if not result:
+            return False, "Password baru saja diubah dari session lain, silakan coba lagi"
+        
+        # Hash lama tidak boleh dipakai lagi oleh authenticate_user, dan
+        # token session yang sudah beredar tidak boleh bertahan
+        AuthService.invalidate_user(user_id=user_id, username=row['username'])
+        session_store.revoke_user(user_id)
+        
+        return True, "Password berhasil diubah"
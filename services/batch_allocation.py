@@ -0,0 +1,165 @@
+# services/batch_allocation.py
+
+import time
+from datetime import datetime
+
+import numpy as np
+
+from config.database import DatabaseManager
+from config.settings import DECISION_WEIGHTS, SCORE_WEIGHTS
+
+ALLOCATION_COLUMNS = ['category_id', 'user_id', 'combined_score', 'allocation', 'computed_at']
+
+ALLOCATION_UPSERT = """
+    ON CONFLICT (category_id) DO UPDATE SET
+        user_id = EXCLUDED.user_id,
+        combined_score = EXCLUDED.combined_score,
+        allocation = EXCLUDED.allocation,
+        computed_at = EXCLUDED.computed_at
+"""
+
+
+def compute_allocations(user_ids, priority, urgency, frequency, impact, budget,
+                        decision_weights=None, score_weights=None):
+    """
+    Hitung combined score dan allocation untuk kategori banyak user sekaligus
+
+    Rumus sama dengan utils.calculations.calculate_allocation, tetapi
+    vectorized: satu elemen array = satu kategori. Total score per user
+    dihitung dengan grouped reduction (bincount).
+
+    Args:
+        user_ids (array): User ID pemilik setiap kategori
+        priority, urgency, frequency, impact (array): Kriteria 1-5
+        budget (array): Budget bulanan user pemilik setiap kategori
+        decision_weights (dict): Default DECISION_WEIGHTS
+        score_weights (dict): Default SCORE_WEIGHTS
+
+    Returns:
+        tuple: (combined_score, allocation) sebagai array float64
+    """
+    decision_weights = decision_weights or DECISION_WEIGHTS
+    score_weights = score_weights or SCORE_WEIGHTS
+
+    user_ids = np.asarray(user_ids)
+    decision_score = (
+        np.asarray(urgency, dtype=np.float64) / 5.0 * decision_weights["urgency"] +
+        np.asarray(frequency, dtype=np.float64) / 5.0 * decision_weights["frequency"] +
+        np.asarray(impact, dtype=np.float64) / 5.0 * decision_weights["impact"]
+    )
+    combined_score = (
+        np.asarray(priority, dtype=np.float64) / 5.0 * score_weights["priority"] +
+        decision_score * score_weights["decision"]
+    )
+
+    if user_ids.size == 0:
+        return combined_score, np.zeros(0)
+
+    _, group = np.unique(user_ids, return_inverse=True)
+    user_total = np.bincount(group, weights=combined_score)[group]
+
+    allocation = np.zeros_like(combined_score)
+    np.divide(combined_score, user_total, out=allocation, where=user_total > 0)
+    allocation = np.round(allocation * np.asarray(budget, dtype=np.float64), 2)
+    return combined_score, allocation
+
+
+class BatchAllocationJob:
+    """Recompute allocation semua user (month rollover atau setelah tuning bobot)"""
+
+    @staticmethod
+    def load_inputs(start_user_id=None, end_user_id=None):
+        """
+        Ambil kriteria kategori dan budget user sebagai kolom
+
+        Dibaca dari primary (bukan replica) supaya allocation yang di-upsert
+        tidak dihitung dari baris yang tertinggal.
+
+        Args:
+            start_user_id (int): User ID awal (inklusif), default tanpa batas
+            end_user_id (int): User ID akhir (eksklusif), default tanpa batas
+
+        Returns:
+            tuple: (success, dict kolom -> numpy array/error_message)
+        """
+        conditions = []
+        params = []
+        if start_user_id is not None:
+            conditions.append("c.user_id >= %s")
+            params.append(start_user_id)
+        if end_user_id is not None:
+            conditions.append("c.user_id < %s")
+            params.append(end_user_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"""
+            SELECT c.user_id, c.category_id, c.priority, c.urgency, c.frequency, c.impact,
+                   COALESCE(b.monthly_budget, 0) AS monthly_budget
+            FROM categories c
+            LEFT JOIN user_budgets b ON b.user_id = c.user_id
+            {where}
+            ORDER BY c.user_id, c.category_id
+        """
+        success, result = DatabaseManager.execute_query(
+            query, tuple(params) or None, fetch=True, row_format='columns'
+        )
+        if not success:
+            return False, result
+        return True, {
+            column: np.asarray(values, dtype=np.float64 if column == 'monthly_budget' else np.int64)
+            for column, values in result.items()
+        }
+
+    @staticmethod
+    def write_allocations(category_ids, user_ids, combined_score, allocation, computed_at=None):
+        """
+        Upsert hasil ke category_allocations dalam satu bulk insert
+
+        Returns:
+            tuple: (success, stats bulk_insert/error_message)
+        """
+        computed_at = computed_at or datetime.now()
+        rows = zip(
+            np.asarray(category_ids).tolist(),
+            np.asarray(user_ids).tolist(),
+            np.asarray(combined_score).tolist(),
+            np.asarray(allocation).tolist(),
+            [computed_at] * len(category_ids)
+        )
+        return DatabaseManager.bulk_insert(
+            'category_allocations', ALLOCATION_COLUMNS, rows, on_conflict=ALLOCATION_UPSERT
+        )
+
+    @staticmethod
+    def run(start_user_id=None, end_user_id=None):
+        """
+        Load, hitung, dan tulis allocation untuk range user
+
+        Returns:
+            tuple: (success, stats/error_message) dengan stats berisi
+                users, categories, load/compute/write (detik)
+        """
+        start = time.perf_counter()
+        success, columns = BatchAllocationJob.load_inputs(start_user_id, end_user_id)
+        if not success:
+            return False, columns
+        loaded = time.perf_counter()
+
+        combined_score, allocation = compute_allocations(
+            columns['user_id'], columns['priority'], columns['urgency'],
+            columns['frequency'], columns['impact'], columns['monthly_budget']
+        )
+        computed = time.perf_counter()
+
+        success, result = BatchAllocationJob.write_allocations(
+            columns['category_id'], columns['user_id'], combined_score, allocation
+        )
+        if not success:
+            return False, result
+
+        return True, {
+            'users': int(np.unique(columns['user_id']).size),
+            'categories': int(columns['category_id'].size),
+            'load': loaded - start,
+            'compute': computed - loaded,
+            'write': time.perf_counter() - computed
+        }
@@ -0,0 +1,448 @@
+# services/budget_repository.py
+
+from datetime import datetime
+from config.database import DatabaseConfig, DatabaseManager
+
+# Tambah (atau kurangi, dengan nilai negatif) running sum ringkasan bulanan
+SUMMARY_UPSERT_QUERY = """
+    INSERT INTO expense_monthly_summary (user_id, month, category_id, total_amount, expense_count)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (user_id, month, category_id) DO UPDATE SET
+        total_amount = expense_monthly_summary.total_amount + EXCLUDED.total_amount,
+        expense_count = expense_monthly_summary.expense_count + EXCLUDED.expense_count
+"""
+
+# Versi multi-row untuk insert_batch (delta sudah diagregasi per kunci)
+SUMMARY_UPSERT_CONFLICT = """
+    ON CONFLICT (user_id, month, category_id) DO UPDATE SET
+        total_amount = expense_monthly_summary.total_amount + EXCLUDED.total_amount,
+        expense_count = expense_monthly_summary.expense_count + EXCLUDED.expense_count
+"""
+
+BUDGET_UPSERT_CONFLICT = """
+    ON CONFLICT (user_id) DO UPDATE SET
+        monthly_budget = EXCLUDED.monthly_budget,
+        updated_at = EXCLUDED.updated_at
+"""
+
+
+def month_bounds(moment=None):
+    """
+    Awal bulan dan awal bulan berikutnya untuk range query [start, end)
+
+    Args:
+        moment (datetime): Waktu acuan (default sekarang)
+
+    Returns:
+        tuple: (start, end)
+    """
+    moment = moment or datetime.now()
+    start = datetime(moment.year, moment.month, 1)
+    if moment.month == 12:
+        end = datetime(moment.year + 1, 1, 1)
+    else:
+        end = datetime(moment.year, moment.month + 1, 1)
+    return start, end
+
+
+class BudgetRepository:
+    """Repository untuk kategori dan pengeluaran user di database"""
+
+    @staticmethod
+    def get_categories(user_id):
+        """
+        Semua kategori milik user
+
+        Args:
+            user_id (int): User ID
+
+        Returns:
+            tuple: (success, list of dict/error_message)
+        """
+        query = """
+            SELECT category_id, name, priority, urgency, frequency, impact
+            FROM categories
+            WHERE user_id = %s
+            ORDER BY category_id
+        """
+        return DatabaseManager.execute_query(
+            query, (user_id,), fetch=True, readonly=True, pin_key=user_id
+        )
+
+    @staticmethod
+    def get_monthly_budget(user_id):
+        """
+        Budget bulanan user (0 jika belum pernah diisi)
+
+        Returns:
+            tuple: (success, monthly_budget/error_message)
+        """
+        success, result = DatabaseManager.execute_query(
+            "SELECT monthly_budget FROM user_budgets WHERE user_id = %s",
+            (user_id,), fetch=True, row_format='tuple', readonly=True, pin_key=user_id
+        )
+        if not success:
+            return False, result
+        return True, result[0][0] if result else 0
+
+    @staticmethod
+    def set_monthly_budget(user_id, monthly_budget):
+        """
+        Simpan budget bulanan user
+
+        Returns:
+            tuple: (success, message)
+        """
+        query = """
+            INSERT INTO user_budgets (user_id, monthly_budget, updated_at)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (user_id) DO UPDATE SET
+                monthly_budget = EXCLUDED.monthly_budget,
+                updated_at = EXCLUDED.updated_at
+        """
+        return DatabaseManager.execute_query(
+            query, (user_id, monthly_budget, datetime.now()), pin_key=user_id
+        )
+
+    @staticmethod
+    def upsert_category(user_id, name, priority, urgency, frequency, impact):
+        """
+        Tambah kategori baru atau perbarui kategori dengan nama yang sama
+
+        Returns:
+            tuple: (success, category_id/error_message)
+        """
+        query = """
+            INSERT INTO categories
+                (user_id, name, priority, urgency, frequency, impact, created_at, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (user_id, name) DO UPDATE SET
+                priority = EXCLUDED.priority,
+                urgency = EXCLUDED.urgency,
+                frequency = EXCLUDED.frequency,
+                impact = EXCLUDED.impact,
+                updated_at = EXCLUDED.updated_at
+            RETURNING category_id
+        """
+        current_time = datetime.now()
+        success, result = DatabaseManager.execute_query(
+            query,
+            (user_id, name, priority, urgency, frequency, impact, current_time, current_time),
+            fetch=True,
+            pin_key=user_id
+        )
+        if not success:
+            return False, result
+        return True, result['category_id']
+
+    @staticmethod
+    def rename_category(user_id, category_id, new_name):
+        """
+        Ganti nama kategori
+
+        Expense dan ringkasan menunjuk category_id, jadi hanya satu baris
+        categories yang berubah.
+
+        Returns:
+            tuple: (success, message)
+        """
+        query = """
+            UPDATE categories SET name = %s, updated_at = %s
+            WHERE user_id = %s AND category_id = %s
+        """
+        return DatabaseManager.execute_query(
+            query, (new_name, datetime.now(), user_id, category_id), pin_key=user_id
+        )
+
+    @staticmethod
+    def delete_category(user_id, category_id):
+        """
+        Hapus kategori; expense kategori tersebut ikut terhapus (ON DELETE CASCADE)
+
+        Cascade memakai index expenses (category_id), jadi biayanya
+        sebanding dengan jumlah expense kategori itu.
+
+        Returns:
+            tuple: (success, message)
+        """
+        query = "DELETE FROM categories WHERE user_id = %s AND category_id = %s"
+        return DatabaseManager.execute_query(query, (user_id, category_id), pin_key=user_id)
+
+    @staticmethod
+    def add_expense(user_id, category_id, amount, spent_at=None):
+        """
+        Catat satu pengeluaran
+        
+        Ringkasan bulanan (expense_monthly_summary) diperbarui dalam
+        transaksi yang sama dengan insert expense.
+
+        Args:
+            user_id (int): User ID
+            category_id (int): Category ID
+            amount (int): Jumlah pengeluaran (Rp)
+            spent_at (datetime): Waktu pengeluaran (default sekarang)
+
+        Returns:
+            tuple: (success, expense_id/error_message)
+        """
+        spent_at = spent_at or datetime.now()
+        month = month_bounds(spent_at)[0].date()
+        try:
+            with DatabaseManager.transaction(pin_key=user_id) as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO expenses (user_id, category_id, amount, spent_at)
+                    VALUES (%s, %s, %s, %s)
+                    RETURNING expense_id
+                    """,
+                    (user_id, category_id, amount, spent_at)
+                )
+                expense_id = cursor.fetchone()['expense_id']
+                cursor.execute(SUMMARY_UPSERT_QUERY, (user_id, month, category_id, amount, 1))
+        except Exception as e:
+            return False, f"Database error: {str(e)}"
+        return True, expense_id
+
+    @staticmethod
+    def delete_expense(user_id, expense_id):
+        """
+        Hapus satu pengeluaran dan kurangi ringkasan bulanannya
+
+        Returns:
+            tuple: (success, message)
+        """
+        try:
+            with DatabaseManager.transaction(pin_key=user_id) as cursor:
+                cursor.execute(
+                    """
+                    DELETE FROM expenses
+                    WHERE user_id = %s AND expense_id = %s
+                    RETURNING category_id, amount, spent_at
+                    """,
+                    (user_id, expense_id)
+                )
+                deleted = cursor.fetchone()
+                if not deleted:
+                    return False, "Pengeluaran tidak ditemukan"
+                cursor.execute(
+                    SUMMARY_UPSERT_QUERY,
+                    (user_id, month_bounds(deleted['spent_at'])[0].date(),
+                     deleted['category_id'], -deleted['amount'], -1)
+                )
+        except Exception as e:
+            return False, f"Database error: {str(e)}"
+        return True, "Pengeluaran dihapus"
+
+    @staticmethod
+    def write_batch(expenses=(), category_updates=(), budgets=()):
+        """
+        Tulis sekumpulan perubahan dalam satu transaksi (dipakai write-behind)
+
+        Expense masuk lewat satu insert multi-row, ringkasan bulanannya
+        diagregasi per (user, bulan, kategori) lalu di-upsert sekaligus,
+        update kategori lewat satu UPDATE ... FROM (VALUES ...), dan budget
+        bulanan lewat satu upsert multi-row.
+
+        Args:
+            expenses (list): (user_id, category_id, amount, spent_at)
+            category_updates (list): (user_id, category_id, priority, urgency,
+                frequency, impact, updated_at)
+            budgets (list): (user_id, monthly_budget, updated_at)
+
+        Returns:
+            tuple: (success, stats/error_message) dengan stats berisi
+                expenses, expense_ids (urut sesuai `expenses`), summary_rows,
+                category_updates dan budgets
+        """
+        summary = {}
+        for user_id, category_id, amount, spent_at in expenses:
+            key = (user_id, month_bounds(spent_at)[0].date(), category_id)
+            entry = summary.setdefault(key, [0, 0])
+            entry[0] += amount
+            entry[1] += 1
+
+        backend = DatabaseConfig.get_backend()
+        try:
+            with DatabaseManager.transaction() as cursor:
+                expense_ids = []
+                if expenses:
+                    expense_ids = backend.insert_batch(
+                        cursor, 'expenses', ['user_id', 'category_id', 'amount', 'spent_at'], list(expenses),
+                        returning='expense_id'
+                    )
+                    backend.insert_batch(
+                        cursor, 'expense_monthly_summary',
+                        ['user_id', 'month', 'category_id', 'total_amount', 'expense_count'],
+                        [key + tuple(entry) for key, entry in summary.items()],
+                        on_conflict=SUMMARY_UPSERT_CONFLICT
+                    )
+                if category_updates:
+                    backend.update_batch(
+                        cursor, 'categories', ['user_id', 'category_id'],
+                        ['priority', 'urgency', 'frequency', 'impact', 'updated_at'],
+                        [(priority, urgency, frequency, impact, updated_at, user_id, category_id)
+                         for user_id, category_id, priority, urgency, frequency, impact, updated_at
+                         in category_updates]
+                    )
+                if budgets:
+                    backend.insert_batch(
+                        cursor, 'user_budgets', ['user_id', 'monthly_budget', 'updated_at'], list(budgets),
+                        on_conflict=BUDGET_UPSERT_CONFLICT
+                    )
+        except Exception as e:
+            return False, f"Database error: {str(e)}"
+
+        # Read-your-own-write untuk semua user di batch ini
+        for user_id in {row[0] for rows in (expenses, category_updates, budgets) for row in rows}:
+            DatabaseConfig.pin_to_primary(user_id)
+        return True, {
+            'expenses': len(expenses),
+            'expense_ids': expense_ids,
+            'summary_rows': len(summary),
+            'category_updates': len(category_updates),
+            'budgets': len(budgets)
+        }
+
+    @staticmethod
+    def get_monthly_summary(user_id, month=None):
+        """
+        Total dan jumlah pengeluaran per kategori untuk satu bulan
+
+        Membaca expense_monthly_summary, jadi biayanya O(kategori)
+        bukan O(pengeluaran).
+
+        Args:
+            user_id (int): User ID
+            month (date): Tanggal 1 bulan yang diminta (default bulan ini)
+
+        Returns:
+            tuple: (success, dict {category_id: {'total', 'count'}}/error_message)
+        """
+        month = month or month_bounds()[0].date()
+        query = """
+            SELECT category_id, total_amount, expense_count
+            FROM expense_monthly_summary
+            WHERE user_id = %s AND month = %s
+        """
+        success, result = DatabaseManager.execute_query(
+            query, (user_id, month), fetch=True, row_format='tuple',
+            readonly=True, pin_key=user_id
+        )
+        if not success:
+            return False, result
+        return True, {
+            category_id: {'total': total, 'count': count}
+            for category_id, total, count in result
+        }
+
+    @staticmethod
+    def rebuild_monthly_summary(user_id=None):
+        """
+        Hitung ulang expense_monthly_summary dari tabel expenses
+
+        Dipakai untuk memperbaiki drift (misalnya setelah edit manual di
+        database). Berjalan dalam satu transaksi.
+
+        Args:
+            user_id (int): Hanya rebuild untuk user ini (default semua user)
+
+        Returns:
+            tuple: (success, jumlah baris ringkasan/error_message)
+        """
+        where = "WHERE user_id = %s" if user_id is not None else ""
+        params = (user_id,) if user_id is not None else None
+        month = DatabaseConfig.get_backend().month_start('spent_at')
+        try:
+            with DatabaseManager.transaction() as cursor:
+                cursor.execute(f"DELETE FROM expense_monthly_summary {where}", params)
+                cursor.execute(
+                    f"""
+                    INSERT INTO expense_monthly_summary
+                        (user_id, month, category_id, total_amount, expense_count)
+                    SELECT user_id, {month}, category_id, SUM(amount), COUNT(*)
+                    FROM expenses
+                    {where}
+                    GROUP BY user_id, {month}, category_id
+                    """,
+                    params
+                )
+                row_count = cursor.rowcount
+        except Exception as e:
+            return False, f"Database error: {str(e)}"
+        return True, row_count
+
+    @staticmethod
+    def get_expenses(user_id, start=None, end=None):
+        """
+        Pengeluaran user dalam range [start, end), default bulan ini
+
+        Memakai index (user_id, spent_at).
+
+        Returns:
+            tuple: (success, list of dict/error_message)
+        """
+        if start is None or end is None:
+            start, end = month_bounds()
+        query = """
+            SELECT e.expense_id, e.category_id, c.name AS category, e.amount, e.spent_at
+            FROM expenses e
+            JOIN categories c ON c.category_id = e.category_id
+            WHERE e.user_id = %s AND e.spent_at >= %s AND e.spent_at < %s
+            ORDER BY e.spent_at
+        """
+        return DatabaseManager.execute_query(
+            query, (user_id, start, end), fetch=True, readonly=True, pin_key=user_id
+        )
+
+    @staticmethod
+    def get_spent_by_category(user_id, start=None, end=None):
+        """
+        Total pengeluaran per kategori dalam range [start, end), default bulan ini
+
+        Memakai index (user_id, category_id, spent_at).
+
+        Returns:
+            tuple: (success, dict {category_id: total}/error_message)
+        """
+        if start is None or end is None:
+            start, end = month_bounds()
+        query = """
+            SELECT category_id, SUM(amount) AS total
+            FROM expenses
+            WHERE user_id = %s AND spent_at >= %s AND spent_at < %s
+            GROUP BY category_id
+        """
+        success, result = DatabaseManager.execute_query(
+            query, (user_id, start, end), fetch=True, row_format='tuple',
+            readonly=True, pin_key=user_id
+        )
+        if not success:
+            return False, result
+        return True, {category_id: total for category_id, total in result}
+
+    @staticmethod
+    def stream_expenses(user_id, start=None, end=None, chunk_size=None):
+        """
+        Stream seluruh history pengeluaran user untuk report/export
+
+        Yields:
+            dict: Satu pengeluaran per baris, urut berdasarkan spent_at
+        """
+        conditions = ["e.user_id = %s"]
+        params = [user_id]
+        if start is not None:
+            conditions.append("e.spent_at >= %s")
+            params.append(start)
+        if end is not None:
+            conditions.append("e.spent_at < %s")
+            params.append(end)
+        query = f"""
+            SELECT e.expense_id, e.category_id, c.name AS category, e.amount, e.spent_at
+            FROM expenses e
+            JOIN categories c ON c.category_id = e.category_id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY e.spent_at
+        """
+        return DatabaseManager.stream_query(
+            query, tuple(params), chunk_size=chunk_size, pin_key=user_id
+        )
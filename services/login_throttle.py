@@ -0,0 +1,148 @@
+# services/login_throttle.py
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from config.settings import LOGIN_THROTTLE
+
+
+class TokenBucketLimiter:
+    """
+    Kumpulan token bucket per key dengan jumlah key terbatas (LRU)
+
+    Bucket penuh yang tidak dipakai sama dengan bucket yang tidak pernah
+    ada, jadi key lama boleh dibuang tanpa mengubah perilaku limiter.
+    """
+
+    def __init__(self, rate, burst, max_keys=50000):
+        """
+        Args:
+            rate (float): Token yang diisi ulang per detik
+            burst (int): Kapasitas bucket
+            max_keys (int): Jumlah key maksimal yang dilacak
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+
+    def _tokens(self, key, now):
+        tokens, updated_at = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated_at) * self.rate)
+
+    def available(self, key, now):
+        """Jumlah token saat ini (tidak mengubah bucket)"""
+        return self._tokens(key, now)
+
+    def retry_after(self, key, now):
+        """Detik sampai satu token tersedia"""
+        missing = 1 - self._tokens(key, now)
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else float('inf')
+
+    def consume(self, key, now, amount=1):
+        self._buckets[key] = (self._tokens(key, now) - amount, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class LoginThrottle:
+    """
+    Rate limit dan load shedding untuk percobaan login (thread-safe)
+
+    Setiap percobaan memakai satu token dari bucket username dan bucket
+    client. Percobaan yang ditolak dijawab tanpa menyentuh database atau
+    password hasher. Jumlah login yang diproses bersamaan dibatasi
+    `max_concurrent`; kelebihannya langsung ditolak, tidak diantrikan.
+    """
+
+    def __init__(self, username_rate, username_burst, client_rate, client_burst,
+                 max_concurrent=8, max_keys=50000):
+        self.by_username = TokenBucketLimiter(username_rate, username_burst, max_keys)
+        self.by_client = TokenBucketLimiter(client_rate, client_burst, max_keys)
+        self.max_concurrent = max_concurrent
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {
+            'allowed': 0,
+            'throttled_username': 0,
+            'throttled_client': 0,
+            'shed': 0
+        }
+
+    def acquire(self, username, client_id=None):
+        """
+        Minta izin memproses satu percobaan login
+
+        Jika diizinkan, pemanggil wajib memanggil release() setelah selesai.
+
+        Args:
+            username (str): Username yang dicoba
+            client_id (str): Identitas client (IP atau session), opsional
+
+        Returns:
+            tuple: (allowed, message); message berisi alasan penolakan
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.by_username.available(username, now) < 1:
+                self._stats['throttled_username'] += 1
+                wait = self.by_username.retry_after(username, now)
+                return False, f"Terlalu banyak percobaan login, coba lagi dalam {math.ceil(wait)} detik"
+
+            if client_id is not None and self.by_client.available(client_id, now) < 1:
+                self._stats['throttled_client'] += 1
+                wait = self.by_client.retry_after(client_id, now)
+                return False, f"Terlalu banyak percobaan login, coba lagi dalam {math.ceil(wait)} detik"
+
+            if self._in_flight >= self.max_concurrent:
+                self._stats['shed'] += 1
+                return False, "Server sedang sibuk memproses login, coba lagi sebentar"
+
+            self.by_username.consume(username, now)
+            if client_id is not None:
+                self.by_client.consume(client_id, now)
+            self._in_flight += 1
+            self._stats['allowed'] += 1
+            return True, None
+
+    def release(self, username=None, succeeded=False):
+        """
+        Selesai memproses percobaan login
+
+        Login yang berhasil mengembalikan token username, jadi hanya
+        percobaan gagal yang menghabiskan kuota username.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._in_flight -= 1
+            if succeeded and username is not None:
+                self.by_username.consume(username, now, amount=-1)
+
+    def stats(self):
+        """
+        Statistik throttling
+
+        Returns:
+            dict: Counter allowed/throttled/shed, login in-flight dan
+                jumlah key yang dilacak
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = self._in_flight
+            stats['max_concurrent'] = self.max_concurrent
+            stats['tracked_usernames'] = len(self.by_username)
+            stats['tracked_clients'] = len(self.by_client)
+        return stats
+
+
+# Throttle global, dipakai bersama semua session dalam satu proses
+login_throttle = LoginThrottle(**LOGIN_THROTTLE)
@@ -0,0 +1,183 @@
+# services/overspend_forecast.py
+
+import calendar
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from config.settings import OVERSPEND_FORECAST
+from services.budget_repository import BudgetRepository
+from services.session_memory import estimate_size, session_memory
+from services.user_cache import TTLCache
+
+# Simulasi jalur pengeluaran per (user_id, tanggal); berlaku sampai ganti hari
+_forecast_cache = TTLCache(
+    max_size=OVERSPEND_FORECAST["cache_size"], ttl=24 * 3600, negative_ttl=24 * 3600
+)
+
+
+def _usage_by_user():
+    """Perkiraan memori jalur simulasi per user (byte), untuk accounting SessionMemory"""
+    usage = {}
+    for (user_id, _), simulation in _forecast_cache.items():
+        usage[user_id] = usage.get(user_id, 0) + estimate_size(simulation)
+    return usage
+
+
+session_memory.register_shared(
+    'forecast', _usage_by_user, lambda user_id: _forecast_cache.delete_where(lambda key: key[0] == user_id)
+)
+
+
+def daily_history(expenses, names, start, end):
+    """
+    Matriks total pengeluaran harian per kategori
+
+    Args:
+        expenses (list): Dict expense dengan category, amount, spent_at
+        names (list): Nama kategori (urutan baris)
+        start (date): Hari pertama history
+        end (date): Hari setelah hari terakhir history
+
+    Returns:
+        numpy.ndarray: Shape (jumlah kategori, jumlah hari); hari tanpa
+            pengeluaran bernilai 0
+    """
+    n_days = max((end - start).days, 0)
+    history = np.zeros((len(names), n_days))
+    rows = {name: i for i, name in enumerate(names)}
+    for exp in expenses:
+        row = rows.get(exp['category'])
+        day = (exp['spent_at'].date() - start).days
+        if row is not None and 0 <= day < n_days:
+            history[row, day] += exp['amount']
+    return history
+
+
+def simulate_future_spending(history, days_left, n_paths, rng):
+    """
+    Simulasi total pengeluaran sisa bulan dengan bootstrap hari historis
+
+    Setiap jalur mengambil `days_left` hari acak (dengan pengembalian) dari
+    history. Satu hari diambil utuh untuk semua kategori, jadi korelasi
+    antar kategori di hari yang sama ikut terbawa. Jumlahnya dihitung
+    lewat hitungan multinomial per hari: counts (paths, hari) @ history.T.
+
+    Args:
+        history (ndarray): Pengeluaran harian, shape (kategori, hari)
+        days_left (int): Jumlah hari yang disimulasikan
+        n_paths (int): Jumlah jalur Monte Carlo
+        rng (numpy.random.Generator): Sumber angka acak
+
+    Returns:
+        numpy.ndarray: Total pengeluaran tambahan, shape (paths, kategori)
+    """
+    n_categories, n_days = history.shape
+    if days_left <= 0 or n_days == 0:
+        return np.zeros((n_paths, n_categories))
+    counts = rng.multinomial(days_left, np.full(n_days, 1.0 / n_days), size=n_paths)
+    return counts @ history.T
+
+
+def overspend_risk(future, spent, allocation):
+    """
+    Peluang dan ekspektasi overspend per kategori di akhir bulan
+
+    Args:
+        future (ndarray): Pengeluaran tambahan hasil simulasi, shape (paths, kategori)
+        spent (array): Pengeluaran bulan ini sampai sekarang per kategori
+        allocation (array): Allocation per kategori
+
+    Returns:
+        tuple: (probability, expected_overshoot, expected_total) per kategori
+    """
+    month_end = future + np.asarray(spent, dtype=np.float64)[None, :]
+    overshoot = np.maximum(month_end - np.asarray(allocation, dtype=np.float64)[None, :], 0.0)
+    return (overshoot > 0).mean(axis=0), overshoot.mean(axis=0), month_end.mean(axis=0)
+
+
+class OverspendForecast:
+    """Forecast overspend akhir bulan per kategori (Monte Carlo)"""
+
+    @staticmethod
+    def _simulate(user_id, names, today):
+        """Load history dan simulasi jalur sisa bulan (bagian yang di-cache)"""
+        history_start = today - timedelta(days=OVERSPEND_FORECAST["history_days"])
+        success, expenses = BudgetRepository.get_expenses(
+            user_id,
+            datetime.combine(history_start, datetime.min.time()),
+            datetime.combine(today, datetime.min.time())
+        )
+        if not success:
+            return False, expenses
+
+        # History dimulai dari pengeluaran pertama, supaya hari sebelum user
+        # mulai mencatat tidak dihitung sebagai hari tanpa pengeluaran
+        if expenses:
+            history_start = max(history_start, min(exp['spent_at'] for exp in expenses).date())
+        history = daily_history(expenses, names, history_start, today)
+
+        days_left = calendar.monthrange(today.year, today.month)[1] - today.day
+        rng = np.random.default_rng([user_id, today.toordinal()])
+        future = simulate_future_spending(history, days_left, OVERSPEND_FORECAST["paths"], rng)
+        return True, {
+            'names': tuple(names),
+            'future': future,
+            'days_left': days_left,
+            'history_days': history.shape[1]
+        }
+
+    @staticmethod
+    def get_forecast(user_id, categories, today=None):
+        """
+        Peluang tiap kategori melewati allocation di akhir bulan
+
+        Jalur simulasi di-cache per (user, hari) dan hanya bergantung pada
+        history sampai kemarin, jadi expense baru hari ini (yang mengubah
+        cat['spent']) cukup dievaluasi ulang terhadap jalur yang sama
+        tanpa simulasi ulang.
+
+        Args:
+            user_id (int): User ID
+            categories (list): Kategori session dengan name, allocation, spent
+            today (date): Tanggal acuan (default hari ini)
+
+        Returns:
+            tuple: (success, dict {nama kategori: {'probability',
+                'expected_overshoot', 'expected_total'}}/error_message)
+        """
+        if not categories:
+            return True, {}
+        today = today or date.today()
+        names = [cat['name'] for cat in categories]
+
+        key = (user_id, today)
+        hit, simulation = _forecast_cache.get(key)
+        if not hit or simulation is None or simulation['names'] != tuple(names):
+            success, simulation = OverspendForecast._simulate(user_id, names, today)
+            if not success:
+                return False, simulation
+            _forecast_cache.set(key, simulation)
+
+        probability, expected_overshoot, expected_total = overspend_risk(
+            simulation['future'],
+            [cat['spent'] for cat in categories],
+            [cat['allocation'] for cat in categories]
+        )
+        return True, {
+            name: {
+                'probability': float(probability[i]),
+                'expected_overshoot': float(expected_overshoot[i]),
+                'expected_total': float(expected_total[i])
+            }
+            for i, name in enumerate(names)
+        }
+
+    @staticmethod
+    def invalidate(user_id, today=None):
+        """Buang simulasi user hari ini (misalnya setelah expense lama dihapus)"""
+        _forecast_cache.delete((user_id, today or date.today()))
+
+    @staticmethod
+    def get_cache_stats():
+        return _forecast_cache.stats()
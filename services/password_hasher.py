@@ -0,0 +1,259 @@
+# services/password_hasher.py
+
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config.settings import PASSWORD_HASHING
+
+ALGORITHM = 'pbkdf2_sha256'
+SALT_BYTES = 16
+
+# Dengan iterasi hasil kalibrasi, hash baru di-rehash hanya jika iterasinya di
+# bawah fraksi ini dari hasil kalibrasi; noise kalibrasi antar restart/host
+# tidak memicu write ke tabel users di setiap login
+REHASH_FRACTION = 0.5
+
+
+class HasherBusyError(Exception):
+    """Antrian hashing penuh; login ditolak cepat daripada menunggu lama"""
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def _is_legacy(stored_hash):
+    """Hash lama: SHA-256 hex tanpa salt (64 karakter)"""
+    return len(stored_hash) == 64 and '$' not in stored_hash
+
+
+class PasswordHasher:
+    """
+    Hash dan verifikasi password PBKDF2-SHA256 di thread pool terbatas
+
+    hashlib.pbkdf2_hmac melepas GIL selama iterasi, jadi thread pool cukup
+    untuk memindahkan beban CPU dari script thread Streamlit. Jumlah job
+    (berjalan + antri) dibatasi `workers + max_pending`; job berikutnya
+    menunggu paling lama `queue_timeout` detik lalu ditolak dengan
+    HasherBusyError.
+
+    Format hash: pbkdf2_sha256$<iterations>$<salt>$<hash> (base64).
+    """
+
+    def __init__(self, workers=4, max_pending=32, queue_timeout=2.0, target_ms=100.0,
+                 iterations=0, min_iterations=100000):
+        """
+        Args:
+            workers (int): Jumlah thread hashing
+            max_pending (int): Job maksimal yang boleh antri di luar worker
+            queue_timeout (float): Lama menunggu slot antrian sebelum ditolak
+            target_ms (float): Target durasi satu hash untuk kalibrasi
+            iterations (int): Jumlah iterasi tetap; 0 berarti dikalibrasi
+            min_iterations (int): Batas bawah hasil kalibrasi
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.target_ms = target_ms
+        self.min_iterations = min_iterations
+        self.fixed_iterations = bool(iterations)
+        self._iterations = iterations or None
+
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'rejected': 0,
+            'rehashed': 0,
+            'max_queue_depth': 0,
+            'queue_wait_total': 0.0,
+            'queue_wait_max': 0.0,
+            'hash_time_total': 0.0
+        }
+
+    @property
+    def iterations(self):
+        """Jumlah iterasi aktif (dikalibrasi saat pertama dipakai)"""
+        if self._iterations is None:
+            with self._lock:
+                if self._iterations is None:
+                    self._iterations = self.calibrate()
+        return self._iterations
+
+    def calibrate(self, target_ms=None, sample_iterations=20000):
+        """
+        Hitung jumlah iterasi agar satu hash memakan kira-kira target_ms di host ini
+
+        Returns:
+            int: Jumlah iterasi (tidak kurang dari min_iterations)
+        """
+        target_ms = target_ms or self.target_ms
+        salt = os.urandom(SALT_BYTES)
+        best = float('inf')
+        for _ in range(3):
+            start = time.perf_counter()
+            hashlib.pbkdf2_hmac('sha256', b'calibration', salt, sample_iterations)
+            best = min(best, time.perf_counter() - start)
+        per_iteration_ms = best * 1000 / sample_iterations
+        iterations = int(target_ms / per_iteration_ms) if per_iteration_ms > 0 else 0
+        # Bulatkan ke ribuan supaya hash yang tersimpan konsisten antar restart
+        return max(self.min_iterations, iterations // 1000 * 1000)
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix='password-hasher'
+                    )
+        return self._executor
+
+    def _run(self, fn, *args):
+        """Jalankan fn di worker pool dan tunggu hasilnya"""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise HasherBusyError("Terlalu banyak proses login bersamaan, coba lagi sebentar")
+
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self._stats['submitted'] += 1
+            self._queued += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._queued)
+
+        def job():
+            started_at = time.perf_counter()
+            wait = started_at - submitted_at
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._stats['queue_wait_total'] += wait
+                self._stats['queue_wait_max'] = max(self._stats['queue_wait_max'], wait)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._stats['completed'] += 1
+                    self._stats['hash_time_total'] += time.perf_counter() - started_at
+                self._slots.release()
+
+        try:
+            future = self._get_executor().submit(job)
+        except Exception:
+            with self._lock:
+                self._queued -= 1
+            self._slots.release()
+            raise
+        return future.result()
+
+    @staticmethod
+    def _derive(password, salt, iterations):
+        return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+
+    def hash(self, password):
+        """
+        Hash password dengan salt acak
+
+        Returns:
+            str: pbkdf2_sha256$<iterations>$<salt>$<hash>
+
+        Raises:
+            HasherBusyError: Jika antrian hashing penuh
+        """
+        iterations = self.iterations
+        salt = os.urandom(SALT_BYTES)
+        derived = self._run(self._derive, password, salt, iterations)
+        return f"{ALGORITHM}${iterations}${_b64encode(salt)}${_b64encode(derived)}"
+
+    def verify(self, password, stored_hash):
+        """
+        Verifikasi password terhadap hash yang tersimpan
+
+        Hash SHA-256 lama tetap diterima, tetapi ditandai perlu rehash;
+        begitu juga hash PBKDF2 dengan iterasi di bawah rehash_threshold().
+
+        Returns:
+            tuple: (cocok, perlu_rehash)
+
+        Raises:
+            HasherBusyError: Jika antrian hashing penuh
+        """
+        if _is_legacy(stored_hash):
+            legacy = hashlib.sha256(password.encode()).hexdigest()
+            return hmac.compare_digest(legacy, stored_hash), True
+
+        try:
+            algorithm, iterations, salt, expected = stored_hash.split('$')
+            iterations = int(iterations)
+        except ValueError:
+            return False, False
+        if algorithm != ALGORITHM:
+            return False, False
+
+        derived = self._run(self._derive, password, _b64decode(salt), iterations)
+        matched = hmac.compare_digest(derived, _b64decode(expected))
+        return matched, matched and iterations < self.rehash_threshold()
+
+    def rehash_threshold(self):
+        """
+        Iterasi minimal hash PBKDF2 yang tidak perlu di-rehash
+
+        Dengan PASSWORD_HASH_ITERATIONS (disarankan di production, sama di
+        semua host) batasnya setting itu sendiri. Tanpa setting, batasnya
+        min_iterations atau REHASH_FRACTION dari hasil kalibrasi, mana yang
+        lebih besar.
+
+        Returns:
+            int: Jumlah iterasi
+        """
+        if self.fixed_iterations:
+            return self.iterations
+        return max(self.min_iterations, int(self.iterations * REHASH_FRACTION))
+
+    def record_rehash(self):
+        with self._lock:
+            self._stats['rehashed'] += 1
+
+    def stats(self):
+        """
+        Statistik antrian hashing
+
+        Returns:
+            dict: queue_depth, running, counter job, rata-rata waktu tunggu
+                dan durasi hash (detik), serta iterasi aktif
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queue_depth'] = self._queued
+            stats['running'] = self._running
+        completed = stats['completed']
+        stats['queue_wait_avg'] = stats['queue_wait_total'] / completed if completed else 0.0
+        stats['hash_time_avg'] = stats['hash_time_total'] / completed if completed else 0.0
+        stats['workers'] = self.workers
+        stats['max_pending'] = self.max_pending
+        stats['iterations'] = self._iterations
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+# Hasher global, dipakai bersama semua session dalam satu proses
+password_hasher = PasswordHasher(**PASSWORD_HASHING)
@@ -0,0 +1,268 @@
+# services/recompute_runner.py
+
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from config.database import DatabaseConfig, DatabaseManager
+from config.settings import RECOMPUTE
+from services.batch_allocation import BatchAllocationJob
+
+# Ringkasan hasil recompute menggantikan (bukan menambah) baris yang sudah ada
+SUMMARY_REPLACE_CONFLICT = """
+    ON CONFLICT (user_id, month, category_id) DO UPDATE SET
+        total_amount = EXCLUDED.total_amount,
+        expense_count = EXCLUDED.expense_count
+"""
+
+
+def plan_shards(shard_size, min_user_id=None, max_user_id=None):
+    """
+    Bagi range user ID menjadi shard [start, end) berukuran shard_size
+
+    Batas shard selalu kelipatan shard_size, jadi user baru tidak menggeser
+    shard yang sudah tercatat di checkpoint.
+
+    Args:
+        shard_size (int): Jumlah user ID per shard
+        min_user_id (int): User ID terkecil (default dari tabel users)
+        max_user_id (int): User ID terbesar (default dari tabel users)
+
+    Returns:
+        tuple: (success, list of (start, end)/error_message)
+    """
+    if min_user_id is None or max_user_id is None:
+        success, result = DatabaseManager.execute_query(
+            "SELECT MIN(user_id), MAX(user_id) FROM users", fetch=True, row_format='tuple'
+        )
+        if not success:
+            return False, result
+        low, high = result[0]
+        min_user_id = low if min_user_id is None else min_user_id
+        max_user_id = high if max_user_id is None else max_user_id
+    if min_user_id is None or max_user_id is None:
+        return True, []  # Belum ada user
+    first = min_user_id // shard_size * shard_size
+    return True, [
+        (start, start + shard_size)
+        for start in range(first, max_user_id + 1, shard_size)
+    ]
+
+
+def _shard_key(shard):
+    return f"{shard[0]}-{shard[1]}"
+
+
+def recompute_monthly_summary(start_user_id, end_user_id):
+    """
+    Hitung ulang expense_monthly_summary untuk satu shard dari tabel expenses
+
+    Sama seperti BudgetRepository.rebuild_monthly_summary tetapi untuk range
+    user: DELETE lalu INSERT ... SELECT ... GROUP BY dalam satu transaksi di
+    primary, jadi tidak ada jeda antara membaca expenses dan menulis
+    ringkasan. Baris yang sempat di-upsert add_expense di antara DELETE dan
+    INSERT ditimpa dengan total dari snapshot yang sudah mencakup expense
+    tersebut.
+
+    Returns:
+        tuple: (success, stats/error_message) dengan stats berisi
+            expenses dan summary_rows
+    """
+    month = DatabaseConfig.get_backend().month_start('spent_at')
+    params = (start_user_id, end_user_id)
+    try:
+        with DatabaseManager.transaction() as cursor:
+            cursor.execute(
+                "DELETE FROM expense_monthly_summary WHERE user_id >= %s AND user_id < %s", params
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO expense_monthly_summary
+                    (user_id, month, category_id, total_amount, expense_count)
+                SELECT user_id, {month}, category_id, SUM(amount), COUNT(*)
+                FROM expenses
+                WHERE user_id >= %s AND user_id < %s
+                GROUP BY user_id, {month}, category_id
+                {SUMMARY_REPLACE_CONFLICT}
+                """,
+                params
+            )
+            cursor.execute(
+                "SELECT COUNT(*) AS summary_rows, COALESCE(SUM(expense_count), 0) AS expenses "
+                "FROM expense_monthly_summary WHERE user_id >= %s AND user_id < %s",
+                params
+            )
+            row = cursor.fetchone()
+    except Exception as e:
+        return False, f"Database error: {str(e)}"
+
+    return True, {'expenses': row['expenses'], 'summary_rows': row['summary_rows']}
+
+
+def run_shard(shard):
+    """
+    Kerjakan satu shard: allocation lalu ringkasan bulanan
+
+    Dijalankan di worker process; setiap process punya connection pool sendiri.
+
+    Returns:
+        dict: Hasil shard (ok, error, statistik dan durasi)
+    """
+    start_user_id, end_user_id = shard
+    started = time.perf_counter()
+    success, allocation = BatchAllocationJob.run(start_user_id, end_user_id)
+    if not success:
+        return {'shard': shard, 'ok': False, 'error': f"Allocation: {allocation}"}
+
+    success, summary = recompute_monthly_summary(start_user_id, end_user_id)
+    if not success:
+        return {'shard': shard, 'ok': False, 'error': f"Ringkasan bulanan: {summary}"}
+
+    return {
+        'shard': shard,
+        'ok': True,
+        'users': allocation['users'],
+        'categories': allocation['categories'],
+        'expenses': summary['expenses'],
+        'summary_rows': summary['summary_rows'],
+        'elapsed': time.perf_counter() - started
+    }
+
+
+class Checkpoint:
+    """
+    Daftar shard yang sudah selesai, disimpan sebagai file JSON
+
+    Checkpoint hanya berlaku untuk layout shard yang sama (shard_size);
+    layout berbeda berarti mulai dari awal.
+    """
+
+    def __init__(self, path, layout):
+        self.path = path
+        self.layout = layout
+        self.completed = {}
+
+    def load(self):
+        """
+        Baca checkpoint sebelumnya
+
+        Returns:
+            bool: True jika checkpoint cocok dengan layout dan dipakai
+        """
+        if not self.path or not os.path.exists(self.path):
+            return False
+        with open(self.path) as f:
+            data = json.load(f)
+        if data.get('layout') != self.layout:
+            return False
+        self.completed = data.get('completed', {})
+        return True
+
+    def mark_done(self, shard, result):
+        self.completed[_shard_key(shard)] = {
+            key: value for key, value in result.items() if key not in ('shard', 'ok')
+        }
+        self.save()
+
+    def is_done(self, shard):
+        return _shard_key(shard) in self.completed
+
+    def save(self):
+        if not self.path:
+            return
+        # Tulis ke file sementara lalu rename supaya checkpoint tidak pernah setengah jadi
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'layout': self.layout,
+                'completed': self.completed,
+                'updated_at': datetime.now().isoformat()
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class RecomputeRunner:
+    """Recompute allocation dan ringkasan bulanan semua user, dibagi per shard user ID"""
+
+    def __init__(self, workers=None, shard_size=None, checkpoint_path=None, progress=None):
+        """
+        Args:
+            workers (int): Jumlah worker process (default RECOMPUTE_WORKERS)
+            shard_size (int): Jumlah user ID per shard (default RECOMPUTE_SHARD_SIZE)
+            checkpoint_path (str): File checkpoint (default RECOMPUTE_CHECKPOINT_PATH)
+            progress (callable): Dipanggil dengan (done, total, result, eta_seconds)
+                setiap shard selesai
+        """
+        self.workers = workers or RECOMPUTE["workers"]
+        self.shard_size = shard_size or RECOMPUTE["shard_size"]
+        self.checkpoint_path = checkpoint_path or RECOMPUTE["checkpoint_path"]
+        self.progress = progress
+
+    def run(self, resume=False, min_user_id=None, max_user_id=None):
+        """
+        Jalankan semua shard di process pool
+
+        Args:
+            resume (bool): Lewati shard yang tercatat selesai di checkpoint
+            min_user_id (int): User ID awal (default MIN(user_id))
+            max_user_id (int): User ID akhir (default MAX(user_id))
+
+        Returns:
+            tuple: (success, stats/error_message) dengan stats berisi
+                shards, skipped, failed, users, categories, expenses dan elapsed
+        """
+        success, shards = plan_shards(self.shard_size, min_user_id, max_user_id)
+        if not success:
+            return False, shards
+
+        layout = {'shard_size': self.shard_size}
+        checkpoint = Checkpoint(self.checkpoint_path, layout)
+        if resume:
+            checkpoint.load()
+        pending = [shard for shard in shards if not checkpoint.is_done(shard)]
+
+        stats = {
+            'shards': len(shards),
+            'skipped': len(shards) - len(pending),
+            'failed': [],
+            'users': 0,
+            'categories': 0,
+            'expenses': 0
+        }
+        started = time.perf_counter()
+        if pending:
+            # spawn: worker tidak mewarisi koneksi database milik parent
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(pending)),
+                mp_context=context
+            ) as executor:
+                futures = {executor.submit(run_shard, shard): shard for shard in pending}
+                for done, future in enumerate(as_completed(futures), start=1):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {'shard': futures[future], 'ok': False, 'error': str(e)}
+                    if result['ok']:
+                        checkpoint.mark_done(result['shard'], result)
+                        for key in ('users', 'categories', 'expenses'):
+                            stats[key] += result[key]
+                    else:
+                        stats['failed'].append(result)
+
+                    if self.progress:
+                        elapsed = time.perf_counter() - started
+                        eta = elapsed / done * (len(pending) - done)
+                        self.progress(done, len(pending), result, eta)
+
+        stats['elapsed'] = time.perf_counter() - started
+        if not stats['failed']:
+            checkpoint.clear()
+        return True, stats
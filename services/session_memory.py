@@ -0,0 +1,496 @@
+# services/session_memory.py
+
+import hashlib
+import hmac
+import os
+import pickle
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from config.settings import SESSION_MEMORY
+
+SPILL_DDL = """
+    CREATE TABLE IF NOT EXISTS session_spill (
+        session_id TEXT PRIMARY KEY,
+        user_id INTEGER,
+        payload BLOB NOT NULL,
+        spilled_at REAL NOT NULL
+    )
+"""
+
+
+def _open_private(path):
+    """
+    Buat file spill hanya bisa dibaca pemilik proses
+
+    Direktori yang dibuat di sini mendapat mode 0700 dan file 0600; file
+    -wal/-shm SQLite mengikuti mode file database.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    os.close(os.open(path, os.O_CREAT | os.O_RDWR, 0o600))
+    os.chmod(path, 0o600)
+
+
+def estimate_size(obj, _seen=None):
+    """
+    Perkiraan memori sebuah objek beserta isinya (byte)
+
+    Objek dengan memory_usage() (BudgetStore, DataFrame/Series pandas)
+    memakai angka miliknya sendiri; dict, list, tuple, set dan objek
+    biasa ditelusuri rekursif. Objek yang sama hanya dihitung sekali.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    usage = getattr(obj, 'memory_usage', None)
+    if callable(usage) and not isinstance(obj, type):
+        try:
+            result = usage(deep=True)  # pandas
+        except TypeError:
+            result = usage()
+        if isinstance(result, dict):
+            return int(result['total'])
+        return int(result.sum()) if hasattr(result, 'sum') else int(result)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _seen) for item in obj)
+    elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+        size += estimate_size(vars(obj), _seen)
+    return size
+
+
+class SessionMemory:
+    """
+    Accounting memori per session Streamlit dan spill session idle (thread-safe)
+
+    Setiap rerun mendaftarkan objek session (track). Objek yang bisa
+    di-weakref dipegang lewat weakref, jadi tab yang sudah ditutup tidak
+    tertahan di memori oleh registry ini. Session yang tidak aktif
+    selama `idle_ttl` detik, atau session paling lama tidak aktif saat
+    total melewati `max_mb`, di-spill: objek durable di-pickle ke file
+    SQLite, lalu semua objek yang di-weakref dikosongkan di tempat lewat
+    clear(). Rerun berikutnya memulihkan objek durable lewat resume().
+
+    Session yang sedang dirender (in_use) tidak pernah dikosongkan. Payload
+    spill ditandatangani HMAC dengan kunci acak per proses, jadi hanya
+    payload yang ditulis proses ini yang di-unpickle. Cache process-wide
+    milik user (register_shared) ikut dihitung dan dilepas saat user
+    tidak punya session aktif lagi.
+    """
+
+    def __init__(self, idle_ttl=900, max_mb=512, min_idle=60, spill_path=None, spill_ttl=604800,
+                 sweep_interval=60):
+        """
+        Args:
+            idle_ttl (float): Session tidak aktif selama ini (detik) di-spill
+            max_mb (float): Batas total memori semua session; 0 = tanpa batas
+            min_idle (float): Session yang aktif lebih baru dari ini tidak
+                di-spill karena batas memori
+            spill_path (str): File SQLite untuk spill (None = objek durable
+                tidak di-spill, hanya cache yang dikosongkan)
+            spill_ttl (float): Spill yang tidak di-resume selama ini dibuang
+            sweep_interval (float): Jeda antar sweep; 0 mematikan thread sweep
+        """
+        self.idle_ttl = idle_ttl
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.min_idle = min_idle
+        self.spill_path = spill_path
+        self.spill_ttl = spill_ttl
+        self.sweep_interval = sweep_interval
+
+        self._lock = threading.Lock()
+        # session_id -> entry, urut dari yang paling lama tidak aktif
+        self._sessions = OrderedDict()
+        self._session_locks = {}  # session_id -> RLock, dipegang selama render
+        self._shared = {}  # nama cache -> (usage_by_user, release_user)
+        self._shared_bytes = 0
+        self._key = secrets.token_bytes(32)
+        self._db = None
+        self._sweeper = None
+        self._stats = {
+            'spilled_idle': 0,
+            'spilled_memory': 0,
+            'restored': 0,
+            'spill_errors': 0,
+            'forgotten': 0
+        }
+
+    def _get_db(self):
+        """Koneksi SQLite (dibuat saat pertama dipakai); panggil di dalam lock"""
+        if self._db is None and self.spill_path:
+            _open_private(self.spill_path)
+            self._db = sqlite3.connect(self.spill_path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute(SPILL_DDL)
+            self._db.commit()
+        return self._db
+
+    def _ensure_sweeper(self):
+        if self._sweeper is None and self.sweep_interval > 0:
+            self._sweeper = threading.Thread(
+                target=self._sweep_loop, name='session-memory-sweeper', daemon=True
+            )
+            self._sweeper.start()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception:
+                pass
+
+    def _sign(self, payload):
+        return hmac.new(self._key, payload, hashlib.sha256).digest() + payload
+
+    def _verify(self, blob):
+        """Payload tanpa tanda tangan, atau None jika bukan tulisan proses ini"""
+        signature, payload = blob[:32], blob[32:]
+        expected = hmac.new(self._key, payload, hashlib.sha256).digest()
+        return payload if hmac.compare_digest(signature, expected) else None
+
+    def register_shared(self, name, usage_by_user, release_user):
+        """
+        Daftarkan cache process-wide yang isinya milik user tertentu
+
+        Ukurannya dihitung sekali per user (meski user punya beberapa
+        session), dilaporkan di usage() dan ikut batas max_mb. Entry user
+        dilepas saat session terakhirnya di-spill atau hilang.
+
+        Args:
+            name (str): Nama cache di rincian usage
+            usage_by_user (callable): () -> {user_id: byte}
+            release_user (callable): (user_id) -> None, buang entry milik user
+        """
+        with self._lock:
+            self._shared[name] = (usage_by_user, release_user)
+
+    def _shared_usage(self):
+        """{user_id: {nama cache: byte}}; panggil di dalam lock"""
+        usage = {}
+        for name, (usage_by_user, _) in self._shared.items():
+            for user_id, size in usage_by_user().items():
+                usage.setdefault(user_id, {})[name] = size
+        return usage
+
+    def _release_shared(self, user_id):
+        """Lepas cache bersama milik user; panggil di dalam lock"""
+        for _, release_user in self._shared.values():
+            release_user(user_id)
+
+    def _has_live_session(self, user_id, exclude=None):
+        return any(
+            entry['user_id'] == user_id and not entry['spilled']
+            for session_id, entry in self._sessions.items() if session_id != exclude
+        )
+
+    @contextmanager
+    def in_use(self, session_id):
+        """
+        Tandai session sedang dirender; sweep tidak mengosongkannya selama itu
+
+        Dipegang dari awal rerun (sebelum resume) sampai halaman selesai.
+        """
+        with self._lock:
+            lock = self._session_locks.setdefault(session_id, threading.RLock())
+        with lock:
+            yield
+
+    def resume(self, session_id):
+        """
+        Tandai session aktif; pulihkan objek durable jika session pernah di-spill
+
+        Dipanggil di awal setiap rerun, sebelum track().
+
+        Returns:
+            dict: {nama: objek} yang dipulihkan jika session pernah di-spill
+                (kosong jika spill-nya sudah tidak ada), atau None jika
+                session tidak di-spill
+        """
+        with self._lock:
+            self._ensure_sweeper()
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            entry['last_seen'] = time.time()
+            self._sessions.move_to_end(session_id)
+            if not entry['spilled']:
+                return None
+
+            entry['spilled'] = False
+            db = self._get_db()
+            if db is None:
+                return {}
+            row = db.execute(
+                "SELECT payload FROM session_spill WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return {}
+            db.execute("DELETE FROM session_spill WHERE session_id = ?", (session_id,))
+            db.commit()
+            payload = self._verify(row[0])
+            if payload is None:
+                self._stats['spill_errors'] += 1
+                return {}
+            self._stats['restored'] += 1
+        # Tanda tangan cocok: payload ditulis oleh proses ini sendiri
+        return pickle.loads(payload)
+
+    def track(self, session_id, user_id=None, durable=None, **objects):
+        """
+        Daftarkan objek session untuk accounting dan spill
+
+        Args:
+            session_id (str): Session id Streamlit
+            user_id (int): User yang login (None jika belum login)
+            durable (dict): {nama: objek} yang di-pickle saat spill
+            **objects: Objek lain (cache) yang cukup dikosongkan saat spill;
+                objek yang tidak bisa di-weakref (misalnya dict user_data)
+                hanya dicatat ukurannya
+        """
+        now = time.time()
+        named = dict(objects, **(durable or {}))
+        refs = {}
+        fixed = {}
+        for name, obj in named.items():
+            if obj is None:
+                continue
+            try:
+                refs[name] = weakref.ref(obj)
+            except TypeError:
+                fixed[name] = estimate_size(obj)
+
+        with self._lock:
+            self._ensure_sweeper()
+            self._sessions[session_id] = {
+                'user_id': user_id,
+                'last_seen': now,
+                'refs': refs,
+                'fixed': fixed,
+                'durable': tuple(durable or ()),
+                'spilled': False,
+                'spilled_at': None,
+                'size': None
+            }
+            self._sessions.move_to_end(session_id)
+
+    def forget(self, session_id):
+        """Lepas session dari registry dan buang spill-nya (misalnya saat logout)"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._session_locks.pop(session_id, None)
+            db = self._get_db()
+            if db is not None:
+                db.execute("DELETE FROM session_spill WHERE session_id = ?", (session_id,))
+                db.commit()
+
+    @staticmethod
+    def _live_objects(entry):
+        objects = {}
+        for name, ref in entry['refs'].items():
+            obj = ref()
+            if obj is not None:
+                objects[name] = obj
+        return objects
+
+    def _measure(self, entry):
+        """Ukuran per objek session (byte); panggil di dalam lock"""
+        sizes = dict(entry['fixed'])
+        for name, obj in self._live_objects(entry).items():
+            sizes[name] = estimate_size(obj)
+        entry['size'] = sum(sizes.values())
+        return sizes
+
+    def _spill(self, session_id, entry):
+        """
+        Pickle objek durable ke file lalu kosongkan objek session; panggil di dalam lock
+
+        Session yang sedang dirender dilewati (lock-nya tidak ditunggu).
+
+        Returns:
+            bool: True jika session di-spill
+        """
+        lock = self._session_locks.get(session_id)
+        if lock is not None and not lock.acquire(blocking=False):
+            return False
+        try:
+            return self._spill_unlocked(session_id, entry)
+        finally:
+            if lock is not None:
+                lock.release()
+
+    def _spill_unlocked(self, session_id, entry):
+        objects = self._live_objects(entry)
+        durable = {name: objects[name] for name in entry['durable'] if name in objects}
+        db = self._get_db()
+        if durable and db is not None:
+            try:
+                payload = self._sign(pickle.dumps(durable, protocol=pickle.HIGHEST_PROTOCOL))
+                db.execute(
+                    "INSERT OR REPLACE INTO session_spill (session_id, user_id, payload, spilled_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (session_id, entry['user_id'], payload, time.time())
+                )
+                db.commit()
+            except Exception:
+                self._stats['spill_errors'] += 1
+                return False
+        elif durable:
+            # Tanpa file spill, objek durable tetap di memori
+            objects = {name: obj for name, obj in objects.items() if name not in durable}
+
+        for obj in objects.values():
+            clear = getattr(obj, 'clear', None)
+            if callable(clear):
+                clear()
+        entry['spilled'] = True
+        entry['spilled_at'] = time.time()
+        entry['size'] = sum(entry['fixed'].values())
+        return True
+
+    def sweep(self):
+        """
+        Lupakan session yang sudah hilang, spill session idle, lalu spill
+        session paling lama tidak aktif sampai total di bawah batas memori
+
+        Returns:
+            dict: Jumlah session yang di-spill (idle, memory) dan dilupakan
+        """
+        now = time.time()
+        result = {'idle': 0, 'memory': 0, 'forgotten': 0}
+        with self._lock:
+            for session_id, entry in list(self._sessions.items()):
+                gone = entry['refs'] and not self._live_objects(entry)
+                abandoned = entry['last_seen'] <= now - self.spill_ttl
+                if (gone and not entry['spilled']) or abandoned:
+                    del self._sessions[session_id]
+                    self._session_locks.pop(session_id, None)
+                    result['forgotten'] += 1
+                elif not entry['spilled'] and now - entry['last_seen'] > self.idle_ttl:
+                    if self._spill(session_id, entry):
+                        result['idle'] += 1
+
+            # Cache bersama milik user yang tidak punya session aktif dilepas
+            live = Counter(entry['user_id'] for entry in self._sessions.values() if not entry['spilled'])
+            shared = self._shared_usage()
+            for user_id in [user_id for user_id in shared if not live[user_id]]:
+                self._release_shared(user_id)
+                del shared[user_id]
+            self._shared_bytes = sum(sum(sizes.values()) for sizes in shared.values())
+
+            if self.max_bytes > 0:
+                total = self._shared_bytes
+                for entry in self._sessions.values():
+                    if not entry['spilled']:
+                        self._measure(entry)
+                    total += entry['size'] or 0
+                # OrderedDict urut dari yang paling lama tidak aktif
+                for session_id, entry in list(self._sessions.items()):
+                    if total <= self.max_bytes:
+                        break
+                    if entry['spilled'] or now - entry['last_seen'] < self.min_idle:
+                        continue
+                    before = entry['size'] or 0
+                    if self._spill(session_id, entry):
+                        total -= before - entry['size']
+                        result['memory'] += 1
+                        user_id = entry['user_id']
+                        live[user_id] -= 1
+                        if not live[user_id] and user_id in shared:
+                            self._release_shared(user_id)
+                            total -= sum(shared.pop(user_id).values())
+                self._shared_bytes = sum(sum(sizes.values()) for sizes in shared.values())
+
+            db = self._get_db()
+            if db is not None:
+                db.execute("DELETE FROM session_spill WHERE spilled_at <= ?", (now - self.spill_ttl,))
+                db.commit()
+
+            self._stats['spilled_idle'] += result['idle']
+            self._stats['spilled_memory'] += result['memory']
+            self._stats['forgotten'] += result['forgotten']
+        return result
+
+    def usage(self, session_id=None):
+        """
+        Rincian memori per session
+
+        Args:
+            session_id (str): Hanya session ini (default semua session)
+
+        Cache bersama (register_shared) milik user ikut di `bytes` setiap
+        session aktif user itu.
+
+        Returns:
+            list: Dict per session (session_id, user_id, idle_seconds,
+                spilled, bytes {nama objek: byte}, total), terbesar dulu
+        """
+        now = time.time()
+        rows = []
+        with self._lock:
+            items = (
+                [(session_id, self._sessions[session_id])] if session_id in self._sessions else []
+            ) if session_id is not None else list(self._sessions.items())
+            shared = self._shared_usage() if items else {}
+            for sid, entry in items:
+                if entry['spilled']:
+                    sizes = dict(entry['fixed'])
+                else:
+                    sizes = self._measure(entry)
+                    sizes.update(shared.get(entry['user_id'], {}))
+                rows.append({
+                    'session_id': sid,
+                    'user_id': entry['user_id'],
+                    'idle_seconds': round(now - entry['last_seen'], 1),
+                    'spilled': entry['spilled'],
+                    'bytes': sizes,
+                    'total': sum(sizes.values())
+                })
+        rows.sort(key=lambda row: row['total'], reverse=True)
+        return rows
+
+    def stats(self):
+        """
+        Statistik memori session
+
+        Returns:
+            dict: Jumlah session (aktif/spilled), total byte yang terakhir
+                diukur (termasuk cache bersama, shared_bytes), batas memori
+                dan counter spill/restore
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            spilled = sum(1 for entry in self._sessions.values() if entry['spilled'])
+            stats['sessions'] = len(self._sessions)
+            stats['spilled'] = spilled
+            stats['in_memory'] = len(self._sessions) - spilled
+            stats['shared_bytes'] = self._shared_bytes
+            stats['total_bytes'] = (
+                sum(entry['size'] or 0 for entry in self._sessions.values()) + self._shared_bytes
+            )
+        stats['max_bytes'] = self.max_bytes
+        stats['persistent'] = bool(self.spill_path)
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Registry memori global, dipakai bersama semua session dalam satu proses
+session_memory = SessionMemory(**SESSION_MEMORY)
@@ -0,0 +1,266 @@
+# services/session_store.py
+
+import hashlib
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config.settings import SESSION_STORE
+
+SESSIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS sessions (
+        token_hash TEXT PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        user_data TEXT NOT NULL,
+        expires_at REAL NOT NULL,
+        last_seen REAL NOT NULL
+    )
+"""
+
+
+def _token_hash(token):
+    """Token tidak disimpan mentah, supaya file session tidak bisa dipakai login"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class SessionStore:
+    """
+    Session server-side dengan token opaque (thread-safe)
+
+    Entry disimpan di memori dengan eviction LRU, dan opsional di file
+    SQLite supaya tetap berlaku setelah restart. Session berakhir pada
+    `ttl` detik sejak dibuat, atau lebih awal jika tidak dipakai selama
+    `idle_ttl` detik. Sweep berkala membuang entry kedaluwarsa dari
+    memori dan file.
+    """
+
+    def __init__(self, ttl=604800, idle_ttl=86400, max_size=10000, path=None, sweep_interval=60):
+        """
+        Args:
+            ttl (float): Umur maksimal session dalam detik
+            idle_ttl (float): Batas tidak aktif sebelum session berakhir
+            max_size (int): Jumlah session maksimal di memori
+            path (str): File SQLite untuk persistensi (None = memori saja)
+            sweep_interval (float): Jeda antar sweep; 0 mematikan thread sweep
+        """
+        self.ttl = ttl
+        self.idle_ttl = idle_ttl
+        self.max_size = max_size
+        self.path = path
+        self.sweep_interval = sweep_interval
+
+        self._lock = threading.Lock()
+        # token_hash -> [expires_at, last_seen, user_data, last_seen yang tersimpan di file]
+        self._data = OrderedDict()
+        self._db = None
+        self._sweeper = None
+        self._stats = {
+            'created': 0,
+            'resumed': 0,
+            'misses': 0,
+            'expired': 0,
+            'evicted': 0,
+            'revoked': 0,
+            'loaded_from_disk': 0
+        }
+
+    def _get_db(self):
+        """Koneksi SQLite (dibuat saat pertama dipakai); panggil di dalam lock"""
+        if self._db is None and self.path:
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute(SESSIONS_DDL)
+            self._db.commit()
+        return self._db
+
+    def _ensure_sweeper(self):
+        if self._sweeper is None and self.sweep_interval > 0:
+            self._sweeper = threading.Thread(
+                target=self._sweep_loop, name='session-sweeper', daemon=True
+            )
+            self._sweeper.start()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception:
+                pass
+
+    def _is_live(self, expires_at, last_seen, now):
+        return expires_at > now and last_seen + self.idle_ttl > now
+
+    def _remember(self, key, entry):
+        """Simpan entry di memori dengan LRU eviction; panggil di dalam lock"""
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            # Entry yang dibuang tetap ada di file (jika persisten)
+            self._data.popitem(last=False)
+            self._stats['evicted'] += 1
+
+    def create(self, user_data):
+        """
+        Buat session baru untuk user yang berhasil login
+
+        Args:
+            user_data (dict): Data user (minimal user_id dan username)
+
+        Returns:
+            str: Token session opaque
+        """
+        token = secrets.token_urlsafe(32)
+        key = _token_hash(token)
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._ensure_sweeper()
+            self._remember(key, [expires_at, now, dict(user_data), now])
+            self._stats['created'] += 1
+            db = self._get_db()
+            if db is not None:
+                db.execute(
+                    "INSERT INTO sessions (token_hash, user_id, user_data, expires_at, last_seen) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, user_data['user_id'], json.dumps(user_data, default=str), expires_at, now)
+                )
+                db.commit()
+        return token
+
+    def get(self, token):
+        """
+        Resume session dari token dan perbarui waktu aktif terakhir
+
+        Returns:
+            dict: user_data, atau None jika token tidak dikenal/kedaluwarsa
+        """
+        if not token:
+            return None
+        key = _token_hash(token)
+        now = time.time()
+        with self._lock:
+            self._ensure_sweeper()
+            entry = self._data.get(key)
+            if entry is None:
+                entry = self._load(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            expires_at, last_seen, user_data, persisted_at = entry
+            if not self._is_live(expires_at, last_seen, now):
+                self._delete(key)
+                self._stats['expired'] += 1
+                return None
+
+            entry[1] = now
+            self._data.move_to_end(key)
+            # Tulis last_seen ke file secukupnya saja, bukan di setiap rerun
+            db = self._get_db()
+            if db is not None and now - persisted_at > self.idle_ttl / 10:
+                db.execute("UPDATE sessions SET last_seen = ? WHERE token_hash = ?", (now, key))
+                db.commit()
+                entry[3] = now
+            self._stats['resumed'] += 1
+            return dict(user_data)
+
+    def _load(self, key):
+        """Ambil entry dari file ke memori; panggil di dalam lock"""
+        db = self._get_db()
+        if db is None:
+            return None
+        row = db.execute(
+            "SELECT expires_at, last_seen, user_data FROM sessions WHERE token_hash = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        entry = [row[0], row[1], json.loads(row[2]), row[1]]
+        self._remember(key, entry)
+        self._stats['loaded_from_disk'] += 1
+        return entry
+
+    def _delete(self, key):
+        """Hapus entry dari memori dan file; panggil di dalam lock"""
+        self._data.pop(key, None)
+        db = self._get_db()
+        if db is not None:
+            db.execute("DELETE FROM sessions WHERE token_hash = ?", (key,))
+            db.commit()
+
+    def revoke(self, token):
+        """Akhiri session (logout)"""
+        if not token:
+            return
+        with self._lock:
+            self._delete(_token_hash(token))
+            self._stats['revoked'] += 1
+
+    def revoke_user(self, user_id):
+        """Akhiri semua session milik user (misalnya setelah ganti password)"""
+        with self._lock:
+            keys = [k for k, entry in self._data.items() if entry[2].get('user_id') == user_id]
+            for key in keys:
+                del self._data[key]
+            db = self._get_db()
+            if db is not None:
+                cursor = db.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+                db.commit()
+                revoked = max(len(keys), cursor.rowcount)
+            else:
+                revoked = len(keys)
+            self._stats['revoked'] += revoked
+        return revoked
+
+    def sweep(self):
+        """
+        Buang session kedaluwarsa (absolut maupun idle) dari memori dan file
+
+        Returns:
+            int: Jumlah session di memori yang dibuang
+        """
+        now = time.time()
+        with self._lock:
+            expired = [
+                key for key, (expires_at, last_seen, _, _) in self._data.items()
+                if not self._is_live(expires_at, last_seen, now)
+            ]
+            for key in expired:
+                del self._data[key]
+            self._stats['expired'] += len(expired)
+            db = self._get_db()
+            if db is not None:
+                db.execute(
+                    "DELETE FROM sessions WHERE expires_at <= ? OR last_seen <= ?",
+                    (now, now - self.idle_ttl)
+                )
+                db.commit()
+        return len(expired)
+
+    def stats(self):
+        """
+        Statistik session store
+
+        Returns:
+            dict: Counter create/resume/expire/evict/revoke dan jumlah
+                session di memori
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._data)
+        stats['max_size'] = self.max_size
+        stats['persistent'] = bool(self.path)
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Session store global, dipakai bersama semua session dalam satu proses
+session_store = SessionStore(**SESSION_STORE)
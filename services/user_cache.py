@@ -0,0 +1,131 @@
+# services/user_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+from config.settings import USER_CACHE
+
+
+class TTLCache:
+    """
+    Cache in-process dengan TTL per entry dan eviction LRU (thread-safe)
+
+    Nilai None disimpan sebagai negative entry, misalnya untuk username
+    yang tidak ada, sehingga `get` mengembalikan (hit, value) supaya
+    pemanggil bisa membedakan miss dengan negative hit.
+    """
+
+    def __init__(self, max_size=10000, ttl=300, negative_ttl=30):
+        """
+        Args:
+            max_size (int): Jumlah entry maksimal sebelum LRU eviction
+            ttl (float): Umur entry positif dalam detik
+            negative_ttl (float): Umur negative entry dalam detik
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._stats = {
+            'hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+
+    def get(self, key):
+        """
+        Ambil entry dari cache
+
+        Returns:
+            tuple: (hit, value); value None pada negative hit
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return False, None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return False, None
+            self._data.move_to_end(key)
+            if value is None:
+                self._stats['negative_hits'] += 1
+            else:
+                self._stats['hits'] += 1
+            return True, value
+
+    def set(self, key, value, ttl=None):
+        """Simpan entry; value None berarti negative entry"""
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def delete(self, *keys):
+        """Hapus satu atau beberapa entry (invalidation)"""
+        with self._lock:
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    self._stats['invalidations'] += 1
+
+    def delete_where(self, predicate):
+        """
+        Hapus semua entry yang key-nya memenuhi predicate
+
+        Returns:
+            int: Jumlah entry yang dihapus
+        """
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            self._stats['invalidations'] += len(keys)
+        return len(keys)
+
+    def items(self):
+        """Snapshot (key, value) semua entry yang belum kedaluwarsa"""
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value) for key, (expires_at, value) in self._data.items() if expires_at > now]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """
+        Statistik cache
+
+        Returns:
+            dict: hits, negative_hits, misses, evictions, expirations,
+                invalidations, size dan hit_rate
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._data)
+        lookups = stats['hits'] + stats['negative_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['negative_hits']) / lookups if lookups else 0.0
+        return stats
+
+
+# Cache record user (user_id, username, password hash, created_at), dipakai
+# bersama semua session dalam satu proses dengan key ('id', user_id) dan
+# ('username', username)
+user_cache = TTLCache(
+    max_size=USER_CACHE["max_size"],
+    ttl=USER_CACHE["ttl"],
+    negative_ttl=USER_CACHE["negative_ttl"]
+)
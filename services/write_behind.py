@@ -0,0 +1,464 @@
+# services/write_behind.py
+
+import atexit
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from config.settings import WRITE_BEHIND
+from services.budget_repository import BudgetRepository, month_bounds
+from services.user_cache import TTLCache
+
+write_behind_logger = logging.getLogger('kosbudget.write_behind')
+
+# Id sementara (dipakai negatif) untuk expense di antrian; diawali time_ns
+# supaya tidak bentrok dengan id dari proses sebelumnya di store yang di-spill
+_pending_ids = itertools.count(time.time_ns())
+
+# Generasi perubahan per user; naik setiap antrian atau data yang sudah
+# commit berubah, dipakai sebagai bagian key cache ringkasan dashboard
+_generations = itertools.count(1)
+
+
+def _new_buffer(now):
+    return {'expenses': [], 'categories': {}, 'budget': None, 'since': now, 'attempts': 0}
+
+
+def _buffer_ops(buffer):
+    return len(buffer['expenses']) + len(buffer['categories']) + (buffer['budget'] is not None)
+
+
+class WriteBehindQueue:
+    """
+    Antrian write-behind per proses untuk perubahan budget (thread-safe)
+
+    Insert expense, update kategori dan budget bulanan dikumpulkan per
+    user: update kategori dan budget yang sama digabung (nilai terakhir
+    menang), expense tetap urut. Thread flusher menulis semua antrian
+    dalam satu transaksi (BudgetRepository.write_batch) saat jumlah
+    antrian mencapai `batch_size` atau saat perubahan tertua berumur
+    `max_delay` detik, jadi perubahan yang hilang saat proses mati paling
+    lama `max_delay` detik. `max_delay` 0 berarti setiap perubahan
+    langsung ditulis.
+
+    Kategori baru tetap ditulis langsung (butuh category_id dari
+    database). Expense di antrian mendapat id sementara (negatif); setelah
+    flush id itu dipetakan ke expense_id database, jadi delete_expense
+    tetap bisa menghapus expense yang dicatat lewat antrian.
+    """
+
+    def __init__(self, max_delay=2.0, batch_size=500, max_pending=10000, max_retries=5,
+                 resolved_ttl=86400):
+        """
+        Args:
+            max_delay (float): Umur maksimal perubahan di antrian (detik); 0 = write-through
+            batch_size (int): Jumlah perubahan yang memicu flush lebih awal
+            max_pending (int): Batas antrian; jika tercapai, penulis ikut flush (backpressure)
+            max_retries (int): Flush gagal berturut-turut sebelum perubahan user dibuang
+            resolved_ttl (float): Umur mapping id sementara -> expense_id (detik)
+        """
+        self.max_delay = max_delay
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # satu flush pada satu waktu, urutan per user terjaga
+        self._wakeup = threading.Event()
+        self._buffers = OrderedDict()  # user_id -> buffer, urut dari perubahan tertua
+        self._inflight = {}  # user_id -> buffer yang sedang ditulis flush
+        self._generation = {}  # user_id -> generasi perubahan terakhir
+        self._pending = 0
+        self._flusher = None
+        self._latencies = deque(maxlen=1000)
+        # id sementara -> expense_id database, untuk expense yang sudah di-flush
+        self._resolved = TTLCache(max_size=max_pending * 10, ttl=resolved_ttl)
+        self._stats = {
+            'enqueued': 0,
+            'coalesced': 0,
+            'flushes': 0,
+            'flushed': 0,
+            'failed_flushes': 0,
+            'dropped': 0,
+            'max_lag_ms': 0.0
+        }
+
+    @property
+    def enabled(self):
+        return self.max_delay > 0
+
+    def _ensure_flusher(self):
+        if self._flusher is None:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name='write-behind-flusher', daemon=True
+            )
+            self._flusher.start()
+
+    def _next_timeout(self):
+        """Sisa waktu sampai perubahan tertua mencapai max_delay"""
+        with self._lock:
+            if not self._buffers:
+                return self.max_delay
+            oldest = next(iter(self._buffers.values()))['since']
+        return max(oldest + self.max_delay - time.time(), 0)
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait(timeout=self._next_timeout())
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+    def _buffer(self, user_id, now):
+        """Buffer milik user (dibuat jika belum ada); panggil di dalam lock"""
+        buffer = self._buffers.get(user_id)
+        if buffer is None:
+            buffer = self._buffers[user_id] = _new_buffer(now)
+        return buffer
+
+    def _touch(self, user_id):
+        """Tandai data user berubah; panggil di dalam lock"""
+        self._generation[user_id] = next(_generations)
+
+    def generation(self, user_id):
+        """
+        Penanda perubahan data expense/budget user di proses ini
+
+        Berubah setiap ada perubahan yang diantrikan, dibuang, ditulis
+        langsung atau di-commit flush, jadi bisa dipakai sebagai key cache
+        untuk turunan pending_totals dan tabel ringkasan.
+
+        Returns:
+            int: Generasi terakhir (0 jika belum pernah berubah)
+        """
+        with self._lock:
+            return self._generation.get(user_id, 0)
+
+    def _after_enqueue(self):
+        self._ensure_flusher()
+        if self._pending >= self.max_pending:
+            self.flush()
+        elif self._pending >= self.batch_size:
+            self._wakeup.set()
+
+    def add_expense(self, user_id, category_id, amount, spent_at=None):
+        """
+        Catat pengeluaran lewat antrian
+
+        Returns:
+            tuple: (success, expense_id/error_message); expense_id negatif
+                berarti id sementara, pengeluaran masih di antrian
+        """
+        spent_at = spent_at or datetime.now()
+        if not self.enabled:
+            result = BudgetRepository.add_expense(user_id, category_id, amount, spent_at)
+            with self._lock:
+                self._touch(user_id)
+            return result
+        pending_id = -next(_pending_ids)
+        with self._lock:
+            self._touch(user_id)
+            self._buffer(user_id, time.time())['expenses'].append(
+                (user_id, category_id, amount, spent_at, pending_id)
+            )
+            self._pending += 1
+            self._stats['enqueued'] += 1
+        self._after_enqueue()
+        return True, pending_id
+
+    def update_category(self, user_id, category_id, priority, urgency, frequency, impact):
+        """
+        Perbarui kriteria kategori yang sudah ada di database lewat antrian
+
+        Returns:
+            tuple: (success, message)
+        """
+        update = (user_id, category_id, priority, urgency, frequency, impact, datetime.now())
+        if not self.enabled:
+            return BudgetRepository.write_batch(category_updates=[update])
+        with self._lock:
+            categories = self._buffer(user_id, time.time())['categories']
+            if category_id in categories:
+                self._stats['coalesced'] += 1
+            else:
+                self._pending += 1
+            categories[category_id] = update
+            self._stats['enqueued'] += 1
+        self._after_enqueue()
+        return True, "Perubahan kategori diantrikan"
+
+    def set_monthly_budget(self, user_id, monthly_budget):
+        """
+        Simpan budget bulanan lewat antrian
+
+        Returns:
+            tuple: (success, message)
+        """
+        if not self.enabled:
+            result = BudgetRepository.set_monthly_budget(user_id, monthly_budget)
+            with self._lock:
+                self._touch(user_id)
+            return result
+        with self._lock:
+            self._touch(user_id)
+            buffer = self._buffer(user_id, time.time())
+            if buffer['budget'] is not None:
+                self._stats['coalesced'] += 1
+            else:
+                self._pending += 1
+            buffer['budget'] = (user_id, monthly_budget, datetime.now())
+            self._stats['enqueued'] += 1
+        self._after_enqueue()
+        return True, "Budget diantrikan"
+
+    def discard_category(self, user_id, category_id):
+        """
+        Buang perubahan antrian untuk kategori yang akan dihapus
+
+        Menunggu flush yang sedang berjalan selesai dulu, supaya tidak ada
+        expense kategori itu yang ditulis setelah kategorinya dihapus.
+
+        Returns:
+            int: Jumlah perubahan yang dibuang
+        """
+        with self._flush_lock, self._lock:
+            buffer = self._buffers.get(user_id)
+            if buffer is None:
+                return 0
+            before = _buffer_ops(buffer)
+            buffer['expenses'] = [exp for exp in buffer['expenses'] if exp[1] != category_id]
+            buffer['categories'].pop(category_id, None)
+            discarded = before - _buffer_ops(buffer)
+            self._pending -= discarded
+            self._touch(user_id)
+            if not _buffer_ops(buffer):
+                del self._buffers[user_id]
+        return discarded
+
+    def resolve_expense_id(self, expense_id):
+        """
+        expense_id database untuk id dari add_expense
+
+        Returns:
+            int: expense_id database, atau None jika masih di antrian,
+                dibuang setelah gagal, atau mapping-nya sudah kedaluwarsa
+        """
+        if expense_id is None or expense_id >= 0:
+            return expense_id
+        hit, value = self._resolved.get(expense_id)
+        return value if hit else None
+
+    def delete_expense(self, user_id, expense_id):
+        """
+        Hapus pengeluaran, baik yang masih di antrian maupun yang sudah di database
+
+        Id sementara yang masih di antrian cukup dibuang dari antrian
+        (menunggu flush yang sedang berjalan); yang sudah di-flush
+        dipetakan ke expense_id database lalu dihapus.
+
+        Returns:
+            tuple: (success, message)
+        """
+        if expense_id is not None and expense_id < 0:
+            with self._flush_lock, self._lock:
+                buffer = self._buffers.get(user_id)
+                expenses = buffer['expenses'] if buffer else []
+                for index, exp in enumerate(expenses):
+                    if exp[4] == expense_id:
+                        del expenses[index]
+                        self._pending -= 1
+                        self._touch(user_id)
+                        if not _buffer_ops(buffer):
+                            del self._buffers[user_id]
+                        return True, "Pengeluaran dihapus dari antrian"
+            expense_id = self.resolve_expense_id(expense_id)
+            if expense_id is None:
+                return False, "Pengeluaran tidak ditemukan"
+        result = BudgetRepository.delete_expense(user_id, expense_id)
+        with self._lock:
+            self._touch(user_id)
+        return result
+
+    def pending_totals(self, user_id, month=None):
+        """
+        Total expense user yang belum commit ke database, per kategori
+
+        Termasuk buffer yang sedang ditulis flush, supaya ringkasan tidak
+        kekurangan selama transaksi flush berjalan.
+
+        Args:
+            user_id (int): User ID
+            month (date): Tanggal 1 bulan yang diminta (default bulan ini)
+
+        Returns:
+            dict: {category_id: {'total', 'count'}}
+        """
+        month = month or month_bounds()[0].date()
+        totals = {}
+        with self._lock:
+            buffers = [self._inflight.get(user_id), self._buffers.get(user_id)]
+            expenses = [exp for buffer in buffers if buffer for exp in buffer['expenses']]
+            for _, category_id, amount, spent_at, _ in expenses:
+                if month_bounds(spent_at)[0].date() == month:
+                    entry = totals.setdefault(category_id, {'total': 0, 'count': 0})
+                    entry['total'] += amount
+                    entry['count'] += 1
+        return totals
+
+    def _requeue(self, user_id, buffer, error):
+        """Kembalikan buffer yang gagal ditulis ke depan antrian; panggil di dalam lock"""
+        buffer['attempts'] += 1
+        if buffer['attempts'] >= self.max_retries:
+            dropped = _buffer_ops(buffer)
+            self._stats['dropped'] += dropped
+            write_behind_logger.error(json.dumps({
+                'event': 'write_behind_dropped',
+                'user_id': user_id,
+                'operations': dropped,
+                'attempts': buffer['attempts'],
+                'message': str(error)
+            }))
+            return
+
+        newer = self._buffers.pop(user_id, None)
+        if newer is not None:
+            # Perubahan yang masuk selama flush lebih baru, jadi menang
+            buffer['expenses'].extend(newer['expenses'])
+            self._pending -= _buffer_ops(newer)
+            buffer['categories'].update(newer['categories'])
+            buffer['budget'] = newer['budget'] or buffer['budget']
+        self._buffers[user_id] = buffer
+        self._buffers.move_to_end(user_id, last=False)
+        self._pending += _buffer_ops(buffer)
+
+    @staticmethod
+    def _write(buffers):
+        return BudgetRepository.write_batch(
+            expenses=[exp[:4] for buffer in buffers for exp in buffer['expenses']],
+            category_updates=[update for buffer in buffers for update in buffer['categories'].values()],
+            budgets=[buffer['budget'] for buffer in buffers if buffer['budget'] is not None]
+        )
+
+    def _resolve(self, buffers, expense_ids):
+        """Catat expense_id database untuk id sementara buffer yang berhasil ditulis"""
+        pending_ids = (exp[4] for buffer in buffers for exp in buffer['expenses'])
+        for pending_id, expense_id in zip(pending_ids, expense_ids):
+            self._resolved.set(pending_id, expense_id)
+
+    def flush(self, user_id=None):
+        """
+        Tulis antrian ke database sekarang
+
+        Semua user ditulis dalam satu transaksi; jika gagal, setiap user
+        dicoba di transaksinya sendiri supaya satu user bermasalah tidak
+        menahan user lain. Perubahan yang gagal dikembalikan ke antrian.
+
+        Args:
+            user_id (int): Hanya antrian user ini (default semua user)
+
+        Returns:
+            tuple: (success, jumlah perubahan yang ditulis/error_message)
+        """
+        with self._flush_lock:
+            with self._lock:
+                if user_id is None:
+                    taken = self._buffers
+                    self._buffers = OrderedDict()
+                else:
+                    buffer = self._buffers.pop(user_id, None)
+                    taken = OrderedDict([(user_id, buffer)] if buffer is not None else [])
+                operations = sum(_buffer_ops(buffer) for buffer in taken.values())
+                self._pending -= operations
+                # Tetap terlihat di pending_totals sampai transaksinya commit
+                self._inflight = dict(taken)
+            if not taken:
+                return True, 0
+
+            started = time.perf_counter()
+            failed = {}
+            try:
+                success, result = self._write(list(taken.values()))
+                if success:
+                    self._resolve(taken.values(), result['expense_ids'])
+                    with self._lock:
+                        self._inflight = {}
+                        for uid in taken:
+                            self._touch(uid)
+                elif len(taken) > 1:
+                    for uid, buffer in taken.items():
+                        ok, user_result = self._write([buffer])
+                        if ok:
+                            self._resolve([buffer], user_result['expense_ids'])
+                            with self._lock:
+                                self._inflight.pop(uid, None)
+                                self._touch(uid)
+                        else:
+                            failed[uid] = (buffer, user_result)
+                else:
+                    failed = {uid: (buffer, result) for uid, buffer in taken.items()}
+            except Exception as e:
+                failed = {uid: (buffer, str(e)) for uid, buffer in taken.items()}
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            now = time.time()
+
+            with self._lock:
+                self._inflight = {}
+                for uid in taken:
+                    self._touch(uid)
+                for uid, (buffer, error) in failed.items():
+                    self._requeue(uid, buffer, error)
+                written = operations - sum(_buffer_ops(buffer) for buffer, _ in failed.values())
+                lags = [now - buffer['since'] for uid, buffer in taken.items() if uid not in failed]
+                self._latencies.append(elapsed_ms)
+                self._stats['flushes'] += 1
+                self._stats['flushed'] += written
+                self._stats['failed_flushes'] += bool(failed)
+                if lags:
+                    self._stats['max_lag_ms'] = max(self._stats['max_lag_ms'], max(lags) * 1000)
+
+        if failed:
+            return False, next(iter(failed.values()))[1]
+        return True, written
+
+    def stats(self):
+        """
+        Metrik antrian write-behind
+
+        Returns:
+            dict: Counter enqueue/coalesce/flush/drop, isi antrian, umur
+                perubahan tertua, latency flush (ms) dan lag terbesar dari
+                antri sampai commit (ms)
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = self._pending
+            stats['pending_users'] = len(self._buffers)
+            oldest = next(iter(self._buffers.values()))['since'] if self._buffers else None
+            latencies = sorted(self._latencies)
+        stats['oldest_pending_s'] = round(time.time() - oldest, 3) if oldest is not None else 0.0
+        stats['max_lag_ms'] = round(stats['max_lag_ms'], 3)
+        stats['max_delay'] = self.max_delay
+        if latencies:
+            stats['flush_ms'] = {
+                'last': round(self._latencies[-1], 3),
+                'avg': round(sum(latencies) / len(latencies), 3),
+                'p50': round(latencies[len(latencies) // 2], 3),
+                'p95': round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], 3),
+                'max': round(latencies[-1], 3)
+            }
+        return stats
+
+    def close(self):
+        """Flush semua antrian (dipanggil saat proses berhenti)"""
+        self.flush()
+
+
+# Antrian global, dipakai bersama semua session dalam satu proses
+write_behind = WriteBehindQueue(**WRITE_BEHIND)
+atexit.register(write_behind.close)
@@ -0,0 +1,56 @@
+# tests/conftest.py
+
+import itertools
+import os
+import sys
+import tempfile
+
+# Test selalu memakai SQLite file sementara (juga terlihat oleh worker process
+# recompute), di-set sebelum modul aplikasi membaca environment
+_tmp_dir = tempfile.mkdtemp(prefix='kosbudget_test_')
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ['DB_SQLITE_PATH'] = os.path.join(_tmp_dir, 'kosbudget.sqlite3')
+os.environ['SESSION_SPILL_PATH'] = os.path.join(_tmp_dir, 'spill', 'spill.sqlite3')
+os.environ['RECOMPUTE_CHECKPOINT_PATH'] = os.path.join(_tmp_dir, 'checkpoint.json')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from datetime import datetime
+
+from config.database import DatabaseManager
+from config.migrations import MigrationRunner
+
+_usernames = itertools.count(1)
+
+
+@pytest.fixture(scope='session', autouse=True)
+def database():
+    success, result = MigrationRunner.migrate()
+    assert success, result
+    return result
+
+
+def _create_user():
+    """Buat user baru di database, kembalikan user_id"""
+    now = datetime.now()
+    success, row = DatabaseManager.execute_query(
+        "INSERT INTO users (username, password, created_at, updated_at) "
+        "VALUES (%s, %s, %s, %s) RETURNING user_id",
+        (f"test_user_{next(_usernames)}", 'x', now, now),
+        fetch=True
+    )
+    assert success, row
+    return row['user_id']
+
+
+@pytest.fixture
+def make_user():
+    """Factory untuk test yang butuh lebih dari satu user"""
+    return _create_user
+
+
+@pytest.fixture
+def user_id():
+    """User baru di database untuk satu test"""
+    return _create_user()
@@ -0,0 +1,157 @@
+# tests/test_allocation_engine.py
+
+import math
+import random
+
+import pytest
+
+from config.settings import DECISION_WEIGHTS, SCORE_WEIGHTS
+from utils.allocation_engine import AllocationEngine
+from utils.calculations import calculate_decision_score
+
+
+def full_scores(categories):
+    """Combined score per kategori dengan rumus lengkap (tanpa cache)"""
+    return {
+        cat['name']: cat['priority'] / 5.0 * SCORE_WEIGHTS["priority"] + calculate_decision_score(
+            cat.get('urgency', 3) / 5.0, cat.get('frequency', 3) / 5.0, cat.get('impact', 3) / 5.0
+        ) * SCORE_WEIGHTS["decision"]
+        for cat in categories
+    }
+
+
+def full_allocation(categories, monthly_budget):
+    scores = full_scores(categories)
+    total = sum(scores.values())
+    return {name: round(score / total * monthly_budget, 2) for name, score in scores.items()}
+
+
+def make_categories(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            'name': f'Kategori {i}',
+            'priority': rng.randint(1, 5),
+            'urgency': rng.randint(1, 5),
+            'frequency': rng.randint(1, 5),
+            'impact': rng.randint(1, 5)
+        }
+        for i in range(count)
+    ]
+
+
+def allocations(categories):
+    return {cat['name']: cat['allocation'] for cat in categories}
+
+
+def test_matches_full_recompute():
+    categories = make_categories(40)
+    engine = AllocationEngine()
+    engine.calculate(categories, 3_000_000)
+
+    assert allocations(categories) == pytest.approx(full_allocation(categories, 3_000_000))
+    assert engine.total_score == pytest.approx(math.fsum(full_scores(categories).values()))
+    assert engine.stats()['rescored'] == 40
+
+
+def test_only_changed_categories_are_rescored():
+    categories = make_categories(40)
+    engine = AllocationEngine()
+    engine.calculate(categories, 3_000_000)
+
+    categories[3]['urgency'] = 6 - categories[3]['urgency']
+    categories[17]['priority'] = 6 - categories[17]['priority']
+    engine.calculate(categories, 3_000_000)
+
+    stats = engine.stats()
+    assert stats['rescored'] == 42
+    assert stats['cache_hits'] == 38
+    assert allocations(categories) == pytest.approx(full_allocation(categories, 3_000_000))
+
+
+def test_running_total_tracks_add_edit_remove():
+    categories = make_categories(25)
+    engine = AllocationEngine()
+    engine.calculate(categories, 1_000_000)
+    rng = random.Random(11)
+
+    for step in range(200):
+        action = rng.choice(('edit', 'add', 'remove'))
+        if action == 'edit' or (action == 'remove' and len(categories) < 2):
+            cat = rng.choice(categories)
+            cat[rng.choice(('priority', 'urgency', 'frequency', 'impact'))] = rng.randint(1, 5)
+            engine.update_category(cat)
+        elif action == 'add':
+            cat = make_categories(1, seed=step)[0]
+            cat['name'] = f'Baru {step}'
+            categories.append(cat)
+            engine.update_category(cat)
+        else:
+            cat = categories.pop(rng.randrange(len(categories)))
+            engine.remove_category(cat['name'])
+        assert engine.total_score == pytest.approx(math.fsum(full_scores(categories).values()))
+
+    assert engine.in_sync(categories)
+    engine.rescale(categories, 1_000_000)
+    assert allocations(categories) == pytest.approx(full_allocation(categories, 1_000_000))
+
+
+def test_calculate_drops_categories_missing_from_list():
+    categories = make_categories(10)
+    engine = AllocationEngine()
+    engine.calculate(categories, 500_000)
+
+    del categories[4]
+    engine.calculate(categories, 500_000)
+
+    assert engine.stats()['categories'] == 9
+    assert engine.total_score == pytest.approx(math.fsum(full_scores(categories).values()))
+    assert sum(allocations(categories).values()) == pytest.approx(500_000, abs=0.05)
+
+
+def test_rename_reuses_cached_score():
+    categories = make_categories(5)
+    engine = AllocationEngine()
+    engine.calculate(categories, 500_000)
+
+    engine.rename_category(categories[0]['name'], 'Baru')
+    categories[0]['name'] = 'Baru'
+    engine.calculate(categories, 500_000)
+
+    assert engine.stats()['rescored'] == 5
+    assert engine.in_sync(categories)
+
+
+def test_rescale_only_changes_budget():
+    categories = make_categories(8)
+    engine = AllocationEngine()
+    engine.calculate(categories, 1_000_000, {'Kategori 0': 2500})
+    engine.rescale(categories, 2_000_000)
+
+    assert allocations(categories) == pytest.approx(full_allocation(categories, 2_000_000))
+    assert categories[0]['spent'] == 2500
+    assert engine.stats()['rescored'] == 8
+
+
+def test_weight_change_rebuilds_table(monkeypatch):
+    categories = make_categories(12)
+    engine = AllocationEngine()
+    engine.calculate(categories, 1_000_000)
+
+    monkeypatch.setitem(DECISION_WEIGHTS, 'urgency', 0.2)
+    monkeypatch.setitem(DECISION_WEIGHTS, 'impact', 0.5)
+    assert not engine.in_sync(categories)
+    engine.calculate(categories, 1_000_000)
+
+    assert engine.stats()['table_builds'] == 2
+    assert allocations(categories) == pytest.approx(full_allocation(categories, 1_000_000))
+
+
+def test_zero_budget_and_empty_list():
+    engine = AllocationEngine()
+    categories = make_categories(3)
+    engine.calculate(categories, 0)
+    assert allocations(categories) == {cat['name']: 0 for cat in categories}
+
+    engine.calculate([], 1_000_000)
+    assert engine.total_score == 0
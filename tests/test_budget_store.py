@@ -0,0 +1,140 @@
+# tests/test_budget_store.py
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.budget_store import BudgetStore
+
+
+def make_store(per_category=4):
+    store = BudgetStore()
+    store.add_category('Makan', 5, 5, 5, 4, category_id=1)
+    store.add_category('Hobi', 2, 1, 2, 1, category_id=2)
+    store.add_category('Transport', 4, 4, 3, 3, category_id=3)
+    start = datetime(2024, 5, 1, 8, 0)
+    expense_id = 100
+    for i in range(per_category):
+        for name in ('Makan', 'Hobi', 'Transport'):
+            expense_id += 1
+            store.add_expense(name, 1000 * (i + 1), start + timedelta(hours=expense_id), expense_id)
+    return store
+
+
+def live_rows(store):
+    return [(exp['category'], exp['amount'], exp['expense_id']) for exp in store.expenses]
+
+
+def test_running_sum_matches_rows():
+    store = make_store()
+    assert store.spent_by_name() == {'Makan': 10000, 'Hobi': 10000, 'Transport': 10000}
+    assert len(store) == 12
+    assert store.category_row_count('Hobi') == 4
+
+
+def test_remove_category_tombstones_rows_without_compacting():
+    store = make_store()
+    assert store.remove_category('Hobi') == 4
+
+    # 4 baris mati < 8 baris hidup: belum dipadatkan
+    assert store._dead == 4
+    assert len(store._codes) == 12
+    assert len(store) == 8
+    assert store.find_category('Hobi') is None
+    assert store.category_row_count('Hobi') == 0
+    assert 'Hobi' not in store.spent_by_name()
+
+
+def test_reading_expenses_compacts_and_rebuilds_row_index():
+    store = make_store()
+    store.remove_category('Hobi')
+
+    rows = live_rows(store)
+    assert store._dead == 0
+    assert len(store._codes) == 8
+    assert [category for category, _, _ in rows].count('Hobi') == 0
+    assert {category for category, _, _ in rows} == {'Makan', 'Transport'}
+
+    # Index baris per kategori menunjuk posisi baru setelah compact
+    for cat in store.categories:
+        positions = store._rows[cat.code]
+        assert len(positions) == 4
+        assert all(store._codes[row] == cat.code for row in positions)
+
+    store.rebuild_spent()
+    assert store.spent_by_name() == {'Makan': 10000, 'Transport': 10000}
+
+
+def test_compacts_once_dead_rows_outnumber_live_rows():
+    store = make_store()
+    store.remove_category('Hobi')
+    store.remove_category('Makan')
+
+    # 8 baris mati > 4 baris hidup: langsung dipadatkan
+    assert store._dead == 0
+    assert len(store._codes) == 4
+    assert store.spent_by_name() == {'Transport': 10000}
+
+
+def test_remove_expense_updates_sum_and_skips_tombstones():
+    store = make_store()
+    first_hobi = next(exp['expense_id'] for exp in store.expenses if exp['category'] == 'Hobi')
+
+    assert store.remove_expense(first_hobi, 'Hobi')
+    assert store.spent_by_name()['Hobi'] == 9000
+    assert store.category_row_count('Hobi') == 3
+    # Baris yang sudah mati tidak ditemukan lagi
+    assert not store.remove_expense(first_hobi, 'Hobi')
+    assert not store.remove_expense(first_hobi)
+    assert not store.remove_expense(999, 'Tidak Ada')
+
+
+def test_add_after_tombstone_keeps_index_consistent():
+    store = make_store()
+    store.remove_category('Hobi')
+    store.add_category('Hobi', 3)
+    store.add_expense('Hobi', 7000, datetime(2024, 5, 20), 500)
+
+    assert store.spent_by_name()['Hobi'] == 7000
+    assert store.category_row_count('Hobi') == 1
+    assert ('Hobi', 7000, 500) in live_rows(store)
+    assert len(store) == 9
+
+
+def test_rename_keeps_expenses_and_sums():
+    store = make_store()
+    store.rename_category('Hobi', 'Hiburan')
+
+    assert store.spent_by_name()['Hiburan'] == 10000
+    assert store.category_row_count('Hiburan') == 4
+    assert {category for category, _, _ in live_rows(store)} == {'Makan', 'Hiburan', 'Transport'}
+    with pytest.raises(ValueError):
+        store.rename_category('Makan', 'Hiburan')
+
+
+def test_every_change_bumps_version():
+    store = BudgetStore()
+    versions = [store.version]
+    store.add_category('Makan', 5)
+    versions.append(store.version)
+    store.add_expense('Makan', 1000, expense_id=1)
+    versions.append(store.version)
+    store.remove_expense(1)
+    versions.append(store.version)
+    store.remove_category('Makan')
+    versions.append(store.version)
+
+    assert versions == sorted(set(versions))
+
+
+def test_pending_and_missing_ids():
+    store = BudgetStore()
+    store.add_category('Makan', 5)
+    store.add_expense('Makan', 1000)
+    store.add_expense('Makan', 2000, expense_id=-12345)
+
+    assert [exp['expense_id'] for exp in store.expenses] == [None, -12345]
+    assert store.remove_expense(-12345, 'Makan')
+    # NO_ID tidak pernah dianggap expense_id yang bisa dihapus lewat id None
+    assert not store.remove_expense(None)
+    assert store.spent_by_name() == {'Makan': 1000}
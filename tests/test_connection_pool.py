@@ -0,0 +1,157 @@
+# tests/test_connection_pool.py
+
+import itertools
+import threading
+import time
+
+import pytest
+
+from config.backends import SQLiteBackend
+from config.connection_pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeConnection:
+    _ids = itertools.count(1)
+
+    def __init__(self):
+        self.id = next(self._ids)
+        self.healthy = True
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**kwargs):
+    kwargs.setdefault('min_size', 0)
+    kwargs.setdefault('max_size', 2)
+    kwargs.setdefault('timeout', 0.2)
+    return ConnectionPool(FakeConnection, validate_fn=lambda conn: conn.healthy, **kwargs)
+
+
+def test_checkout_times_out_when_pool_is_exhausted():
+    pool = make_pool()
+    held = [pool.getconn(), pool.getconn()]
+
+    started = time.monotonic()
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn()
+    waited = time.monotonic() - started
+
+    assert 0.15 <= waited < 2
+    stats = pool.stats()
+    assert (stats['timeouts'], stats['checkout_failures'], stats['in_use']) == (1, 1, 2)
+    for conn in held:
+        pool.putconn(conn)
+    assert pool.stats()['idle'] == 2
+
+
+def test_timeout_override_per_checkout():
+    pool = make_pool(max_size=1, timeout=30)
+    pool.getconn()
+
+    started = time.monotonic()
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn(timeout=0)
+    assert time.monotonic() - started < 1
+
+
+def test_waiter_gets_connection_returned_before_timeout():
+    pool = make_pool(max_size=1, timeout=5)
+    conn = pool.getconn()
+    timer = threading.Timer(0.1, pool.putconn, args=(conn,))
+    timer.start()
+
+    assert pool.getconn() is conn
+    timer.join()
+    stats = pool.stats()
+    assert stats['timeouts'] == 0
+    assert stats['wait_time_max'] >= 0.05
+    assert stats['connections_created'] == 1
+
+
+def test_stale_connection_is_validated_and_replaced():
+    pool = make_pool(max_size=1, validate_after=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.healthy = False
+
+    replacement = pool.getconn()
+    assert replacement is not conn
+    assert conn.closed
+    assert pool.stats()['connections_discarded'] == 1
+
+
+def test_failed_connect_frees_its_slot():
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("server down")
+        return FakeConnection()
+
+    pool = ConnectionPool(connect, min_size=0, max_size=1, timeout=0.2)
+    with pytest.raises(OSError):
+        pool.getconn()
+    assert pool.getconn() is not None
+    assert pool.stats()['checkout_failures'] == 1
+
+
+def test_discarded_connection_is_refilled_to_min_size():
+    pool = make_pool(min_size=1, max_size=2)
+    conn = pool.getconn()
+    pool.putconn(conn, discard=True)
+
+    stats = pool.stats()
+    assert conn.closed
+    assert (stats['idle'], stats['in_use'], stats['connections_created']) == (1, 0, 2)
+
+
+def test_closed_pool_rejects_checkout_and_wakes_waiters():
+    pool = make_pool(max_size=1, timeout=5)
+    pool.getconn()
+    errors = []
+
+    def wait_for_connection():
+        try:
+            pool.getconn()
+        except PoolTimeoutError as e:
+            errors.append(str(e))
+
+    waiter = threading.Thread(target=wait_for_connection)
+    waiter.start()
+    time.sleep(0.05)
+    pool.closeall()
+    waiter.join(2)
+
+    assert errors == ["Connection pool sudah ditutup"]
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn()
+
+
+def test_concurrent_checkouts_never_exceed_max_size(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'pool.sqlite3'))
+    pool = ConnectionPool(backend.connect, min_size=1, max_size=3, timeout=5, validate_fn=backend.validate)
+    peak, lock = [0], threading.Lock()
+
+    def worker():
+        for _ in range(20):
+            conn = pool.getconn()
+            with lock:
+                peak[0] = max(peak[0], pool.stats()['in_use'])
+            conn.execute("SELECT 1").fetchone()
+            pool.putconn(conn)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    stats = pool.stats()
+    assert peak[0] <= 3
+    assert stats['checkouts'] == 160
+    assert stats['timeouts'] == 0
+    assert stats['connections_created'] <= 3
+    pool.closeall()
@@ -0,0 +1,118 @@
+# tests/test_login_throttle.py
+
+import pytest
+
+from services import login_throttle as login_throttle_module
+from services.login_throttle import LoginThrottle, TokenBucketLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(login_throttle_module.time, 'monotonic', clock)
+    return clock
+
+
+def make_throttle(**kwargs):
+    params = dict(username_rate=1 / 60, username_burst=3, client_rate=1 / 60, client_burst=5,
+                  max_concurrent=8, max_keys=100)
+    params.update(kwargs)
+    return LoginThrottle(**params)
+
+
+def attempt(throttle, username, client_id=None, succeeded=False):
+    allowed, message = throttle.acquire(username, client_id)
+    if allowed:
+        throttle.release(username, succeeded=succeeded)
+    return allowed, message
+
+
+def test_username_burst_then_refill(clock):
+    throttle = make_throttle()
+    assert [attempt(throttle, 'budi')[0] for _ in range(3)] == [True, True, True]
+
+    allowed, message = attempt(throttle, 'budi')
+    assert not allowed
+    assert message == "Terlalu banyak percobaan login, coba lagi dalam 60 detik"
+
+    clock.advance(30)
+    assert "dalam 30 detik" in attempt(throttle, 'budi')[1]
+    clock.advance(30)
+    assert attempt(throttle, 'budi') == (True, None)
+    assert not attempt(throttle, 'budi')[0]
+
+
+def test_rejected_attempts_do_not_extend_lockout(clock):
+    throttle = make_throttle()
+    for _ in range(3):
+        attempt(throttle, 'budi')
+    for _ in range(50):
+        assert not attempt(throttle, 'budi')[0]
+
+    clock.advance(60)
+    assert attempt(throttle, 'budi')[0]
+    assert throttle.stats()['throttled_username'] == 50
+
+
+def test_client_bucket_spans_usernames(clock):
+    throttle = make_throttle()
+    results = [attempt(throttle, f'user{i}', '10.0.0.1')[0] for i in range(6)]
+
+    assert results == [True] * 5 + [False]
+    assert attempt(throttle, 'user9', '10.0.0.2')[0]
+    assert attempt(throttle, 'user9')[0]
+    assert throttle.stats()['throttled_client'] == 1
+
+
+def test_successful_login_refunds_username_token(clock):
+    throttle = make_throttle()
+    for _ in range(10):
+        assert attempt(throttle, 'budi', succeeded=True)[0]
+    assert throttle.by_username.available('budi', clock()) == 3
+
+
+def test_sheds_load_above_max_concurrent(clock):
+    throttle = make_throttle(max_concurrent=2)
+    assert throttle.acquire('a')[0]
+    assert throttle.acquire('b')[0]
+
+    allowed, message = throttle.acquire('c')
+    assert not allowed
+    assert message == "Server sedang sibuk memproses login, coba lagi sebentar"
+
+    throttle.release('a')
+    assert throttle.acquire('c')[0]
+    stats = throttle.stats()
+    assert (stats['shed'], stats['in_flight'], stats['allowed']) == (1, 2, 3)
+    # Percobaan yang di-shed tidak memakai token username
+    assert throttle.by_username.available('c', clock()) == 2
+
+
+def test_tracked_keys_are_bounded(clock):
+    limiter = TokenBucketLimiter(rate=1, burst=2, max_keys=3)
+    for key in ('a', 'b', 'c', 'd'):
+        limiter.consume(key, clock())
+
+    assert len(limiter) == 3
+    # Key yang dibuang kembali dengan bucket penuh
+    assert limiter.available('a', clock()) == 2
+    assert limiter.available('d', clock()) == 1
+
+
+def test_zero_rate_never_refills(clock):
+    limiter = TokenBucketLimiter(rate=0, burst=1)
+    limiter.consume('a', clock())
+    clock.advance(3600)
+    assert limiter.available('a', clock()) == 0
+    assert limiter.retry_after('a', clock()) == float('inf')
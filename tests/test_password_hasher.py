@@ -0,0 +1,52 @@
+# tests/test_password_hasher.py
+
+import hashlib
+
+from services.password_hasher import PasswordHasher
+
+
+def make_hasher(**kwargs):
+    kwargs.setdefault('min_iterations', 1000)
+    return PasswordHasher(workers=1, max_pending=4, **kwargs)
+
+
+def stored_hash(iterations):
+    return make_hasher(iterations=iterations).hash('rahasia123')
+
+
+def test_legacy_sha256_needs_rehash():
+    legacy = hashlib.sha256(b'rahasia123').hexdigest()
+    assert make_hasher(iterations=2000).verify('rahasia123', legacy) == (True, True)
+    assert make_hasher(iterations=2000).verify('salah', legacy) == (False, True)
+
+
+def test_calibration_noise_does_not_trigger_rehash():
+    hasher = make_hasher()
+    hasher._iterations = 10000  # hasil kalibrasi proses ini
+
+    # Hash dari restart/host lain dengan hasil kalibrasi sedikit berbeda
+    assert hasher.verify('rahasia123', stored_hash(8000)) == (True, False)
+    assert hasher.verify('rahasia123', stored_hash(5000)) == (True, False)
+    # Jauh di bawah kalibrasi saat ini (misalnya host jauh lebih cepat)
+    assert hasher.verify('rahasia123', stored_hash(4000)) == (True, True)
+
+
+def test_below_min_iterations_needs_rehash():
+    hasher = make_hasher(min_iterations=3000)
+    hasher._iterations = 3000
+    assert hasher.verify('rahasia123', stored_hash(2000)) == (True, True)
+    assert hasher.verify('rahasia123', stored_hash(3000)) == (True, False)
+
+
+def test_fixed_iterations_is_the_threshold():
+    hasher = make_hasher(iterations=6000)
+    assert hasher.rehash_threshold() == 6000
+    assert hasher.verify('rahasia123', stored_hash(5000)) == (True, True)
+    assert hasher.verify('rahasia123', stored_hash(6000)) == (True, False)
+    assert hasher.verify('rahasia123', stored_hash(9000)) == (True, False)
+
+
+def test_wrong_password_never_needs_rehash():
+    hasher = make_hasher(iterations=6000)
+    assert hasher.verify('salah', stored_hash(2000)) == (False, False)
+    assert hasher.verify('rahasia123', 'bcrypt$12$x$y') == (False, False)
@@ -0,0 +1,119 @@
+# tests/test_recompute_runner.py
+
+import json
+import os
+from datetime import datetime, timedelta
+
+from config.database import DatabaseManager
+from services.budget_repository import BudgetRepository
+from services.recompute_runner import Checkpoint, RecomputeRunner, plan_shards, recompute_monthly_summary
+
+
+def add_expenses(user_id):
+    """Dua kategori dan 30 expense selama tiga bulan"""
+    categories = [BudgetRepository.upsert_category(user_id, name, 3, 3, 3, 3)[1] for name in ('Makan', 'Kos')]
+    BudgetRepository.set_monthly_budget(user_id, 1_500_000)
+    start = datetime(2024, 1, 15)
+    for i in range(30):
+        BudgetRepository.add_expense(user_id, categories[i % 2], 1000 + i, start + timedelta(days=i * 3))
+
+
+def summary_rows(user_id):
+    success, rows = DatabaseManager.execute_query(
+        "SELECT month, category_id, total_amount, expense_count FROM expense_monthly_summary "
+        "WHERE user_id = %s ORDER BY month, category_id",
+        (user_id,), fetch=True, row_format='tuple'
+    )
+    assert success, rows
+    return rows
+
+
+def corrupt_summary(user_id):
+    DatabaseManager.execute_query(
+        "UPDATE expense_monthly_summary SET total_amount = 0, expense_count = 0 WHERE user_id = %s",
+        (user_id,)
+    )
+
+
+def test_plan_shards_aligns_to_shard_size():
+    assert plan_shards(10, 7, 31) == (True, [(0, 10), (10, 20), (20, 30), (30, 40)])
+    assert plan_shards(10, 20, 20) == (True, [(20, 30)])
+
+
+def test_recompute_restores_corrupted_summary(user_id):
+    add_expenses(user_id)
+    expected = summary_rows(user_id)
+    corrupt_summary(user_id)
+    DatabaseManager.execute_query(
+        "INSERT INTO expense_monthly_summary (user_id, month, category_id, total_amount, expense_count) "
+        "SELECT user_id, %s, category_id, 999, 9 FROM categories WHERE user_id = %s",
+        (datetime(2023, 1, 1).date(), user_id)
+    )
+
+    success, stats = recompute_monthly_summary(user_id, user_id + 1)
+    assert success, stats
+    assert stats == {'expenses': 30, 'summary_rows': len(expected)}
+    assert summary_rows(user_id) == expected
+
+
+def test_checkpoint_round_trip_and_layout(tmp_path):
+    path = str(tmp_path / 'checkpoint.json')
+    checkpoint = Checkpoint(path, {'shard_size': 10})
+    checkpoint.mark_done((0, 10), {'shard': (0, 10), 'ok': True, 'users': 3})
+
+    assert not os.path.exists(f"{path}.tmp")
+    with open(path) as f:
+        assert json.load(f)['completed'] == {'0-10': {'users': 3}}
+
+    resumed = Checkpoint(path, {'shard_size': 10})
+    assert resumed.load()
+    assert resumed.is_done((0, 10))
+    assert not resumed.is_done((10, 20))
+
+    # Layout shard berbeda: checkpoint lama diabaikan
+    other = Checkpoint(path, {'shard_size': 20})
+    assert not other.load()
+    assert not other.is_done((0, 10))
+
+    resumed.clear()
+    assert not os.path.exists(path)
+    assert not Checkpoint(path, {'shard_size': 10}).load()
+
+
+def test_resume_skips_completed_shards(tmp_path, make_user):
+    # Dua user berurutan, satu shard per user; shard pertama tercatat selesai
+    done_user = make_user()
+    pending_user = make_user()
+    for user in (done_user, pending_user):
+        add_expenses(user)
+    expected = summary_rows(pending_user)
+    corrupt_summary(done_user)
+    corrupt_summary(pending_user)
+
+    path = str(tmp_path / 'checkpoint.json')
+    Checkpoint(path, {'shard_size': 1}).mark_done((done_user, done_user + 1), {'users': 1})
+    progress = []
+    runner = RecomputeRunner(workers=1, shard_size=1, checkpoint_path=path,
+                             progress=lambda done, total, result, eta: progress.append((done, total)))
+
+    success, stats = runner.run(resume=True, min_user_id=done_user, max_user_id=pending_user)
+    assert success, stats
+    assert (stats['shards'], stats['skipped'], stats['failed']) == (2, 1, [])
+    assert (stats['users'], stats['expenses']) == (1, 30)
+    assert progress == [(1, 1)]
+    assert summary_rows(pending_user) == expected
+    # Shard yang dilewati tidak disentuh
+    assert all(row[2] == 0 for row in summary_rows(done_user))
+    # Run yang selesai tanpa kegagalan menghapus checkpoint
+    assert not os.path.exists(path)
+
+
+def test_resume_with_everything_done_runs_nothing(tmp_path, user_id):
+    path = str(tmp_path / 'checkpoint.json')
+    Checkpoint(path, {'shard_size': 1}).mark_done((user_id, user_id + 1), {'users': 1})
+
+    success, stats = RecomputeRunner(workers=1, shard_size=1, checkpoint_path=path).run(
+        resume=True, min_user_id=user_id, max_user_id=user_id
+    )
+    assert success, stats
+    assert (stats['shards'], stats['skipped'], stats['users']) == (1, 1, 0)
@@ -0,0 +1,46 @@
+# tests/test_replicas.py
+
+from config.replicas import ReplicaRouter
+
+
+class FakeBackend:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def connect(self):
+        if self.fail:
+            raise OSError("replica tidak bisa dihubungi")
+        return object()
+
+    def validate(self, conn):
+        return True
+
+
+def make_router(*backends):
+    return ReplicaRouter(list(backends), {'max_size': 1}, checkout_timeout=0.05)
+
+
+def test_saturated_replica_is_not_marked_down():
+    router = make_router(FakeBackend(), FakeBackend())
+    first_pool, first = router.checkout()
+    second_pool, second = router.checkout()
+    assert {first_pool, second_pool} == set(router.pools)
+
+    # Kedua pool penuh: fallback ke primary tanpa menandai replica down
+    assert router.checkout() == (None, None)
+    stats = router.stats()
+    assert (stats['replica_saturated'], stats['replica_failures'], stats['primary_fallbacks']) == (2, 0, 1)
+    assert all(replica['healthy'] for replica in stats['replicas'])
+
+    first_pool.putconn(first)
+    assert router.checkout()[0] is first_pool
+
+
+def test_unreachable_replica_is_marked_down_and_skipped():
+    router = make_router(FakeBackend(fail=True), FakeBackend())
+    pool, conn = router.checkout()
+    assert pool is router.pools[1]
+
+    stats = router.stats()
+    assert stats['replica_failures'] == 1
+    assert [replica['healthy'] for replica in stats['replicas']] == [False, True]
@@ -0,0 +1,181 @@
+# tests/test_write_behind.py
+
+import threading
+
+import pytest
+
+from services.budget_repository import BudgetRepository
+from services.write_behind import WriteBehindQueue
+
+MISSING_USER = 10 ** 9  # tidak ada di tabel users: insert gagal karena foreign key
+
+
+@pytest.fixture
+def queue():
+    # max_delay besar: flush hanya terjadi saat dipanggil test
+    return WriteBehindQueue(max_delay=3600, batch_size=1000, max_pending=1000, max_retries=3)
+
+
+@pytest.fixture
+def category_id(user_id):
+    success, category_id = BudgetRepository.upsert_category(user_id, 'Makan', 3, 3, 3, 3)
+    assert success, category_id
+    return category_id
+
+
+def category_row(user_id, name='Makan'):
+    success, categories = BudgetRepository.get_categories(user_id)
+    assert success, categories
+    return next(cat for cat in categories if cat['name'] == name)
+
+
+def test_category_and_budget_updates_coalesce(queue, user_id, category_id):
+    queue.update_category(user_id, category_id, 1, 1, 1, 1)
+    queue.update_category(user_id, category_id, 5, 4, 3, 2)
+    queue.set_monthly_budget(user_id, 1_000_000)
+    queue.set_monthly_budget(user_id, 2_500_000)
+
+    stats = queue.stats()
+    assert stats['enqueued'] == 4
+    assert stats['coalesced'] == 2
+    assert stats['pending'] == 2
+
+    assert queue.flush() == (True, 2)
+    cat = category_row(user_id)
+    assert (cat['priority'], cat['urgency'], cat['frequency'], cat['impact']) == (5, 4, 3, 2)
+    assert BudgetRepository.get_monthly_budget(user_id) == (True, 2_500_000)
+
+
+def test_expenses_keep_order_and_update_summary(queue, user_id, category_id):
+    pending_ids = [queue.add_expense(user_id, category_id, amount)[1] for amount in (100, 200, 300)]
+    assert all(pending_id < -1 for pending_id in pending_ids)
+    assert queue.pending_totals(user_id) == {category_id: {'total': 600, 'count': 3}}
+    assert BudgetRepository.get_monthly_summary(user_id) == (True, {})
+
+    assert queue.flush(user_id) == (True, 3)
+    assert queue.pending_totals(user_id) == {}
+    assert BudgetRepository.get_monthly_summary(user_id) == (
+        True, {category_id: {'total': 600, 'count': 3}}
+    )
+    success, expenses = BudgetRepository.get_expenses(user_id)
+    assert [exp['amount'] for exp in expenses] == [100, 200, 300]
+    assert [queue.resolve_expense_id(pending_id) for pending_id in pending_ids] == [
+        exp['expense_id'] for exp in expenses
+    ]
+
+
+def test_delete_queued_and_flushed_expense(queue, user_id, category_id):
+    _, queued = queue.add_expense(user_id, category_id, 100)
+    _, flushed = queue.add_expense(user_id, category_id, 250)
+    assert queue.delete_expense(user_id, queued) == (True, "Pengeluaran dihapus dari antrian")
+    queue.flush()
+
+    assert queue.delete_expense(user_id, flushed) == (True, "Pengeluaran dihapus")
+    assert BudgetRepository.get_monthly_summary(user_id) == (
+        True, {category_id: {'total': 0, 'count': 0}}
+    )
+    assert queue.delete_expense(user_id, flushed)[0] is False
+    assert queue.delete_expense(user_id, -5)[0] is False
+
+
+def test_discard_category_drops_its_changes(queue, user_id, category_id):
+    queue.add_expense(user_id, category_id, 100)
+    queue.update_category(user_id, category_id, 1, 1, 1, 1)
+    queue.set_monthly_budget(user_id, 500_000)
+
+    assert queue.discard_category(user_id, category_id) == 2
+    assert queue.stats()['pending'] == 1
+    assert queue.flush() == (True, 1)
+    assert BudgetRepository.get_monthly_summary(user_id) == (True, {})
+
+
+def test_failed_flush_is_retried(queue, user_id, category_id, monkeypatch):
+    write = WriteBehindQueue._write
+    calls = []
+
+    def flaky_write(buffers):
+        calls.append(len(buffers))
+        if len(calls) == 1:
+            return False, "Database error: koneksi putus"
+        return write(buffers)
+
+    monkeypatch.setattr(WriteBehindQueue, '_write', staticmethod(flaky_write))
+    queue.add_expense(user_id, category_id, 400)
+
+    assert queue.flush() == (False, "Database error: koneksi putus")
+    assert queue.stats()['pending'] == 1
+    # Masih terlihat di ringkasan selama menunggu retry
+    assert queue.pending_totals(user_id) == {category_id: {'total': 400, 'count': 1}}
+
+    queue.add_expense(user_id, category_id, 600)
+    assert queue.flush() == (True, 2)
+    stats = queue.stats()
+    assert (stats['failed_flushes'], stats['dropped'], stats['pending']) == (1, 0, 0)
+    assert BudgetRepository.get_monthly_summary(user_id)[1][category_id] == {'total': 1000, 'count': 2}
+
+
+def test_failing_user_does_not_block_others(queue, user_id, category_id):
+    queue.add_expense(MISSING_USER, category_id, 100)
+    queue.add_expense(user_id, category_id, 700)
+
+    success, error = queue.flush()
+    assert not success
+    assert 'FOREIGN KEY' in error
+    assert BudgetRepository.get_monthly_summary(user_id)[1][category_id] == {'total': 700, 'count': 1}
+    assert queue.stats()['pending'] == 1
+
+
+def test_drops_after_max_retries(queue, category_id):
+    queue.add_expense(MISSING_USER, category_id, 100)
+    for _ in range(queue.max_retries):
+        assert queue.flush()[0] is False
+
+    stats = queue.stats()
+    assert stats['dropped'] == 1
+    assert stats['pending'] == 0
+    assert queue.pending_totals(MISSING_USER) == {}
+    assert queue.flush() == (True, 0)
+
+
+def test_inflight_expenses_stay_visible_until_commit(queue, user_id, category_id, monkeypatch):
+    write = WriteBehindQueue._write
+    started, release = threading.Event(), threading.Event()
+
+    def slow_write(buffers):
+        started.set()
+        release.wait(5)
+        return write(buffers)
+
+    monkeypatch.setattr(WriteBehindQueue, '_write', staticmethod(slow_write))
+    queue.add_expense(user_id, category_id, 300)
+    flusher = threading.Thread(target=queue.flush)
+    flusher.start()
+    try:
+        assert started.wait(5)
+        assert queue.stats()['pending'] == 0
+        assert queue.pending_totals(user_id) == {category_id: {'total': 300, 'count': 1}}
+    finally:
+        release.set()
+        flusher.join(5)
+    assert queue.pending_totals(user_id) == {}
+    assert BudgetRepository.get_monthly_summary(user_id)[1][category_id] == {'total': 300, 'count': 1}
+
+
+def test_generation_changes_on_enqueue_and_flush(queue, user_id, category_id):
+    before = queue.generation(user_id)
+    queue.add_expense(user_id, category_id, 100)
+    queued = queue.generation(user_id)
+    queue.flush()
+    flushed = queue.generation(user_id)
+
+    assert before < queued < flushed
+    assert queue.generation(MISSING_USER) == 0
+
+
+def test_write_through_when_delay_is_zero(user_id, category_id):
+    queue = WriteBehindQueue(max_delay=0)
+    success, expense_id = queue.add_expense(user_id, category_id, 900)
+
+    assert success and expense_id > 0
+    assert queue.stats()['enqueued'] == 0
+    assert BudgetRepository.get_monthly_summary(user_id)[1][category_id] == {'total': 900, 'count': 1}
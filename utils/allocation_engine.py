@@ -0,0 +1,172 @@
+# utils/allocation_engine.py
+
+import math
+from config.settings import DECISION_WEIGHTS, SCORE_WEIGHTS
+
+# Urgensi, frekuensi dan dampak adalah integer 1-5
+CRITERIA_LEVELS = range(1, 6)
+
+
+def _weights_key():
+    """Snapshot bobot dari config/settings.py (untuk deteksi perubahan bobot)"""
+    return (
+        DECISION_WEIGHTS["urgency"], DECISION_WEIGHTS["frequency"], DECISION_WEIGHTS["impact"],
+        SCORE_WEIGHTS["priority"], SCORE_WEIGHTS["decision"]
+    )
+
+
+def build_decision_table(urgency_weight, frequency_weight, impact_weight):
+    """
+    Precompute 125 decision score untuk semua kombinasi kriteria 1-5
+
+    Nilai sama dengan calculate_decision_score(u / 5, f / 5, i / 5).
+
+    Returns:
+        dict: {(urgency, frequency, impact): decision score 0-1}
+    """
+    return {
+        (u, f, i): (u / 5.0) * urgency_weight + (f / 5.0) * frequency_weight + (i / 5.0) * impact_weight
+        for u in CRITERIA_LEVELS
+        for f in CRITERIA_LEVELS
+        for i in CRITERIA_LEVELS
+    }
+
+
+class AllocationEngine:
+    """
+    Alokasi budget per kategori dengan combined score yang di-cache
+
+    Engine menyimpan combined score per kategori beserta input yang
+    menghasilkannya, dan total score sebagai running sum. Kategori yang
+    berubah dihitung ulang satu per satu; perubahan budget cukup satu
+    pass rescale. Tabel decision score dibangun ulang otomatis jika bobot
+    di config/settings.py berubah.
+    """
+
+    def __init__(self):
+        self._weights = None
+        self._table = {}
+        self._entries = {}  # nama kategori -> (signature, combined score)
+        self._total = 0.0
+        self._stats = {'table_builds': 0, 'rescored': 0, 'cache_hits': 0}
+
+    def _check_weights(self):
+        """Bangun ulang tabel (dan buang cache score) jika bobot berubah"""
+        weights = _weights_key()
+        if weights != self._weights:
+            self._weights = weights
+            self._table = build_decision_table(*weights[:3])
+            self._entries.clear()
+            self._total = 0.0
+            self._stats['table_builds'] += 1
+
+    @staticmethod
+    def _signature(cat):
+        return (cat['priority'], cat.get('urgency', 3), cat.get('frequency', 3), cat.get('impact', 3))
+
+    def _score(self, signature):
+        priority, urgency, frequency, impact = signature
+        decision_score = self._table.get((urgency, frequency, impact))
+        if decision_score is None:
+            # Nilai di luar 1-5 atau bukan integer: hitung langsung
+            decision_score = (
+                urgency / 5.0 * DECISION_WEIGHTS["urgency"] +
+                frequency / 5.0 * DECISION_WEIGHTS["frequency"] +
+                impact / 5.0 * DECISION_WEIGHTS["impact"]
+            )
+        return priority / 5.0 * SCORE_WEIGHTS["priority"] + decision_score * SCORE_WEIGHTS["decision"]
+
+    def update_category(self, cat):
+        """
+        Hitung ulang score satu kategori (tambah/edit) dan perbarui running total
+
+        Args:
+            cat (dict): Kategori dengan name, priority, urgency, frequency, impact
+
+        Returns:
+            float: Combined score kategori
+        """
+        self._check_weights()
+        signature = self._signature(cat)
+        entry = self._entries.get(cat['name'])
+        if entry is not None and entry[0] == signature:
+            self._stats['cache_hits'] += 1
+            score = entry[1]
+        else:
+            score = self._score(signature)
+            self._total += score - (entry[1] if entry is not None else 0.0)
+            self._entries[cat['name']] = (signature, score)
+            self._stats['rescored'] += 1
+        cat['combined_score'] = score
+        return score
+
+    def remove_category(self, name):
+        """Keluarkan kategori dari running total"""
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            self._total -= entry[1]
+
+    def rename_category(self, old_name, new_name):
+        """Pindahkan score kategori ke nama baru (tanpa score ulang)"""
+        entry = self._entries.pop(old_name, None)
+        if entry is not None:
+            self._entries[new_name] = entry
+
+    def clear(self):
+        """Buang semua cache; score dihitung ulang pada calculate berikutnya"""
+        self._weights = None
+        self._table = {}
+        self._entries.clear()
+        self._total = 0.0
+
+    @property
+    def total_score(self):
+        return self._total
+
+    def stats(self):
+        """
+        Statistik engine
+
+        Returns:
+            dict: table_builds, rescored, cache_hits dan jumlah kategori
+        """
+        return dict(self._stats, categories=len(self._entries), total_score=self._total)
+
+    def in_sync(self, categories):
+        """True jika bobot tidak berubah dan cache mencakup semua kategori"""
+        return self._weights == _weights_key() and len(self._entries) == len(categories)
+
+    def rescale(self, categories, monthly_budget, spent_index=None):
+        """
+        Tulis allocation (dan spent) semua kategori dalam satu pass
+
+        Dipakai langsung saat hanya budget yang berubah.
+        """
+        total = self._total
+        for cat in categories:
+            if total > 0:
+                cat['allocation'] = round(cat['combined_score'] / total * monthly_budget, 2)
+            else:
+                cat['allocation'] = 0
+            if spent_index is not None:
+                cat['spent'] = spent_index.get(cat['name'], 0)
+
+    def calculate(self, categories, monthly_budget, spent_index=None):
+        """
+        Sinkronkan cache dengan list kategori lalu hitung allocation
+
+        Hanya kategori yang inputnya berubah yang di-score ulang; kategori
+        yang hilang dari list dikeluarkan dari running total.
+        """
+        self._check_weights()
+        for cat in categories:
+            self.update_category(cat)
+
+        if len(self._entries) != len(categories):
+            names = {cat['name'] for cat in categories}
+            for name in [name for name in self._entries if name not in names]:
+                self.remove_category(name)
+            # Running total dihitung ulang persis supaya tidak ada drift float
+            self._total = math.fsum(score for _, score in self._entries.values())
+
+        self.rescale(categories, monthly_budget, spent_index)
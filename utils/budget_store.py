@@ -0,0 +1,383 @@
+# utils/budget_store.py
+
+import itertools
+import sys
+import time
+from array import array
+from collections.abc import Sequence
+from datetime import datetime
+
+import streamlit as st
+from config.settings import SESSION_KEYS
+
+# Field kategori yang bisa diakses ala dict (cat['name'], cat.get('urgency', 3))
+CATEGORY_FIELDS = (
+    'category_id', 'name', 'priority', 'urgency', 'frequency', 'impact',
+    'allocation', 'spent', 'combined_score'
+)
+_CATEGORY_FIELD_SET = frozenset(CATEGORY_FIELDS)
+
+# Versi store diambil dari satu counter per proses (dimulai dari waktu
+# sekarang), jadi versi tidak pernah sama antar store, tab, atau restart
+_versions = itertools.count(time.time_ns())
+
+
+class CategoryRecord:
+    """
+    Satu kategori dengan __slots__ (tanpa __dict__ per objek)
+
+    Mendukung akses ala dict supaya kode yang memakai cat['name'] atau
+    cat['allocation'] = ... tetap berjalan.
+    """
+
+    __slots__ = ('code',) + CATEGORY_FIELDS
+
+    def __init__(self, code, name, priority, urgency=3, frequency=3, impact=3, category_id=None):
+        self.code = code
+        self.category_id = category_id
+        self.name = name
+        self.priority = priority
+        self.urgency = urgency
+        self.frequency = frequency
+        self.impact = impact
+        self.allocation = 0
+        self.spent = 0
+        self.combined_score = 0
+
+    def __getitem__(self, key):
+        if key not in _CATEGORY_FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in _CATEGORY_FIELD_SET:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in _CATEGORY_FIELD_SET
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in _CATEGORY_FIELD_SET else default
+
+    def keys(self):
+        return CATEGORY_FIELDS
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in CATEGORY_FIELDS}
+
+    def __repr__(self):
+        return f"CategoryRecord({self.to_dict()!r})"
+
+
+class ExpenseView(Sequence):
+    """
+    View read-only list of dict atas kolom expense di BudgetStore
+
+    Dict dibuat saat diakses, jadi view ini tidak menambah memori per baris.
+    Baris yang sudah dihapus dipadatkan dulu sebelum dibaca.
+    """
+
+    def __init__(self, store):
+        self._store = store
+
+    def __len__(self):
+        return len(self._store)
+
+    def __getitem__(self, index):
+        self._store._compact()
+        if isinstance(index, slice):
+            return [self._store._expense_row(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("expense index out of range")
+        return self._store._expense_row(index)
+
+    def __iter__(self):
+        self._store._compact()
+        for i in range(len(self)):
+            yield self._store._expense_row(i)
+
+
+class BudgetStore:
+    """
+    Penyimpanan kompak kategori dan pengeluaran satu session
+
+    Kategori adalah CategoryRecord dengan kode integer kecil yang tetap
+    selama session; nama hanya dipetakan ke kode lewat hash index, jadi
+    rename tidak menyentuh pengeluaran. Pengeluaran disimpan kolom per
+    kolom di typed array (kode kategori, jumlah, waktu, expense_id), bukan
+    satu dict per baris, dengan index posisi baris per kategori. Total
+    terpakai per kategori dijaga sebagai running sum per kode.
+
+    Setiap perubahan menaikkan `version`, dipakai sebagai key cache
+    DataFrame dan chart turunan store.
+
+    Hapus kategori hanya menandai baris miliknya (O(pengeluaran kategori
+    itu)); baris mati dibuang sekaligus saat jumlahnya melebihi baris
+    hidup atau saat semua baris dibaca lewat `expenses`.
+    """
+
+    # expense_id untuk pengeluaran yang belum tersimpan di database; id negatif
+    # lainnya adalah id sementara dari antrian write-behind
+    NO_ID = -1
+    DEAD = 0xFFFFFFFF  # kode kategori untuk baris yang sudah dihapus
+
+    def __init__(self):
+        self.categories = []       # CategoryRecord, urutan tampilan
+        self._by_name = {}         # nama -> CategoryRecord
+        self._names = []           # kode -> nama (None jika kategori dihapus)
+        self._spent = array('q')   # kode -> total pengeluaran
+        self._rows = []            # kode -> array posisi baris (None jika kategori dihapus)
+        self._dead = 0             # jumlah baris mati yang belum dipadatkan
+        self.version = next(_versions)
+
+        self._codes = array('I')
+        self._amounts = array('q')
+        self._spent_at = array('d')  # epoch detik
+        self._expense_ids = array('q')
+
+    def bump_version(self):
+        """Tandai store berubah (juga untuk perubahan field kategori dari luar store)"""
+        self.version = next(_versions)
+
+    # Kategori
+
+    def find_category(self, name):
+        """CategoryRecord dengan nama tersebut, atau None"""
+        return self._by_name.get(name)
+
+    def category_names(self):
+        return [cat.name for cat in self.categories]
+
+    def add_category(self, name, priority, urgency=3, frequency=3, impact=3, category_id=None):
+        """
+        Tambah kategori baru
+
+        Returns:
+            CategoryRecord: Kategori yang ditambahkan
+        """
+        if name in self._by_name:
+            raise ValueError(f"Kategori sudah ada: {name}")
+        record = CategoryRecord(len(self._names), name, priority, urgency, frequency, impact, category_id)
+        self._names.append(name)
+        self._spent.append(0)
+        self._rows.append(array('I'))
+        self.categories.append(record)
+        self._by_name[name] = record
+        self.bump_version()
+        return record
+
+    def remove_category(self, name):
+        """
+        Hapus kategori beserta pengeluarannya
+
+        Returns:
+            int: Jumlah pengeluaran yang ikut terhapus
+        """
+        record = self._by_name.pop(name, None)
+        if record is None:
+            return 0
+        self.bump_version()
+        self.categories.remove(record)
+        self._names[record.code] = None
+        self._spent[record.code] = 0
+
+        rows = self._rows[record.code]
+        self._rows[record.code] = None
+        for row in rows:
+            self._codes[row] = self.DEAD
+        self._dead += len(rows)
+        if self._dead > len(self):
+            self._compact()
+        return len(rows)
+
+    def rename_category(self, old_name, new_name):
+        """
+        Ganti nama kategori; pengeluarannya tetap menunjuk kode yang sama
+
+        Returns:
+            CategoryRecord: Kategori yang di-rename
+        """
+        if new_name in self._by_name:
+            raise ValueError(f"Kategori sudah ada: {new_name}")
+        record = self._by_name.pop(old_name)
+        record.name = new_name
+        self._names[record.code] = new_name
+        self._by_name[new_name] = record
+        self.bump_version()
+        return record
+
+    # Pengeluaran
+
+    def add_expense(self, category_name, amount, spent_at=None, expense_id=None):
+        """
+        Catat pengeluaran; total terpakai kategori diperbarui O(1)
+
+        Returns:
+            int: Posisi pengeluaran di store
+        """
+        record = self._by_name[category_name]
+        spent_at = spent_at or datetime.now()
+        self._rows[record.code].append(len(self._codes))
+        self._codes.append(record.code)
+        self._amounts.append(amount)
+        self._spent_at.append(spent_at.timestamp())
+        self._expense_ids.append(self.NO_ID if expense_id is None else expense_id)
+        self._spent[record.code] += amount
+        self.bump_version()
+        return len(self._codes) - 1
+
+    def remove_expense(self, expense_id, category_name=None):
+        """
+        Hapus pengeluaran berdasarkan expense_id
+
+        Args:
+            expense_id (int): Expense ID
+            category_name (str): Kategori pengeluaran; jika diisi, pencarian
+                hanya di baris kategori itu
+
+        Returns:
+            bool: True jika ditemukan dan dihapus
+        """
+        if category_name is not None:
+            record = self._by_name.get(category_name)
+            if record is None:
+                return False
+            candidates = self._rows[record.code]
+        else:
+            candidates = range(len(self._codes))
+        row = next(
+            (row for row in candidates
+             if self._expense_ids[row] == expense_id and self._codes[row] != self.DEAD),
+            None
+        )
+        if row is None:
+            return False
+
+        code = self._codes[row]
+        self._spent[code] -= self._amounts[row]
+        self._rows[code].remove(row)
+        self._codes[row] = self.DEAD
+        self._dead += 1
+        self.bump_version()
+        if self._dead > len(self):
+            self._compact()
+        return True
+
+    def category_row_count(self, name):
+        """Jumlah pengeluaran kategori (dari index baris, tanpa scan)"""
+        record = self._by_name.get(name)
+        return len(self._rows[record.code]) if record else 0
+
+    def _compact(self):
+        """Buang baris mati dan bangun ulang index baris per kategori"""
+        if not self._dead:
+            return
+        keep = [row for row, code in enumerate(self._codes) if code != self.DEAD]
+        self._codes = array('I', (self._codes[row] for row in keep))
+        self._amounts = array('q', (self._amounts[row] for row in keep))
+        self._spent_at = array('d', (self._spent_at[row] for row in keep))
+        self._expense_ids = array('q', (self._expense_ids[row] for row in keep))
+        self._rows = [None if rows is None else array('I') for rows in self._rows]
+        for row, code in enumerate(self._codes):
+            self._rows[code].append(row)
+        self._dead = 0
+
+    def _expense_row(self, index):
+        code = self._codes[index]
+        expense_id = self._expense_ids[index]
+        record = self._by_name.get(self._names[code])
+        return {
+            'expense_id': None if expense_id == self.NO_ID else expense_id,
+            'category_id': record.category_id if record else None,
+            'category': self._names[code],
+            'amount': self._amounts[index],
+            'spent_at': datetime.fromtimestamp(self._spent_at[index])
+        }
+
+    @property
+    def expenses(self):
+        """View read-only list of dict (expense_id, category_id, category, amount, spent_at)"""
+        return ExpenseView(self)
+
+    def spent_by_name(self):
+        """
+        Total pengeluaran per kategori dari running sum
+
+        Returns:
+            dict: {nama kategori: total}
+        """
+        return {cat.name: self._spent[cat.code] for cat in self.categories}
+
+    def rebuild_spent(self):
+        """Hitung ulang running sum dari kolom amount (pemeriksaan konsistensi)"""
+        spent = array('q', bytes(8 * len(self._names)))
+        for code, amount in zip(self._codes, self._amounts):
+            if code != self.DEAD:
+                spent[code] += amount
+        self._spent = spent
+
+    def clear(self):
+        """Kosongkan store (dipakai saat session di-spill)"""
+        self.__init__()
+
+    # Bulk load dan ukuran memori
+
+    @classmethod
+    def from_rows(cls, categories, expenses):
+        """
+        Bangun store dari baris repository (get_categories dan get_expenses)
+
+        Args:
+            categories (list): Dict dengan category_id, name, priority, urgency, frequency, impact
+            expenses (list): Dict dengan expense_id, category, amount, spent_at
+
+        Returns:
+            BudgetStore
+        """
+        store = cls()
+        for cat in categories:
+            store.add_category(
+                cat['name'], cat['priority'], cat['urgency'], cat['frequency'], cat['impact'],
+                category_id=cat.get('category_id')
+            )
+        for exp in expenses:
+            store.add_expense(exp['category'], exp['amount'], exp['spent_at'], exp.get('expense_id'))
+        return store
+
+    def memory_usage(self):
+        """
+        Perkiraan memori yang dipakai store (byte)
+
+        Returns:
+            dict: categories, expenses dan total
+        """
+        categories = (
+            sys.getsizeof(self.categories) + sys.getsizeof(self._by_name) +
+            sys.getsizeof(self._names) + sys.getsizeof(self._spent) +
+            sum(sys.getsizeof(cat) + sys.getsizeof(cat.name) for cat in self.categories)
+        )
+        expenses = sum(
+            sys.getsizeof(column)
+            for column in (self._codes, self._amounts, self._spent_at, self._expense_ids)
+        ) + sys.getsizeof(self._rows) + sum(sys.getsizeof(rows) for rows in self._rows if rows is not None)
+        return {'categories': categories, 'expenses': expenses, 'total': categories + expenses}
+
+    def __len__(self):
+        return len(self._codes) - self._dead
+
+
+def get_budget_store():
+    """
+    BudgetStore milik session ini (dibuat kosong saat pertama dipakai)
+
+    Returns:
+        BudgetStore
+    """
+    store = st.session_state.get(SESSION_KEYS["BUDGET_STORE"])
+    if store is None:
+        store = BudgetStore()
+        st.session_state[SESSION_KEYS["BUDGET_STORE"]] = store
+    return store
@@ -2,6 +2,10 @@
 
 import streamlit as st
 from config.settings import DECISION_WEIGHTS, SCORE_WEIGHTS, SESSION_KEYS
+from services.budget_repository import BudgetRepository
+from services.write_behind import write_behind
+from utils.allocation_engine import AllocationEngine
+from utils.budget_store import get_budget_store
 
 def calculate_decision_score(urgency, frequency, impact):
     """Calculate decision score based on weighted criteria"""
@@ -10,65 +14,103 @@ def calculate_decision_score(urgency, frequency, impact):
                      impact * DECISION_WEIGHTS["impact"])
     return decision_score
 
-def calculate_allocation():
-    """Calculate allocation based on priority and decision scores"""
-    if not st.session_state.get(SESSION_KEYS["CATEGORIES"]):
-        return
-        
-    categories = st.session_state[SESSION_KEYS["CATEGORIES"]]
-    expenses = st.session_state.get(SESSION_KEYS["EXPENSES"], [])
-    monthly_budget = st.session_state.get(SESSION_KEYS["MONTHLY_BUDGET"], 0)
+def get_spent_index():
+    """
+    Total pengeluaran per kategori (running sum di BudgetStore)
     
-    # Calculate combined scores
-    for cat in categories:
-        # Priority score (1-5) normalized to 0-1
-        priority_normalized = cat['priority'] / 5.0
-        
-        # Decision score (already 0-1 range from calculate_decision_score)
-        decision_score = calculate_decision_score(
-            cat.get('urgency', 3) / 5.0,  # Normalize to 0-1
-            cat.get('frequency', 3) / 5.0,
-            cat.get('impact', 3) / 5.0
-        )
-        
-        # Combined score with equal weight between priority and decision
-        cat['combined_score'] = (priority_normalized * SCORE_WEIGHTS["priority"] + 
-                               decision_score * SCORE_WEIGHTS["decision"])
+    Returns:
+        dict: {nama kategori: total pengeluaran}
+    """
+    return get_budget_store().spent_by_name()
+
+def get_allocation_engine():
+    """
+    AllocationEngine milik session ini (dibuat saat pertama dipakai)
     
-    # Calculate allocations based on combined scores
-    total_combined_score = sum([cat['combined_score'] for cat in categories])
+    Returns:
+        AllocationEngine: Engine dengan cache combined score kategori
+    """
+    engine = st.session_state.get(SESSION_KEYS["ALLOCATION_ENGINE"])
+    if engine is None:
+        engine = AllocationEngine()
+        st.session_state[SESSION_KEYS["ALLOCATION_ENGINE"]] = engine
+    return engine
+
+def calculate_allocation():
+    """
+    Calculate allocation based on priority and decision scores
     
-    for cat in categories:
-        if total_combined_score > 0:
-            weight = cat['combined_score'] / total_combined_score
-            cat['allocation'] = round(weight * monthly_budget, 2)
-        else:
-            cat['allocation'] = 0
+    Combined score di-cache per kategori oleh AllocationEngine, jadi hanya
+    kategori yang berubah yang dihitung ulang.
+    """
+    store = get_budget_store()
+    if not store.categories:
+        return
         
-        # Calculate spent amount
-        cat['spent'] = 0
-        for exp in expenses:
-            if exp['category'] == cat['name']:
-                cat['spent'] += exp['amount']
+    get_allocation_engine().calculate(
+        store.categories,
+        st.session_state.get(SESSION_KEYS["MONTHLY_BUDGET"], 0),
+        store.spent_by_name()
+    )
+    store.bump_version()
 
-def get_financial_summary():
-    """Get summary of financial data"""
-    categories = st.session_state.get(SESSION_KEYS["CATEGORIES"], [])
+def rescale_allocation():
+    """Hitung ulang allocation setelah budget berubah (tanpa menghitung ulang score)"""
+    store = get_budget_store()
+    categories = store.categories
+    if not categories:
+        return
+    
+    engine = get_allocation_engine()
+    if not engine.in_sync(categories):
+        calculate_allocation()
+        return
+    engine.rescale(categories, st.session_state.get(SESSION_KEYS["MONTHLY_BUDGET"], 0))
+    store.bump_version()
+
+def get_financial_summary(user_id=None):
+    """
+    Get summary of financial data
+    
+    With a user_id, spent totals come from the expense_monthly_summary
+    table (one row per category this month) instead of the expense list,
+    plus expenses still waiting in the write-behind queue.
+    """
+    categories = get_budget_store().categories
     monthly_budget = st.session_state.get(SESSION_KEYS["MONTHLY_BUDGET"], 0)
     
     if not categories:
         return {
             'total_allocated': 0,
             'total_spent': 0,
-            'remaining_budget': monthly_budget
+            'remaining_budget': monthly_budget,
+            'spent_by_category': {}
         }
     
     total_allocated = sum([cat['allocation'] for cat in categories])
-    total_spent = sum([cat['spent'] for cat in categories])
+    
+    spent_by_category = None
+    if user_id is not None:
+        success, summary = BudgetRepository.get_monthly_summary(user_id)
+        if success:
+            spent_by_category = {
+                category_id: row['total'] for category_id, row in summary.items()
+            }
+            for category_id, row in write_behind.pending_totals(user_id).items():
+                spent_by_category[category_id] = spent_by_category.get(category_id, 0) + row['total']
+    
+    if spent_by_category is None:
+        # Session-only fallback (not logged in or database unavailable)
+        spent_by_category = {
+            cat.get('category_id', cat['name']): cat['spent'] for cat in categories
+        }
+    
+    total_spent = sum(spent_by_category.values())
     remaining_budget = monthly_budget - total_spent
     
     return {
         'total_allocated': total_allocated,
         'total_spent': total_spent,
-        'remaining_budget': remaining_budget
-    }
\ No newline at end of file
+        'remaining_budget': remaining_budget,
+        'spent_by_category': spent_by_category
+    }
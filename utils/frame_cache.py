@@ -0,0 +1,52 @@
+# utils/frame_cache.py
+
+from config.settings import FRAME_CACHE
+from services.session_memory import estimate_size, session_memory
+from services.user_cache import TTLCache
+from utils.budget_store import get_budget_store
+from utils.state_manager import SessionManager
+
+# DataFrame dan spec chart turunan BudgetStore, dipakai bersama semua session
+# dengan key (jenis, user_id, versi store, ...) dan eviction LRU
+_frame_cache = TTLCache(max_size=FRAME_CACHE["max_size"], ttl=FRAME_CACHE["ttl"])
+
+
+def memoize_frame(kind, build, *extra_key):
+    """
+    Ambil objek turunan state budget dari cache, atau bangun sekali
+
+    Key memakai versi BudgetStore session ini, yang naik setiap ada
+    perubahan kategori, expense atau budget; rerun tanpa perubahan
+    (misalnya klik menu sidebar) tidak membangun ulang DataFrame/chart.
+
+    Args:
+        kind (str): Jenis objek, misalnya 'breakdown' atau 'expense_chart'
+        build (callable): Membangun objek jika belum ada di cache
+        *extra_key: Bagian key tambahan di luar store (misalnya tanggal)
+
+    Returns:
+        object: Hasil build() untuk versi store saat ini
+    """
+    key = (kind, SessionManager.get_user_id(), get_budget_store().version) + extra_key
+    hit, value = _frame_cache.get(key)
+    if not hit:
+        value = build()
+        _frame_cache.set(key, value)
+    return value
+
+
+def get_frame_cache_stats():
+    return _frame_cache.stats()
+
+
+def _usage_by_user():
+    """Perkiraan memori cache per user (byte), untuk accounting SessionMemory"""
+    usage = {}
+    for key, value in _frame_cache.items():
+        usage[key[1]] = usage.get(key[1], 0) + estimate_size(value)
+    return usage
+
+
+session_memory.register_shared(
+    'frames', _usage_by_user, lambda user_id: _frame_cache.delete_where(lambda key: key[1] == user_id)
+)
@@ -1,14 +1,42 @@
 # utils/state_manager.py
 
+import functools
+import json
+
 import streamlit as st
+import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from services.auth_service import AuthService
+from services.budget_repository import BudgetRepository
+from services.session_memory import session_memory
+from services.session_store import session_store
+from services.write_behind import write_behind
+from config.settings import CLIENT_IP, SESSION_KEYS
+from utils.budget_store import BudgetStore
+from utils.calculations import calculate_allocation
+
+# Nama cookie yang membawa token session (tidak pernah ditaruh di URL)
+SESSION_COOKIE = 'kosbudget_session'
+
+# Cookie ditulis dari iframe komponen (same-origin) ke dokumen halaman
+_COOKIE_SCRIPT = """
+<script>
+const secure = window.parent.location.protocol === 'https:' ? '; Secure' : '';
+window.parent.document.cookie = %s + '; Path=/; SameSite=Strict' + secure;
+</script>
+"""
 
 class SessionManager:
     """Manager untuk session state Streamlit"""
     
     @staticmethod
     def initialize_session():
-        """Initialize session state variables"""
+        """
+        Initialize session state variables
+        
+        Jika cookie membawa token session yang masih berlaku (refresh atau
+        tab baru), login di-resume dari session store tanpa query ke tabel users.
+        """
         if 'authenticated' not in st.session_state:
             st.session_state.authenticated = False
         
@@ -17,6 +45,69 @@ class SessionManager:
         
         if 'current_page' not in st.session_state:
             st.session_state.current_page = 'auth'
+        
+        SessionManager._write_session_cookie()
+        SessionManager._resume_session()
+    
+    @staticmethod
+    def _queue_session_cookie(token):
+        """
+        Jadwalkan penulisan (atau penghapusan, token None) cookie session
+        
+        Cookie ditulis di awal rerun berikutnya, karena output rerun yang
+        memanggil st.rerun() tidak pernah sampai ke browser.
+        """
+        max_age = int(session_store.ttl) if token else 0
+        st.session_state['session_cookie_pending'] = f"{SESSION_COOKIE}={token or ''}; Max-Age={max_age}"
+    
+    @staticmethod
+    def _write_session_cookie():
+        """Tulis cookie session yang dijadwalkan lewat komponen HTML tak terlihat"""
+        try:
+            pending = st.session_state.pop('session_cookie_pending', None)
+            if pending:
+                html = _COOKIE_SCRIPT % json.dumps(pending)
+                if hasattr(st, 'iframe'):
+                    st.iframe(html, height=1)
+                else:
+                    components.html(html, height=0)
+        except Exception:
+            pass  # Di luar script run Streamlit
+    
+    @staticmethod
+    def _resume_session():
+        """
+        Cocokkan state login dengan token session di cookie
+        
+        Token tidak disimpan di URL supaya tidak ikut tercatat di history
+        browser, log proxy, header Referer atau link yang dibagikan.
+        """
+        try:
+            token = st.context.cookies.get(SESSION_COOKIE)
+        except Exception:
+            return  # Di luar script run Streamlit
+        if not isinstance(token, str):
+            token = None
+        
+        if st.session_state.authenticated:
+            # Session dicabut atau kedaluwarsa (idle) -> logout
+            current = st.session_state.get('session_token')
+            if current and session_store.get(current) is None:
+                SessionManager.clear_user_session()
+            return
+        
+        # Cookie dibaca saat koneksi dibuka, jadi setelah logout di tab yang
+        # sama cookie lama masih terlihat; token itu tidak dicek ulang
+        if token and token != st.session_state.get('revoked_session_token'):
+            user_data = session_store.get(token)
+            if user_data:
+                st.session_state.authenticated = True
+                st.session_state.user_data = user_data
+                st.session_state.current_page = 'dashboard'
+                st.session_state.session_token = token
+            else:
+                st.session_state['revoked_session_token'] = token
+                SessionManager._queue_session_cookie(None)
     
     @staticmethod
     def set_user_session(user_data):
@@ -29,13 +120,36 @@ class SessionManager:
         st.session_state.authenticated = True
         st.session_state.user_data = user_data
         st.session_state.current_page = 'dashboard'
+        
+        token = session_store.create(user_data)
+        st.session_state.session_token = token
+        SessionManager._queue_session_cookie(token)
     
     @staticmethod
     def clear_user_session():
         """Clear user session (logout)"""
+        # Perubahan user yang masih di antrian ditulis sebelum session dibuang
+        user_id = SessionManager.get_user_id()
+        if user_id is not None:
+            write_behind.flush(user_id)
+        
+        token = st.session_state.pop('session_token', None)
+        session_store.revoke(token)
+        if token:
+            st.session_state['revoked_session_token'] = token
+            SessionManager._queue_session_cookie(None)
+        
         st.session_state.authenticated = False
         st.session_state.user_data = None
         st.session_state.current_page = 'auth'
+        
+        # Data budget milik user sebelumnya tidak boleh terbawa ke login berikutnya
+        for key in (SESSION_KEYS["MONTHLY_BUDGET"], SESSION_KEYS["BUDGET_STORE"],
+                    SESSION_KEYS["ALLOCATION_ENGINE"], 'budget_loaded_for'):
+            st.session_state.pop(key, None)
+        session_id = get_session_id()
+        if session_id is not None:
+            session_memory.forget(session_id)
     
     @staticmethod
     def is_authenticated():
@@ -57,6 +171,23 @@ class SessionManager:
             return user_data.get('user_id')
         return None
     
+    @staticmethod
+    def get_memory_usage():
+        """
+        Perkiraan memori session ini per objek
+        
+        Returns:
+            dict: Rincian dari SessionMemory.usage, atau None jika belum tercatat
+        """
+        session_id = get_session_id()
+        rows = session_memory.usage(session_id) if session_id is not None else []
+        return rows[0] if rows else None
+    
+    @staticmethod
+    def get_memory_stats():
+        """Statistik memori semua session di proses ini"""
+        return session_memory.stats()
+    
     @staticmethod
     def get_username():
         """Get current username"""
@@ -65,6 +196,57 @@ class SessionManager:
             return user_data.get('username')
         return None
 
+def get_session_id():
+    """Session id Streamlit untuk rerun ini (None di luar streamlit run)"""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
+
+def session_scope(render):
+    """
+    Decorator untuk fungsi render halaman
+    
+    Session ditandai sedang dipakai (SessionMemory.in_use) selama render,
+    jadi sweep tidak mengosongkan BudgetStore/AllocationEngine yang sedang
+    dibaca script ini; rerun yang mulai saat spill berjalan menunggu spill
+    selesai lalu memulihkannya lewat resume().
+    """
+    @functools.wraps(render)
+    def wrapper(*args, **kwargs):
+        session_id = get_session_id()
+        if session_id is None:
+            return render(*args, **kwargs)
+        with session_memory.in_use(session_id):
+            return render(*args, **kwargs)
+    return wrapper
+
+def get_client_id():
+    """
+    Identitas client untuk login throttling
+    
+    X-Forwarded-For hanya dipercaya jika TRUSTED_PROXY_COUNT diisi: yang
+    dipakai adalah hop ke-N dari kanan (alamat yang ditambahkan proxy
+    tepercaya paling luar), jadi nilai palsu yang dikirim client di
+    sebelah kiri diabaikan. Tanpa proxy tepercaya dipakai IP koneksi.
+    Session id sengaja tidak dipakai sebagai cadangan: tab baru berarti
+    bucket baru, jadi limit per client bisa dilewati. Tanpa IP, login
+    hanya dibatasi bucket username.
+    
+    Returns:
+        str: Client ID atau None jika tidak tersedia
+    """
+    try:
+        trusted = CLIENT_IP["trusted_proxies"]
+        if trusted > 0:
+            forwarded = st.context.headers.get('X-Forwarded-For')
+            hops = [hop.strip() for hop in forwarded.split(',')] if forwarded else []
+            if len(hops) >= trusted and hops[-trusted]:
+                return hops[-trusted]
+        if st.context.ip_address:
+            return st.context.ip_address
+    except Exception:
+        pass
+    return None
+
 # Fungsi untuk kompatibilitas dengan kode yang sudah ada
 def authenticate_user(username, password):
     """
@@ -77,7 +259,9 @@ def authenticate_user(username, password):
     Returns:
         tuple: (success, message)
     """
-    success, message, user_data = AuthService.authenticate_user(username, password)
+    success, message, user_data = AuthService.authenticate_user(
+        username, password, client_id=get_client_id()
+    )
     
     if success:
         # Set session jika login berhasil
@@ -99,6 +283,76 @@ def register_user(username, password):
     """
     return AuthService.register_user(username, password)
 
+def initialize_session_state():
+    """
+    Initialize state budget untuk halaman Form Input dan Dashboard
+    
+    Kategori dan pengeluaran bulan ini dimuat dari database sekali per
+    login ke BudgetStore, setelah itu halaman bekerja dengan store di
+    session state. Session yang di-spill karena idle atau batas memori
+    dipulihkan di sini sebelum halaman dirender.
+    """
+    SessionManager.initialize_session()
+    
+    session_id = get_session_id()
+    if session_id is not None:
+        restored = session_memory.resume(session_id)
+        if restored is not None:
+            st.session_state.update(restored)
+            if SESSION_KEYS["BUDGET_STORE"] not in restored:
+                # Spill tidak tersedia: muat ulang dari database
+                st.session_state.pop('budget_loaded_for', None)
+    
+    if SESSION_KEYS["MONTHLY_BUDGET"] not in st.session_state:
+        st.session_state[SESSION_KEYS["MONTHLY_BUDGET"]] = 0
+    if SESSION_KEYS["BUDGET_STORE"] not in st.session_state:
+        st.session_state[SESSION_KEYS["BUDGET_STORE"]] = BudgetStore()
+    
+    st.session_state[SESSION_KEYS["USERNAME"]] = SessionManager.get_username()
+    
+    user_id = SessionManager.get_user_id()
+    if user_id is not None and st.session_state.get('budget_loaded_for') != user_id:
+        load_budget_data(user_id)
+    
+    if session_id is not None:
+        session_memory.track(
+            session_id, user_id,
+            durable={SESSION_KEYS["BUDGET_STORE"]: st.session_state[SESSION_KEYS["BUDGET_STORE"]]},
+            user_data=st.session_state.get('user_data'),
+            allocation_engine=st.session_state.get(SESSION_KEYS["ALLOCATION_ENGINE"])
+        )
+
+def load_budget_data(user_id):
+    """
+    Muat kategori dan pengeluaran bulan ini milik user ke BudgetStore session
+    
+    Args:
+        user_id (int): User ID
+        
+    Returns:
+        tuple: (success, message)
+    """
+    # Perubahan yang masih di antrian harus sudah ada di database sebelum dibaca
+    write_behind.flush(user_id)
+    
+    success, categories = BudgetRepository.get_categories(user_id)
+    if not success:
+        return False, categories
+    
+    success, expenses = BudgetRepository.get_expenses(user_id)
+    if not success:
+        return False, expenses
+    
+    success, monthly_budget = BudgetRepository.get_monthly_budget(user_id)
+    if not success:
+        return False, monthly_budget
+    
+    st.session_state[SESSION_KEYS["MONTHLY_BUDGET"]] = monthly_budget
+    st.session_state[SESSION_KEYS["BUDGET_STORE"]] = BudgetStore.from_rows(categories, expenses)
+    st.session_state['budget_loaded_for'] = user_id
+    calculate_allocation()
+    return True, "Data budget dimuat"
+
 def logout_user():
     """Logout current user"""
     SessionManager.clear_user_session()
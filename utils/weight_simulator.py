@@ -0,0 +1,121 @@
+# utils/weight_simulator.py
+
+import functools
+
+import numpy as np
+from config.settings import DECISION_WEIGHTS, SCORE_WEIGHTS
+
+
+@functools.lru_cache(maxsize=8)
+def weight_grid(decision_step=0.05, split_step=0.05):
+    """
+    Grid kombinasi bobot untuk simulasi what-if
+
+    Bobot decision (urgensi, frekuensi, dampak) diambil dari simplex
+    (jumlahnya 1) dengan jarak `decision_step`; porsi prioritas vs decision
+    dari 0 sampai 1 dengan jarak `split_step`. Default menghasilkan
+    231 x 21 = 4.851 kombinasi.
+
+    Returns:
+        tuple: (decision_weights array (m, 3), priority_share array (m,))
+    """
+    n = int(round(1 / decision_step))
+    simplex = np.array([
+        (u, f, n - u - f)
+        for u in range(n + 1)
+        for f in range(n + 1 - u)
+    ], dtype=np.float64) / n
+    splits = np.linspace(0.0, 1.0, int(round(1 / split_step)) + 1)
+
+    decision_weights = np.repeat(simplex, len(splits), axis=0)
+    priority_share = np.tile(splits, len(simplex))
+    # Array di-cache dan dipakai bersama, jadi dibuat read-only
+    decision_weights.setflags(write=False)
+    priority_share.setflags(write=False)
+    return decision_weights, priority_share
+
+
+def _criteria(categories):
+    """Matriks kriteria kategori: priority (n,) dan urgensi/frekuensi/dampak (n, 3)"""
+    priority = np.array([cat['priority'] for cat in categories], dtype=np.float64) / 5.0
+    criteria = np.array([
+        (cat.get('urgency', 3), cat.get('frequency', 3), cat.get('impact', 3))
+        for cat in categories
+    ], dtype=np.float64) / 5.0
+    return priority, criteria
+
+
+def simulate_allocations(categories, monthly_budget, decision_weights, priority_share):
+    """
+    Allocation setiap kategori untuk setiap kombinasi bobot, dalam satu pass
+
+    Rumus sama dengan calculate_allocation; satu baris hasil = satu
+    kombinasi bobot (decision_weights[k], priority_share[k]).
+
+    Args:
+        categories (list): Kategori dengan priority, urgency, frequency, impact
+        monthly_budget (float): Budget bulanan
+        decision_weights (array): Bobot (urgensi, frekuensi, dampak), shape (m, 3)
+        priority_share (array): Bobot prioritas, shape (m,); bobot decision = 1 - nilai ini
+
+    Returns:
+        numpy.ndarray: Allocation shape (m, jumlah kategori), tidak dibulatkan
+    """
+    priority, criteria = _criteria(categories)
+    decision_weights = np.atleast_2d(np.asarray(decision_weights, dtype=np.float64))
+    priority_share = np.atleast_1d(np.asarray(priority_share, dtype=np.float64))
+
+    decision_score = decision_weights @ criteria.T                       # (m, n)
+    combined = (priority_share[:, None] * priority[None, :] +
+                (1.0 - priority_share)[:, None] * decision_score)        # (m, n)
+    totals = combined.sum(axis=1, keepdims=True)
+    shares = np.divide(combined, totals, out=np.zeros_like(combined), where=totals > 0)
+    return shares * monthly_budget
+
+
+def current_weights():
+    """Bobot aktif dari config/settings.py dalam format simulator"""
+    decision_weights = np.array([
+        DECISION_WEIGHTS["urgency"], DECISION_WEIGHTS["frequency"], DECISION_WEIGHTS["impact"]
+    ])
+    priority_share = SCORE_WEIGHTS["priority"] / (SCORE_WEIGHTS["priority"] + SCORE_WEIGHTS["decision"])
+    return decision_weights, priority_share
+
+
+def allocation_shift_distribution(categories, monthly_budget, decision_weights=None, priority_share=None,
+                                  percentiles=(5, 50, 95)):
+    """
+    Distribusi pergeseran allocation per kategori terhadap bobot aktif
+
+    Args:
+        categories (list): Kategori user
+        monthly_budget (float): Budget bulanan
+        decision_weights, priority_share (array): Grid bobot (default weight_grid())
+        percentiles (tuple): Persentil yang dilaporkan
+
+    Returns:
+        list: Satu dict per kategori berisi name, baseline, mean, std, min,
+            max dan p<persentil> dari pergeseran (Rp)
+    """
+    if not categories:
+        return []
+    if decision_weights is None or priority_share is None:
+        decision_weights, priority_share = weight_grid()
+
+    baseline = simulate_allocations(categories, monthly_budget, *current_weights())[0]
+    shift = simulate_allocations(categories, monthly_budget, decision_weights, priority_share) - baseline
+
+    stats = {
+        'mean': shift.mean(axis=0),
+        'std': shift.std(axis=0),
+        'min': shift.min(axis=0),
+        'max': shift.max(axis=0)
+    }
+    for p, values in zip(percentiles, np.percentile(shift, percentiles, axis=0)):
+        stats[f'p{p}'] = values
+
+    return [
+        dict({'name': cat['name'], 'baseline': float(baseline[i])},
+             **{key: float(values[i]) for key, values in stats.items()})
+        for i, cat in enumerate(categories)
+    ]